@@ -26,6 +26,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "qc.middleware.QueryStatsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -62,6 +63,101 @@ DATABASES = {
     )
 }
 
+# SQLite tests use a file rather than :memory: so threaded tests (e.g. the
+# Unit status races) hit one shared database through separate connections.
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    DATABASES["default"].setdefault("TEST", {"NAME": str(BASE_DIR / "test_db.sqlite3")})
+
+# Cache (dashboard metrics snapshot). Locmem per process by default; set
+# CACHE_DIR to share one file-based cache between gunicorn workers.
+if os.environ.get("CACHE_DIR"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ["CACHE_DIR"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "eyewear-qc",
+        }
+    }
+
+# Seconds a dashboard metrics section stays cached (writes invalidate earlier)
+QC_METRICS_CACHE_TTL = int(os.environ.get("QC_METRICS_CACHE_TTL", "60"))
+
+# Rows per bulk_create / bulk_update batch in the frames CSV import
+QC_IMPORT_BATCH_SIZE = int(os.environ.get("QC_IMPORT_BATCH_SIZE", "1000"))
+
+# Where import jobs run: "thread" (pool inside the web process) or "command"
+# (a separate `manage.py qc_import_worker`).
+QC_IMPORT_WORKER = os.environ.get("QC_IMPORT_WORKER", "thread")
+QC_IMPORT_THREADS = int(os.environ.get("QC_IMPORT_THREADS", "2"))
+# A RUNNING job with no heartbeat for this long is resumed by another worker
+QC_IMPORT_STALE_SECONDS = int(os.environ.get("QC_IMPORT_STALE_SECONDS", "300"))
+
+# Defect photo pipeline (qc.services.images): originals are downscaled to fit
+# QC_PHOTO_MAX_PX and get a QC_PHOTO_THUMB_PX thumbnail. "thread" processes
+# uploads on an in-process pool; "command" leaves them for qc_process_photos.
+QC_IMAGE_WORKER = os.environ.get("QC_IMAGE_WORKER", "thread")
+QC_IMAGE_THREADS = int(os.environ.get("QC_IMAGE_THREADS", "2"))
+QC_PHOTO_MAX_PX = int(os.environ.get("QC_PHOTO_MAX_PX", "2048"))
+QC_PHOTO_THUMB_PX = int(os.environ.get("QC_PHOTO_THUMB_PX", "320"))
+# Minutes before a worker's claim on a photo lapses and another may retry it.
+QC_PHOTO_CLAIM_MINUTES = int(os.environ.get("QC_PHOTO_CLAIM_MINUTES", "10"))
+
+# QC bench work queue (qc.services.work_queue): units a tech claims at a
+# time, and minutes before an untouched claim lapses back into the queue.
+QC_QUEUE_BATCH = int(os.environ.get("QC_QUEUE_BATCH", "5"))
+QC_QUEUE_CLAIM_MINUTES = int(os.environ.get("QC_QUEUE_CLAIM_MINUTES", "30"))
+
+# SLA (qc.services.sla): hours from receipt to STORE_READY per priority,
+# unless an SlaPolicy (admin) sets one for the priority or its store.
+QC_SLA_HOURS = {
+    "URGENT": int(os.environ.get("QC_SLA_HOURS_URGENT", "6")),
+    "NORMAL": int(os.environ.get("QC_SLA_HOURS_NORMAL", "48")),
+}
+
+# Chunked complaint uploads (qc.services.uploads): files arrive in
+# QC_UPLOAD_CHUNK_SIZE pieces and are reassembled under QC_UPLOAD_DIR
+# (default MEDIA_ROOT/upload_sessions) until the session completes.
+QC_UPLOAD_CHUNK_SIZE = int(os.environ.get("QC_UPLOAD_CHUNK_SIZE", str(5 * 1024 * 1024)))
+QC_UPLOAD_MAX_BYTES = int(os.environ.get("QC_UPLOAD_MAX_BYTES", str(2 * 1024**3)))
+QC_UPLOAD_MAX_FILES = int(os.environ.get("QC_UPLOAD_MAX_FILES", "20"))
+QC_UPLOAD_DIR = os.environ.get("QC_UPLOAD_DIR", "")
+
+# Quality flag detector (qc.services.flags): a LAB/MODEL key is flagged when
+# the Wilson lower bound (z) of its decayed fail rate clears the threshold
+QC_FLAG_THRESHOLD_PERCENT = float(os.environ.get("QC_FLAG_THRESHOLD_PERCENT", "10"))
+QC_FLAG_MIN_SAMPLE = float(os.environ.get("QC_FLAG_MIN_SAMPLE", "10"))
+QC_FLAG_HALF_LIFE_DAYS = float(os.environ.get("QC_FLAG_HALF_LIFE_DAYS", "3.5"))
+QC_FLAG_Z = float(os.environ.get("QC_FLAG_Z", "1.96"))
+
+# Per-view request stats (qc.middleware): samples kept per view, and the
+# thresholds above which a request is logged at WARNING with its SQL
+QC_REQUEST_STATS_WINDOW = int(os.environ.get("QC_REQUEST_STATS_WINDOW", "500"))
+QC_SLOW_REQUEST_QUERIES = int(os.environ.get("QC_SLOW_REQUEST_QUERIES", "50"))
+QC_SLOW_REQUEST_MS = int(os.environ.get("QC_SLOW_REQUEST_MS", "1000"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        # WARNING: only slow requests (with their SQL); INFO adds one line
+        # per request.
+        "qc.requests": {
+            "handlers": ["console"],
+            "level": os.environ.get("QC_REQUEST_LOG_LEVEL", "WARNING"),
+            "propagate": False,
+        },
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
@@ -1,6 +1,7 @@
 
 
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.utils.html import format_html
 
 from .models import (
     Unit,
@@ -9,11 +10,15 @@ from .models import (
     Defect,
     DefectPhoto,
     ReworkTicket,
+    SlaBreachEvent,
+    SlaPolicy,
     QualityFlag,
+    ImportJob,
     Store,
     Complaint,
     ComplaintAttachment,
 )
+from .services import inspections, unit_status
 
 
 # ----------------------------
@@ -27,6 +32,7 @@ class UnitAdmin(admin.ModelAdmin):
     search_fields = ("unit_id", "order_id", "frame_model", "lab")
     date_hierarchy = "received_at"
     ordering = ("-received_at",)
+    readonly_fields = ("version", "sla_deadline", "sla_alarm_at")
 
 
 @admin.register(Inspection)
@@ -63,10 +69,17 @@ class DefectAdmin(admin.ModelAdmin):
 
 @admin.register(DefectPhoto)
 class DefectPhotoAdmin(admin.ModelAdmin):
-    list_display = ("id", "defect", "image")
+    list_display = ("id", "defect", "preview", "image", "processed_at")
     search_fields = ("defect__reason_code", "defect__category")
+    readonly_fields = ("thumbnail", "processed_at")
     ordering = ("-id",)
 
+    @admin.display(description="Preview")
+    def preview(self, obj):
+        if not obj.thumbnail:
+            return "—"
+        return format_html('<img src="{}" loading="lazy" width="80">', obj.thumbnail.url)
+
 
 @admin.register(ReworkTicket)
 class ReworkTicketAdmin(admin.ModelAdmin):
@@ -75,17 +88,53 @@ class ReworkTicketAdmin(admin.ModelAdmin):
     search_fields = ("unit__unit_id", "unit__order_id", "reason_summary")
     date_hierarchy = "created_at"
     ordering = ("-created_at",)
+    actions = ("complete_rework",)
+
+    @admin.action(description="Mark rework done (unit goes to RETEST)")
+    def complete_rework(self, request, queryset):
+        done = 0
+        for ticket in queryset.select_related("unit"):
+            try:
+                inspections.complete_rework(ticket)
+                done += 1
+            except unit_status.StatusConflict as e:
+                self.message_user(request, str(e), messages.WARNING)
+        self.message_user(request, f"{done} rework ticket(s) marked done.")
+
+
+@admin.register(SlaPolicy)
+class SlaPolicyAdmin(admin.ModelAdmin):
+    list_display = ("priority", "store", "hours")
+    list_filter = ("priority", "store")
+
+
+@admin.register(SlaBreachEvent)
+class SlaBreachEventAdmin(admin.ModelAdmin):
+    list_display = ("unit", "priority", "store", "status", "deadline", "detected_at")
+    list_filter = ("priority", "store", "status")
+    search_fields = ("unit__unit_id", "unit__order_id")
+    date_hierarchy = "deadline"
+    ordering = ("-deadline",)
 
 
 @admin.register(QualityFlag)
 class QualityFlagAdmin(admin.ModelAdmin):
-    list_display = ("id", "flag_type", "flag_key", "defect_rate", "threshold", "sample_size", "is_active", "created_at")
+    list_display = ("id", "flag_type", "flag_key", "defect_rate", "threshold", "sample_size", "is_active", "created_at", "updated_at", "closed_at")
     list_filter = ("flag_type", "is_active")
     search_fields = ("flag_key",)
     date_hierarchy = "created_at"
     ordering = ("-created_at",)
 
 
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "original_name", "status", "created_count", "updated_count", "error_count", "created_by", "created_at", "finished_at")
+    list_filter = ("status",)
+    search_fields = ("original_name", "message")
+    date_hierarchy = "created_at"
+    ordering = ("-created_at",)
+
+
 # ----------------------------
 # COMPLAINTS MODULE
 # ----------------------------
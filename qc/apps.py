@@ -1,5 +1,21 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save, pre_save
 
 
 class QcConfig(AppConfig):
     name = 'qc'
+
+    def ready(self):
+        from .models import SlaPolicy, Unit
+        from .services import blobs, sla, unit_search
+
+        post_save.connect(unit_search.on_unit_saved, sender=Unit, dispatch_uid="qc_unit_search_index")
+        pre_save.connect(sla.on_unit_pre_save, sender=Unit, dispatch_uid="qc_unit_sla_deadline")
+        post_save.connect(sla.on_policy_changed, sender=SlaPolicy, dispatch_uid="qc_sla_policy_saved")
+        post_delete.connect(sla.on_policy_changed, sender=SlaPolicy, dispatch_uid="qc_sla_policy_deleted")
+
+        for model in blobs.FILE_FIELDS:
+            uid = f"qc_blob_refs_{model._meta.model_name}"
+            pre_save.connect(blobs.on_file_model_pre_save, sender=model, dispatch_uid=uid)
+            post_save.connect(blobs.on_file_model_post_save, sender=model, dispatch_uid=uid)
+            post_delete.connect(blobs.on_file_model_post_delete, sender=model, dispatch_uid=uid)
@@ -1,71 +1,294 @@
+import codecs
 import csv
-from io import TextIOWrapper
+
+from django.conf import settings
 from django.db import transaction
+from django.utils import timezone
+
+from .models import Unit
+from .services import metrics, sla, unit_search, unit_status
+
+REQUIRED_COLUMNS = {"unit_id", "order_id", "frame_model", "lab", "priority", "status"}
+UPDATE_FIELDS = ["order_id", "frame_model", "lab", "priority", "status"]
+# written by bulk_update; status changes go through qc.services.unit_status
+FIELD_UPDATES = [f for f in UPDATE_FIELDS if f != "status"]
+
+ALLOWED_PRIORITY = {c[0] for c in Unit.PRIORITY_CHOICES}
+ALLOWED_STATUS = {c[0] for c in Unit.STATUS_CHOICES}
 
-from .models import FrameStyle, FrameVariant
+# unit_ids per `WHERE unit_id IN (...)` lookup; stays well under SQLite's
+# bound-parameter limit.
+LOOKUP_CHUNK_SIZE = 500
 
-ALLOWED_STATUS = {"APPROVED", "WATCH", "HOLD", "PULLED"}
+# bytes pulled from the upload at a time
+READ_CHUNK_SIZE = 64 * 1024
 
-def import_frames_csv(file_obj):
+# row errors kept for the report; the total is still counted past this
+MAX_REPORTED_ERRORS = 1000
+
+
+# =============================================================================
+# Streaming CSV core
+# =============================================================================
+def iter_file_chunks(file_obj, chunk_size: int = READ_CHUNK_SIZE):
     """
-    CSV required headers:
-      style_code,supplier_name,sku,color,size,status
+    Bytes chunks from a Django UploadedFile/File (via .chunks()) or any
+    binary file-like object.
     """
-    text_file = TextIOWrapper(file_obj, encoding="utf-8", newline="")
-    reader = csv.DictReader(text_file)
+    if hasattr(file_obj, "chunks"):
+        yield from file_obj.chunks(chunk_size)
+    else:
+        yield from iter(lambda: file_obj.read(chunk_size), b"")
+
 
-    required = {"style_code", "supplier_name", "sku", "color", "size", "status"}
-    if not reader.fieldnames or not required.issubset(set(reader.fieldnames)):
-        missing = required - set(reader.fieldnames or [])
+def iter_csv_lines(chunks, encoding: str = "utf-8-sig"):
+    """
+    Decode byte chunks incrementally and yield lines (with their line
+    endings, as csv expects). The utf-8-sig decoder drops a leading BOM and
+    copes with multi-byte characters split across chunks; only one chunk
+    plus one partial line is held at a time.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = ""
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line + "\n"
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def iter_csv_rows(chunks, required_columns: set = REQUIRED_COLUMNS) -> csv.DictReader:
+    """
+    Generator-backed DictReader over byte chunks.
+    Raises ValueError if the header misses any of `required_columns`.
+    """
+    reader = csv.DictReader(iter_csv_lines(chunks))
+    if not reader.fieldnames or not required_columns.issubset(set(reader.fieldnames)):
+        missing = required_columns - set(reader.fieldnames or [])
         raise ValueError(f"CSV missing required columns: {', '.join(sorted(missing))}")
+    return reader
 
-    created_styles = 0
-    created_frames = 0
-    updated_frames = 0
-
-    with transaction.atomic():
-        for row in reader:
-            style_code = row["style_code"].strip()
-            supplier_name = row["supplier_name"].strip()
-            sku = row["sku"].strip()
-            color = row["color"].strip()
-            size = row["size"].strip()
-            status = row["status"].strip().upper()
-
-            if not sku:
-                raise ValueError("SKU cannot be blank.")
-            if status not in ALLOWED_STATUS:
-                raise ValueError(f"Invalid status '{status}' for SKU '{sku}'.")
-
-            style, style_created = FrameStyle.objects.get_or_create(
-                style_code=style_code,
-                defaults={"supplier": supplier_name},
-            )
-            if style_created:
-                created_styles += 1
-            else:
-                # Keep supplier updated if it changes
-                if supplier_name and style.supplier != supplier_name:
-                    style.supplier = supplier_name
-                    style.save(update_fields=["supplier"])
-
-            frame, created = FrameVariant.objects.update_or_create(
-                sku=sku,
-                defaults={
-                    "style": style,
-                    "color": color,
-                    "size": size,
-                    "status": status,
-                },
-            )
-            if created:
-                created_frames += 1
-            else:
-                updated_frames += 1
-
-    return {
-        "created_styles": created_styles,
-        "created_frames": created_frames,
-        "updated_frames": updated_frames,
+
+def _max_length(field: str) -> int:
+    return Unit._meta.get_field(field).max_length
+
+
+def clean_row(row: dict) -> tuple[str, dict]:
+    """
+    Normalize one CSV row into (unit_id, field values).
+    Raises ValueError with a human-readable message if the row is invalid.
+    """
+    unit_id = (row.get("unit_id") or "").strip()
+    if not unit_id:
+        raise ValueError("unit_id is blank.")
+
+    values = {
+        "order_id": (row.get("order_id") or "").strip() or None,
+        "frame_model": (row.get("frame_model") or "").strip(),
+        "lab": (row.get("lab") or "").strip(),
+        "priority": (row.get("priority") or "").strip().upper() or "NORMAL",
+        "status": (row.get("status") or "").strip().upper() or "RECEIVED",
     }
 
+    if values["priority"] not in ALLOWED_PRIORITY:
+        raise ValueError(f"Invalid priority '{values['priority']}'.")
+    if values["status"] not in ALLOWED_STATUS:
+        raise ValueError(f"Invalid status '{values['status']}'.")
+
+    for field, value in [("unit_id", unit_id)] + list(values.items()):
+        if value and len(value) > _max_length(field):
+            raise ValueError(f"{field} longer than {_max_length(field)} characters.")
+
+    return unit_id, values
+
+
+def apply_rows(rows: dict, batch_size: int | None = None) -> dict:
+    """
+    Set-based upsert of one batch of cleaned rows ({unit_id: values}):
+    existing unit_ids are looked up in chunked IN queries, then written with
+    bulk_create / bulk_update, one atomic block per chunk. import_frames_csv
+    calls this inside its per-batch transaction (so a batch commits
+    together with its progress); the chunk blocks are then savepoints and
+    the write lock is held for the whole batch, which QC_IMPORT_BATCH_SIZE
+    bounds.
+
+    Status changes on existing units go through
+    unit_status.IMPORT_TRANSITIONS as conditional updates (one per
+    from-status/version group), never a blind overwrite: a unit that is
+    being inspected, changed since it was read, or would become
+    STORE_READY with open rework keeps its row as it is and comes back in
+    "rejected" as {unit_id: reason}.
+
+    New units get their SLA deadline here (bulk_create skips pre_save); a
+    priority change re-stamps a running SLA clock.
+    """
+    batch_size = batch_size or getattr(settings, "QC_IMPORT_BATCH_SIZE", 1000)
+    unit_ids = list(rows)
+
+    policies = sla.load_policies()
+
+    created = updated = unchanged = 0
+    rejected = {}
+    for start in range(0, len(unit_ids), LOOKUP_CHUNK_SIZE):
+        chunk = unit_ids[start : start + LOOKUP_CHUNK_SIZE]
+        now = timezone.now()
+
+        with transaction.atomic():
+            existing = {
+                u.unit_id: u
+                for u in Unit.objects.filter(unit_id__in=chunk).only(
+                    "id", "unit_id", "version", "store", "received_at", "sla_alarm_at", *UPDATE_FIELDS
+                )
+            }
+
+            to_create = []
+            to_update = []
+            moves = {}
+            reindex = []
+            restamp = []
+            for unit_id in chunk:
+                values = rows[unit_id]
+                unit = existing.get(unit_id)
+                if unit is None:
+                    unit = Unit(unit_id=unit_id, **values)
+                    sla.stamp(unit, policies)
+                    to_create.append(unit)
+                    continue
+                if all(getattr(unit, f) == v for f, v in values.items()):
+                    unchanged += 1
+                    continue
+                if unit.status != values["status"]:
+                    if not unit_status.allowed(unit.status, values["status"], unit_status.IMPORT_TRANSITIONS):
+                        rejected[unit_id] = f"status is {unit.status}, can't be set to {values['status']} by import"
+                        continue
+                    moves.setdefault(values["status"], []).append(unit)
+                to_update.append(unit)
+
+            for to_status, units in moves.items():
+                rejected.update(_move(units, to_status))
+            to_update = [u for u in to_update if u.unit_id not in rejected]
+
+            for unit in to_update:
+                values = rows[unit.unit_id]
+                if unit.order_id != values["order_id"]:
+                    reindex.append(unit)
+                if unit.priority != values["priority"] and unit.sla_alarm_at is not None:
+                    restamp.append(unit)
+                for f in FIELD_UPDATES:
+                    setattr(unit, f, values[f])
+                unit.updated_at = now
+            for unit in restamp:
+                sla.stamp(unit, policies)
+
+            Unit.objects.bulk_create(to_create, batch_size=batch_size)
+            Unit.objects.bulk_update(to_update, FIELD_UPDATES + ["updated_at"], batch_size=batch_size)
+            Unit.objects.bulk_update(restamp, ["sla_deadline", "sla_alarm_at"], batch_size=batch_size)
+
+            # bulk writes skip post_save; keep the frames search index in step
+            unit_search.index_new_units(to_create)
+            unit_search.index_units((u.id, u.unit_id, u.order_id) for u in reindex)
+
+        created += len(to_create)
+        updated += len(to_update)
+
+    return {"created": created, "updated": updated, "unchanged": unchanged, "rejected": rejected}
+
+
+def _move(units: list[Unit], to_status: str) -> dict:
+    """Apply one status change to units, retrying without the ones that conflict."""
+    rejected = {}
+    while units:
+        try:
+            unit_status.transition_many(units, to_status, unit_status.IMPORT_TRANSITIONS)
+            break
+        except unit_status.StatusConflict as e:
+            rejected.update(e.errors)
+            units = [u for u in units if u.unit_id not in e.errors]
+    return rejected
+
+
+def import_frames_csv(
+    file_obj,
+    batch_size: int | None = None,
+    start_after_line: int = 0,
+    on_batch=None,
+) -> dict:
+    """
+    Create/update Units from an uploaded frames CSV, streaming.
+
+    CSV required headers:
+      unit_id,order_id,frame_model,lab,priority,status
+
+    `file_obj` is an UploadedFile or any binary file-like object. Rows are
+    validated as they stream in and flushed every `batch_size` valid rows,
+    so memory stays flat regardless of file size. Within a batch the last
+    row for a unit_id wins; across batches rows apply in file order.
+
+    Resumable imports (qc.services.import_jobs) pass:
+    - start_after_line: rows ending on or before this CSV line are skipped
+    - on_batch(progress): called inside each batch's transaction (and once
+      at the end) with the running totals, "line" of the last row read and
+      the "new_errors" since the previous call, so progress can be
+      committed together with the rows it describes.
+
+    Raises ValueError if the file can't be decoded or misses columns.
+    Invalid rows don't stop the import; they come back in "errors" as
+    {"line", "unit_id", "error"} dicts (first MAX_REPORTED_ERRORS of
+    "error_count"), as do rows whose status change was rejected (see
+    apply_rows).
+    """
+    batch_size = batch_size or getattr(settings, "QC_IMPORT_BATCH_SIZE", 1000)
+    reader = iter_csv_rows(iter_file_chunks(file_obj))
+
+    result = {"created": 0, "updated": 0, "unchanged": 0, "error_count": 0}
+    errors = []
+    reported = 0
+
+    def report(line: int, unit_id: str, error: str) -> None:
+        result["error_count"] += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({"line": line, "unit_id": unit_id, "error": error})
+
+    def flush(batch: dict) -> None:
+        nonlocal reported
+        with transaction.atomic():
+            applied = apply_rows(batch, batch_size=batch_size)
+            for unit_id, error in applied.pop("rejected").items():
+                report(lines[unit_id], unit_id, error)
+            for k, v in applied.items():
+                result[k] += v
+            if on_batch is not None:
+                on_batch({**result, "line": reader.line_num, "new_errors": errors[reported:]})
+                reported = len(errors)
+
+    batch = {}
+    lines = {}
+    for row in reader:
+        if reader.line_num <= start_after_line:
+            continue
+        try:
+            unit_id, values = clean_row(row)
+        except ValueError as e:
+            report(reader.line_num, (row.get("unit_id") or "").strip(), str(e))
+            continue
+
+        batch.pop(unit_id, None)  # keep file order for the last occurrence
+        batch[unit_id] = values
+        lines[unit_id] = reader.line_num
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch, lines = {}, {}
+
+    if batch or on_batch is not None:
+        flush(batch)
+
+    if result["created"] or result["updated"]:
+        metrics.mark_stale(*metrics.STATUS_SECTIONS)
+
+    result["errors"] = errors
+    return result
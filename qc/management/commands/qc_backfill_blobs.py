@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from qc.services.blobs import adopt_legacy_files
+
+
+class Command(BaseCommand):
+    help = "Move photo/attachment files saved before content addressing into the blob store"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Distinct file names per batch")
+
+    def handle(self, *args, **kwargs):
+        result = adopt_legacy_files(batch_size=kwargs["batch_size"])
+        self.stdout.write(f"Legacy files adopted ({result['adopted']} moved, {result['missing']} missing on disk)")
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from qc.services.inspections import backfill_unit_state
+
+
+class Command(BaseCommand):
+    help = "Fill Unit.last_attempt_number / last_inspection / last_result / first_pass from inspection history"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000, help="Units per batch")
+
+    def handle(self, *args, **kwargs):
+        updated = backfill_unit_state(batch_size=kwargs["batch_size"])
+        self.stdout.write(f"Unit current state backfilled ({updated} units)")
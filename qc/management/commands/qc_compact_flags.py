@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from qc.services.flags import compact_flags
+
+
+class Command(BaseCommand):
+    help = "Merge duplicate QualityFlag rows into one flag per episode (old rows kept as history)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100, help="Flag keys per transaction")
+
+    def handle(self, *args, **kwargs):
+        result = compact_flags(batch_size=kwargs["batch_size"])
+        self.stdout.write(f"QC flags compacted (merged {result['merged']} rows into {result['episodes']} flags)")
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from qc.services.uploads import expire_sessions
+
+
+class Command(BaseCommand):
+    help = "Expire chunked upload sessions that stopped receiving data and remove their part files"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int, default=24, help="Hours without a chunk before a session expires")
+
+    def handle(self, *args, **kwargs):
+        expired = expire_sessions(hours=kwargs["hours"])
+        self.stdout.write(f"Upload sessions expired: {expired}")
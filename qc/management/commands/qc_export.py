@@ -0,0 +1,47 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from qc.services.exports import EXPORTS, FORMATS, export_stream
+
+
+class Command(BaseCommand):
+    help = "Stream units / inspections / stage results / defects to CSV or JSONL (optionally gzipped)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=list(EXPORTS))
+        parser.add_argument("--format", choices=FORMATS, default="csv")
+        parser.add_argument("--since", type=date.fromisoformat, default=None, help="First day, YYYY-MM-DD")
+        parser.add_argument("--until", type=date.fromisoformat, default=None, help="Last day, YYYY-MM-DD")
+        parser.add_argument("--lab", default="", help="Only this lab")
+        parser.add_argument("--gzip", action="store_true", help="Compress the output on the fly")
+        parser.add_argument("--output", "-o", default="-", help="File to write (default stdout)")
+
+    def handle(self, *args, **kwargs):
+        try:
+            stream = export_stream(
+                kwargs["kind"],
+                kwargs["format"],
+                since=kwargs["since"],
+                until=kwargs["until"],
+                lab=kwargs["lab"],
+                gzip=kwargs["gzip"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        to_stdout = kwargs["output"] == "-"
+        out = sys.stdout.buffer if to_stdout else open(kwargs["output"], "wb")
+        written = 0
+        try:
+            for piece in stream:
+                out.write(piece)
+                written += len(piece)
+        finally:
+            if to_stdout:
+                out.flush()
+            else:
+                out.close()
+
+        if not to_stdout:
+            self.stdout.write(f"Exported {kwargs['kind']} to {kwargs['output']} ({written} bytes)")
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from qc.services.blobs import collect_garbage, recount_refs
+
+
+class Command(BaseCommand):
+    help = "Delete stored file blobs no photo/attachment references any more"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--grace", type=int, default=3600, help="Seconds a blob (or orphan file) must be unreferenced and untouched")
+        parser.add_argument("--recount", action="store_true", help="Recompute refcounts from the file fields first")
+
+    def handle(self, *args, **kwargs):
+        if kwargs["recount"]:
+            self.stdout.write(f"Refcounts corrected on {recount_refs()} blobs")
+        result = collect_garbage(grace_seconds=kwargs["grace"])
+        self.stdout.write(
+            f"Blobs collected ({result['removed']} removed, {result['orphans_removed']} orphan files, "
+            f"{result['bytes_freed']} bytes freed)"
+        )
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+from qc.services.import_jobs import LostJob, claim_next_job, run_import_job, worker_name
+
+
+class Command(BaseCommand):
+    help = "Run queued frames CSV import jobs (and resume ones whose worker died)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the queue once and exit")
+        parser.add_argument("--poll", type=float, default=2.0, help="Seconds between queue polls")
+
+    def handle(self, *args, **kwargs):
+        worker = worker_name()
+        while True:
+            job_id = claim_next_job(worker)
+            if job_id is None:
+                if kwargs["once"]:
+                    break
+                time.sleep(kwargs["poll"])
+                continue
+
+            try:
+                job = run_import_job(job_id, worker)
+            except LostJob:
+                self.stderr.write(f"Import job {job_id} was reclaimed by another worker; stopped")
+                continue
+            self.stdout.write(
+                f"Import job {job.id} {job.status}: created {job.created_count}, "
+                f"updated {job.updated_count}, errors {job.error_count}"
+            )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from qc.services.images import backfill_photos
+
+
+class Command(BaseCommand):
+    help = "Downscale, strip EXIF and thumbnail every unprocessed defect photo"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Parallel worker threads")
+
+    def handle(self, *args, **kwargs):
+        result = backfill_photos(workers=kwargs["workers"])
+        self.stdout.write(f"Defect photos processed ({result['processed']} done, {result['skipped']} skipped)")
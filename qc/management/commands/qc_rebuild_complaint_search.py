@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from qc.services.complaint_search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the complaint full-text index (SQLite FTS5; Postgres keeps its tsvector column itself)"
+
+    def handle(self, *args, **kwargs):
+        backend = rebuild_index()
+        self.stdout.write(f"Complaint search index rebuilt ({backend})")
@@ -0,0 +1,16 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from qc.services.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild DailyQualityRollup rows from raw inspections (whole history by default)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", type=date.fromisoformat, default=None, help="First day, YYYY-MM-DD")
+        parser.add_argument("--until", type=date.fromisoformat, default=None, help="Last day, YYYY-MM-DD (default today)")
+
+    def handle(self, *args, **kwargs):
+        written = rebuild_rollups(start=kwargs["since"], end=kwargs["until"])
+        self.stdout.write(f"Daily quality rollups rebuilt ({written} rows)")
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from qc.services.unit_search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the unit_id/order_id search index used by the Frames list"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000, help="Units per batch")
+
+    def handle(self, *args, **kwargs):
+        written = rebuild_index(batch_size=kwargs["batch_size"])
+        self.stdout.write(f"Unit search index rebuilt ({written} terms)")
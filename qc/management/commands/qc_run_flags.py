@@ -1,10 +1,47 @@
+import time
+
 from django.core.management.base import BaseCommand
-from qc.services.flags import refresh_quality_flags
+from qc.services.flags import DetectorConfig, refresh_quality_flags, replay_history
 
 
 class Command(BaseCommand):
-    help = "Run QC quality flag checks"
+    help = "Age out QC quality flags (schedule via cron, or keep running with --interval); --replay rebuilds detector state"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threshold", type=float, default=None, help="Defect rate %% that raises a flag")
+        parser.add_argument("--min-sample", type=float, default=None, help="Minimum decayed inspections per key")
+        parser.add_argument("--half-life", type=float, default=None, help="Detector half-life in days")
+        parser.add_argument(
+            "--replay",
+            action="store_true",
+            help="Recompute detector state from the full inspection history first",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Seconds between runs; 0 (default) runs once and exits",
+        )
 
     def handle(self, *args, **kwargs):
-        refresh_quality_flags()
-        self.stdout.write("QC flags refreshed")
+        config = DetectorConfig.from_settings(
+            threshold_percent=kwargs["threshold"],
+            min_sample=kwargs["min_sample"],
+            half_life_days=kwargs["half_life"],
+        )
+        if kwargs["replay"]:
+            result = replay_history(config=config)
+            self.stdout.write(
+                f"Detector state replayed ({result['states']} keys; "
+                f"opened {result['opened']}, updated {result['updated']}, closed {result['closed']})"
+            )
+
+        while True:
+            result = refresh_quality_flags(config=config)
+            self.stdout.write(
+                "QC flags refreshed "
+                f"(opened {result['opened']}, updated {result['updated']}, closed {result['closed']})"
+            )
+            if not kwargs["interval"]:
+                break
+            time.sleep(kwargs["interval"])
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+from qc.services.sla import emit_breaches
+
+
+class Command(BaseCommand):
+    help = "Record SLA breach events for units whose deadline has passed"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Emit due breaches once and exit")
+        parser.add_argument("--poll", type=float, default=60.0, help="Seconds between scheduler ticks")
+
+    def handle(self, *args, **kwargs):
+        while True:
+            emitted = emit_breaches()
+            if emitted or kwargs["once"]:
+                self.stdout.write(f"SLA breaches recorded: {emitted}")
+            if kwargs["once"]:
+                break
+            time.sleep(kwargs["poll"])
@@ -0,0 +1,148 @@
+# qc/middleware.py
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger("qc.requests")
+
+# upper edges (ms) of the latency histogram buckets; the last bucket is open
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+# statements kept per request for the slow-request log
+MAX_LOGGED_QUERIES = 200
+
+
+def _percentile(sorted_values: list, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    i = min(len(sorted_values) - 1, int(round(p / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[i]
+
+
+class RequestStats:
+    """
+    Rolling window of the last N samples per view name, kept in-process
+    (each worker process has its own).
+    """
+
+    FIELDS = ("queries", "db_ms", "app_ms", "total_ms", "bytes")
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._samples: dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, view: str, sample: dict) -> None:
+        with self._lock:
+            samples = self._samples.get(view)
+            if samples is None:
+                samples = self._samples[view] = deque(maxlen=self.window)
+            samples.append(tuple(sample[f] for f in self.FIELDS))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            data = {view: list(samples) for view, samples in self._samples.items()}
+
+        views = {}
+        for view, samples in sorted(data.items()):
+            summary = {"count": len(samples)}
+            for i, field in enumerate(self.FIELDS):
+                values = sorted(s[i] for s in samples)
+                summary[field] = {
+                    "p50": round(_percentile(values, 50), 2),
+                    "p95": round(_percentile(values, 95), 2),
+                    "max": round(values[-1], 2),
+                }
+
+            buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+            for s in samples:
+                total_ms = s[self.FIELDS.index("total_ms")]
+                buckets[next((b for b, edge in enumerate(LATENCY_BUCKETS_MS) if total_ms <= edge), -1)] += 1
+            summary["latency_histogram"] = {
+                **{f"le_{edge}": n for edge, n in zip(LATENCY_BUCKETS_MS, buckets)},
+                "inf": buckets[-1],
+            }
+            views[view] = summary
+
+        return {"window": self.window, "views": views}
+
+
+request_stats = RequestStats(getattr(settings, "QC_REQUEST_STATS_WINDOW", 500))
+
+
+class _QueryCollector:
+    """connection.execute_wrapper hook: counts and times every statement."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.seconds += elapsed
+            if len(self.statements) < MAX_LOGGED_QUERIES:
+                self.statements.append((round(elapsed * 1000.0, 2), sql))
+
+
+class QueryStatsMiddleware:
+    """
+    Per-view SQL count, DB time, app time (everything but the database:
+    view code, template rendering, middleware) and response size.
+    Samples go to `request_stats` (served at /health/metrics/, staff
+    only) and to the "qc.requests" logger as one JSON line per request.
+    Requests over QC_SLOW_REQUEST_QUERIES queries or QC_SLOW_REQUEST_MS
+    milliseconds are logged at WARNING with their SQL.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_queries = getattr(settings, "QC_SLOW_REQUEST_QUERIES", 50)
+        self.slow_ms = getattr(settings, "QC_SLOW_REQUEST_MS", 1000)
+
+    def __call__(self, request):
+        collector = _QueryCollector()
+        start = time.perf_counter()
+        with connection.execute_wrapper(collector):
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000.0
+
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            return response
+
+        db_ms = collector.seconds * 1000.0
+        sample = {
+            "queries": collector.count,
+            "db_ms": round(db_ms, 2),
+            "app_ms": round(max(0.0, total_ms - db_ms), 2),
+            "total_ms": round(total_ms, 2),
+            "bytes": 0 if response.streaming else len(response.content),
+        }
+        view = match.view_name or match._func_path
+        request_stats.record(view, sample)
+
+        line = {"view": view, "method": request.method, "status": response.status_code, **sample}
+        if collector.count > self.slow_queries or total_ms > self.slow_ms:
+            line["path"] = request.path
+            line["sql"] = [{"ms": ms, "sql": sql} for ms, sql in collector.statements]
+            logger.warning(json.dumps(line))
+        else:
+            logger.info(json.dumps(line))
+        return response
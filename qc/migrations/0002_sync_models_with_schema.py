@@ -0,0 +1,269 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:46
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qc', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Defect',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(default='UNKNOWN', max_length=100)),
+                ('reason_code', models.CharField(default='UNKNOWN', max_length=100)),
+                ('severity', models.CharField(choices=[('LOW', 'Low'), ('MED', 'Medium'), ('HIGH', 'High')], default='LOW', max_length=10)),
+                ('notes', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.RemoveField(
+            model_name='framevariant',
+            name='style',
+        ),
+        migrations.RemoveField(
+            model_name='complaint',
+            name='variant',
+        ),
+        migrations.AlterModelOptions(
+            name='complaint',
+            options={'ordering': ['-created_at']},
+        ),
+        migrations.AlterModelOptions(
+            name='store',
+            options={'ordering': ['name']},
+        ),
+        migrations.RemoveField(
+            model_name='complaint',
+            name='failure_type',
+        ),
+        migrations.RemoveField(
+            model_name='complaint',
+            name='notes',
+        ),
+        migrations.RemoveField(
+            model_name='complaint',
+            name='severity',
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='category',
+            field=models.CharField(choices=[('OTHER', 'Other'), ('LENS', 'Lens'), ('FRAME', 'Frame'), ('COSMETIC', 'Cosmetic'), ('FIT', 'Fit'), ('RX', 'RX'), ('SHIPPING', 'Shipping')], default='OTHER', max_length=30),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='complaints_created', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='description',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='order_id_text',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='resolution_notes',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='resolved_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='resolved_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='complaints_resolved', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='status',
+            field=models.CharField(choices=[('OPEN', 'Open'), ('IN_PROGRESS', 'In Progress'), ('RESOLVED', 'Resolved'), ('CLOSED', 'Closed')], default='OPEN', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='title',
+            field=models.CharField(default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='unit_id_text',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='store',
+            name='code',
+            field=models.CharField(default='DEFAULT', max_length=50, unique=True),
+        ),
+        migrations.AddField(
+            model_name='store',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='store',
+            name='is_active',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name='complaint',
+            name='store',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='qc.store'),
+        ),
+        migrations.AlterField(
+            model_name='store',
+            name='name',
+            field=models.CharField(max_length=255),
+        ),
+        migrations.CreateModel(
+            name='ComplaintAttachment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(upload_to='complaint_attachments/')),
+                ('note', models.TextField(blank=True, default='')),
+                ('uploaded_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('complaint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attachments', to='qc.complaint')),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='complaint_attachments', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-uploaded_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DefectPhoto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.ImageField(upload_to='defect_photos/')),
+                ('annotation_json', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('defect', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='photos', to='qc.defect')),
+            ],
+            options={
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Inspection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempt_number', models.PositiveIntegerField(default=1)),
+                ('training_mode_used', models.BooleanField(default=False)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('final_result', models.CharField(blank=True, choices=[('PASS', 'Pass'), ('FAIL', 'Fail')], default='', max_length=10)),
+                ('tech_user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='qc_inspections', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='InspectionStageResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stage', models.CharField(choices=[('INTAKE', 'Intake'), ('COSMETIC', 'Cosmetic'), ('FIT', 'Fit'), ('DECISION', 'Decision')], max_length=20)),
+                ('status', models.CharField(choices=[('PASS', 'Pass'), ('FAIL', 'Fail')], default='PASS', max_length=10)),
+                ('notes', models.TextField(blank=True, default='')),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('inspection', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stage_results', to='qc.inspection')),
+            ],
+            options={
+                'ordering': ['inspection_id', 'stage'],
+                'unique_together': {('inspection', 'stage')},
+            },
+        ),
+        migrations.AddField(
+            model_name='defect',
+            name='stage_result',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='defects', to='qc.inspectionstageresult'),
+        ),
+        migrations.CreateModel(
+            name='QualityFlag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('flag_type', models.CharField(choices=[('MODEL', 'Model'), ('LAB', 'Lab')], max_length=20)),
+                ('flag_key', models.CharField(max_length=255)),
+                ('window_start', models.DateTimeField()),
+                ('window_end', models.DateTimeField()),
+                ('sample_size', models.PositiveIntegerField(default=0)),
+                ('defect_rate', models.FloatField(default=0.0)),
+                ('threshold', models.FloatField(default=10.0)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['flag_type', 'flag_key'], name='qc_qualityf_flag_ty_df0a7f_idx'), models.Index(fields=['window_start', 'window_end'], name='qc_qualityf_window__dbf71d_idx'), models.Index(fields=['is_active'], name='qc_qualityf_is_acti_a81ac5_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Unit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unit_id', models.CharField(max_length=64, unique=True)),
+                ('order_id', models.CharField(blank=True, max_length=64, null=True)),
+                ('frame_model', models.CharField(blank=True, default='', max_length=255)),
+                ('lab', models.CharField(blank=True, default='', max_length=255)),
+                ('priority', models.CharField(choices=[('NORMAL', 'Normal'), ('URGENT', 'Urgent')], default='NORMAL', max_length=20)),
+                ('status', models.CharField(choices=[('RECEIVED', 'Received'), ('QC_IN_PROGRESS', 'QC In Progress'), ('STORE_READY', 'Store Ready'), ('REWORK', 'Rework'), ('QUARANTINE', 'Quarantine'), ('RETEST', 'Retest')], default='RECEIVED', max_length=30)),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('store', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='qc.store')),
+            ],
+            options={
+                'ordering': ['-received_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReworkTicket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('failed_stage', models.CharField(default='COSMETIC', max_length=20)),
+                ('reason_summary', models.TextField(default='Failed QC')),
+                ('status', models.CharField(choices=[('OPEN', 'Open'), ('IN_PROGRESS', 'In Progress'), ('DONE', 'Done'), ('CLOSED', 'Closed')], default='OPEN', max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('assigned_to', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='rework_assigned', to=settings.AUTH_USER_MODEL)),
+                ('inspection', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='rework_tickets', to='qc.inspection')),
+                ('unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rework_tickets', to='qc.unit')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='unit',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inspections', to='qc.unit'),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='unit',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='qc.unit'),
+        ),
+        migrations.DeleteModel(
+            name='Attachment',
+        ),
+        migrations.DeleteModel(
+            name='FrameStyle',
+        ),
+        migrations.DeleteModel(
+            name='FrameVariant',
+        ),
+    ]
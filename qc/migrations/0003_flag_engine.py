@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qc', '0002_sync_models_with_schema'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlagEngineState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(default='default', max_length=50, unique=True)),
+                ('watermark', models.DateTimeField(blank=True, null=True)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FlagCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('flag_type', models.CharField(choices=[('MODEL', 'Model'), ('LAB', 'Lab')], max_length=20)),
+                ('flag_key', models.CharField(max_length=255)),
+                ('day', models.DateField()),
+                ('inspections', models.PositiveIntegerField(default=0)),
+                ('failures', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-day', 'flag_type', 'flag_key'],
+                'indexes': [models.Index(fields=['day'], name='qc_flagcoun_day_5ea3fd_idx')],
+                'unique_together': {('flag_type', 'flag_key', 'day')},
+            },
+        ),
+    ]
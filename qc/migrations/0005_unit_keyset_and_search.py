@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qc', '0004_import_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnitSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='unit',
+            index=models.Index(fields=['-received_at', '-id'], name='qc_unit_recv_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unit',
+            index=models.Index(fields=['status', '-received_at', '-id'], name='qc_unit_status_keyset_idx'),
+        ),
+        migrations.AddField(
+            model_name='unitsearchterm',
+            name='unit',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='qc.unit'),
+        ),
+        migrations.AddIndex(
+            model_name='unitsearchterm',
+            index=models.Index(fields=['term', 'unit'], name='qc_unitsear_term_98eb61_idx'),
+        ),
+    ]
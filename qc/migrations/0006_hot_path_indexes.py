@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qc', '0005_unit_keyset_and_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inspection',
+            index=models.Index(fields=['completed_at', 'started_at'], name='qc_insp_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inspection',
+            index=models.Index(fields=['attempt_number', 'completed_at', 'final_result'], name='qc_insp_fpy_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inspection',
+            index=models.Index(fields=['final_result', 'completed_at'], name='qc_insp_result_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inspection',
+            index=models.Index(fields=['unit', '-attempt_number'], name='qc_insp_unit_attempt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unit',
+            index=models.Index(fields=['priority', 'received_at', 'status'], name='qc_unit_prio_recv_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unit',
+            index=models.Index(fields=['lab', 'frame_model'], name='qc_unit_lab_model_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unit',
+            index=models.Index(fields=['frame_model'], name='qc_unit_model_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qc', '0006_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='unit',
+            name='first_pass',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='unit',
+            name='last_attempt_number',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='unit',
+            name='last_inspection',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='qc.inspection'),
+        ),
+        migrations.AddField(
+            model_name='unit',
+            name='last_result',
+            field=models.CharField(blank=True, default='', max_length=10),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qc', '0007_unit_current_state'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyQualityRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('lab', models.CharField(blank=True, default='', max_length=255)),
+                ('frame_model', models.CharField(blank=True, default='', max_length=255)),
+                ('inspections', models.PositiveIntegerField(default=0)),
+                ('failures', models.PositiveIntegerField(default=0)),
+                ('first_attempts', models.PositiveIntegerField(default=0)),
+                ('first_attempt_passes', models.PositiveIntegerField(default=0)),
+                ('defects_low', models.PositiveIntegerField(default=0)),
+                ('defects_med', models.PositiveIntegerField(default=0)),
+                ('defects_high', models.PositiveIntegerField(default=0)),
+                ('qc_seconds', models.FloatField(default=0.0)),
+                ('store', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='qc.store')),
+                ('tech_user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-day', 'lab', 'frame_model'],
+            },
+        ),
+        migrations.DeleteModel(
+            name='FlagCounter',
+        ),
+        migrations.RemoveField(
+            model_name='flagenginestate',
+            name='watermark',
+        ),
+        migrations.AddIndex(
+            model_name='dailyqualityrollup',
+            index=models.Index(fields=['day'], name='qc_dailyqua_day_188e42_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailyqualityrollup',
+            unique_together={('day', 'lab', 'frame_model', 'store', 'tech_user')},
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qc', '0008_daily_quality_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlagDetectorState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('flag_type', models.CharField(choices=[('MODEL', 'Model'), ('LAB', 'Lab')], max_length=20)),
+                ('flag_key', models.CharField(max_length=255)),
+                ('weight', models.FloatField(default=0.0)),
+                ('failures', models.FloatField(default=0.0)),
+                ('last_event_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'unique_together': {('flag_type', 'flag_key')},
+            },
+        ),
+        migrations.DeleteModel(
+            name='FlagEngineState',
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def deactivate_duplicate_active_flags(apps, schema_editor):
+    """
+    Keep only the newest active flag per (flag_type, flag_key) so the
+    conditional unique constraint can be created.
+    """
+    QualityFlag = apps.get_model("qc", "QualityFlag")
+    now = django.utils.timezone.now()
+    dupes = (
+        QualityFlag.objects.filter(is_active=True)
+        .values("flag_type", "flag_key")
+        .annotate(n=Count("id"))
+        .filter(n__gt=1)
+        .order_by()
+    )
+    for row in dupes:
+        active = QualityFlag.objects.filter(is_active=True, flag_type=row["flag_type"], flag_key=row["flag_key"])
+        keep = active.order_by("-created_at", "-id").values_list("id", flat=True).first()
+        active.exclude(id=keep).update(is_active=False, closed_at=now)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qc', '0009_flag_detector_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QualityFlagHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window_start', models.DateTimeField()),
+                ('window_end', models.DateTimeField()),
+                ('sample_size', models.PositiveIntegerField(default=0)),
+                ('defect_rate', models.FloatField(default=0.0)),
+                ('threshold', models.FloatField(default=10.0)),
+                ('was_active', models.BooleanField(default=False)),
+                ('recorded_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['flag_id', 'recorded_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='qualityflag',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='qualityflag',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(deactivate_duplicate_active_flags, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='qualityflag',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('flag_type', 'flag_key'), name='qc_flag_one_active_per_key'),
+        ),
+        migrations.AddField(
+            model_name='qualityflaghistory',
+            name='flag',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='history', to='qc.qualityflag'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qc', '0010_quality_flag_lifecycle'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='defectphoto',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='defectphoto',
+            name='thumbnail',
+            field=models.ImageField(blank=True, default='', upload_to='defect_photos/thumbs/'),
+        ),
+    ]
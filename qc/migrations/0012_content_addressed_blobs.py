@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:12
+
+import django.utils.timezone
+import qc.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qc', '0011_defect_photo_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='complaintattachment',
+            name='file',
+            field=models.FileField(storage=qc.storage.content_addressed_storage, upload_to='complaint_attachments/'),
+        ),
+        migrations.AlterField(
+            model_name='defectphoto',
+            name='image',
+            field=models.ImageField(storage=qc.storage.content_addressed_storage, upload_to='defect_photos/'),
+        ),
+        migrations.AlterField(
+            model_name='defectphoto',
+            name='thumbnail',
+            field=models.ImageField(blank=True, default='', storage=qc.storage.content_addressed_storage, upload_to='defect_photos/thumbs/'),
+        ),
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('refcount', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('touched_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['refcount', 'touched_at'], name='qc_storedbl_refcoun_821209_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+# SQLite: external-content FTS5 table over qc_complaint, kept in sync by triggers.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE qc_complaint_fts USING fts5(
+        title, description, unit_id_text, order_id_text,
+        content='qc_complaint', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER qc_complaint_fts_ai AFTER INSERT ON qc_complaint BEGIN
+        INSERT INTO qc_complaint_fts(rowid, title, description, unit_id_text, order_id_text)
+        VALUES (new.id, new.title, new.description, new.unit_id_text, new.order_id_text);
+    END
+    """,
+    """
+    CREATE TRIGGER qc_complaint_fts_ad AFTER DELETE ON qc_complaint BEGIN
+        INSERT INTO qc_complaint_fts(qc_complaint_fts, rowid, title, description, unit_id_text, order_id_text)
+        VALUES ('delete', old.id, old.title, old.description, old.unit_id_text, old.order_id_text);
+    END
+    """,
+    """
+    CREATE TRIGGER qc_complaint_fts_au AFTER UPDATE OF title, description, unit_id_text, order_id_text
+    ON qc_complaint BEGIN
+        INSERT INTO qc_complaint_fts(qc_complaint_fts, rowid, title, description, unit_id_text, order_id_text)
+        VALUES ('delete', old.id, old.title, old.description, old.unit_id_text, old.order_id_text);
+        INSERT INTO qc_complaint_fts(rowid, title, description, unit_id_text, order_id_text)
+        VALUES (new.id, new.title, new.description, new.unit_id_text, new.order_id_text);
+    END
+    """,
+    "INSERT INTO qc_complaint_fts(qc_complaint_fts) VALUES ('rebuild')",
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS qc_complaint_fts_au",
+    "DROP TRIGGER IF EXISTS qc_complaint_fts_ad",
+    "DROP TRIGGER IF EXISTS qc_complaint_fts_ai",
+    "DROP TABLE IF EXISTS qc_complaint_fts",
+]
+
+# Postgres: generated tsvector column (always in sync, no triggers) + GIN index.
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE qc_complaint ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(unit_id_text, '') || ' ' || coalesce(order_id_text, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX qc_complaint_search_gin ON qc_complaint USING GIN (search_vector)",
+]
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS qc_complaint_search_gin",
+    "ALTER TABLE qc_complaint DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for sql in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qc', '0013_upload_sessions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['-created_at', '-id'], name='qc_complaint_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='qc_complaint_status_idx'),
+        ),
+        # vendor-specific; other backends fall back to icontains (see qc.services.complaint_search)
+        migrations.RunPython(
+            _run({"sqlite": SQLITE_FORWARD, "postgresql": POSTGRES_FORWARD}),
+            _run({"sqlite": SQLITE_REVERSE, "postgresql": POSTGRES_REVERSE}),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qc', '0015_inspection_submissions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='unit',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qc', '0016_unit_status_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='unit',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='unit',
+            name='claimed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='unit',
+            name='queue_rank',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(priority='URGENT', status__in=('RECEIVED', 'RETEST'), then=models.Value(0)), models.When(status__in=('RECEIVED', 'RETEST'), then=models.Value(1)), default=None), output_field=models.PositiveSmallIntegerField(null=True)),
+        ),
+        migrations.AddIndex(
+            model_name='unit',
+            index=models.Index(fields=['queue_rank', 'received_at', 'id'], name='qc_unit_queue_idx'),
+        ),
+    ]
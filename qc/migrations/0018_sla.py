@@ -0,0 +1,118 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:43
+
+from datetime import timedelta
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def stamp_deadlines(apps, schema_editor):
+    """
+    Deadline = received_at + QC_SLA_HOURS[priority]. The alarm is only
+    armed where the deadline is still ahead, so the first scheduler tick
+    isn't flooded; 0023 records the events of units already overdue.
+    """
+    Unit = apps.get_model("qc", "Unit")
+    hours = getattr(settings, "QC_SLA_HOURS", {})
+    now = django.utils.timezone.now()
+    for priority in Unit.objects.values_list("priority", flat=True).distinct().order_by():
+        deadline = F("received_at") + timedelta(hours=hours.get(priority, 48))
+        units = Unit.objects.filter(priority=priority)
+        units.update(sla_deadline=deadline)
+        units.exclude(status="STORE_READY").filter(sla_deadline__gt=now).update(sla_alarm_at=F("sla_deadline"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qc', '0017_work_queue'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlaBreachEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('priority', models.CharField(max_length=20)),
+                ('status', models.CharField(max_length=30)),
+                ('deadline', models.DateTimeField()),
+                ('detected_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-deadline', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SlaPolicy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('priority', models.CharField(choices=[('NORMAL', 'Normal'), ('URGENT', 'Urgent')], max_length=20)),
+                ('hours', models.PositiveIntegerField()),
+            ],
+            options={
+                'ordering': ['priority', 'store__code'],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='unit',
+            name='qc_unit_prio_recv_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='unit',
+            name='qc_unit_queue_idx',
+        ),
+        migrations.AddField(
+            model_name='unit',
+            name='sla_alarm_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='unit',
+            name='sla_deadline',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(stamp_deadlines, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='unit',
+            index=models.Index(fields=['queue_rank', 'sla_deadline', 'received_at', 'id'], name='qc_unit_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unit',
+            index=models.Index(fields=['sla_alarm_at'], name='qc_unit_sla_alarm_idx'),
+        ),
+        migrations.AddField(
+            model_name='slabreachevent',
+            name='store',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='qc.store'),
+        ),
+        migrations.AddField(
+            model_name='slabreachevent',
+            name='unit',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sla_breach', to='qc.unit'),
+        ),
+        migrations.AddField(
+            model_name='slapolicy',
+            name='store',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sla_policies', to='qc.store'),
+        ),
+        migrations.AddIndex(
+            model_name='slabreachevent',
+            index=models.Index(fields=['-deadline', '-id'], name='qc_sla_breach_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='slabreachevent',
+            index=models.Index(fields=['priority', 'unit'], name='qc_sla_breach_prio_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='slapolicy',
+            constraint=models.UniqueConstraint(fields=('priority', 'store'), name='qc_sla_policy_store_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='slapolicy',
+            constraint=models.UniqueConstraint(condition=models.Q(('store__isnull', True)), fields=('priority',), name='qc_sla_policy_default_uniq'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:08
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+COUNTER_FIELDS = (
+    "inspections",
+    "failures",
+    "first_attempts",
+    "first_attempt_passes",
+    "defects_low",
+    "defects_med",
+    "defects_high",
+    "qc_seconds",
+)
+
+
+def merge_duplicate_keys(apps, schema_editor):
+    """
+    Fold rows that share a (day, lab, frame_model, store, tech_user) key
+    with NULLs (which the old unique_together let through) into one.
+    """
+    DailyQualityRollup = apps.get_model("qc", "DailyQualityRollup")
+    key = ("day", "lab", "frame_model", "store_id", "tech_user_id")
+    dupes = DailyQualityRollup.objects.values(*key).annotate(n=Count("id")).filter(n__gt=1).order_by()
+    for row in dupes:
+        rows = DailyQualityRollup.objects.filter(**{k: row[k] for k in key})
+        totals = rows.aggregate(**{f: Sum(f) for f in COUNTER_FIELDS})
+        keep = rows.order_by("id").values_list("id", flat=True).first()
+        rows.exclude(id=keep).delete()
+        DailyQualityRollup.objects.filter(id=keep).update(**totals)
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qc', '0018_sla'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='dailyqualityrollup',
+            unique_together=set(),
+        ),
+        migrations.RunPython(merge_duplicate_keys, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dailyqualityrollup',
+            constraint=models.UniqueConstraint(models.F('day'), models.F('lab'), models.F('frame_model'), django.db.models.functions.comparison.Coalesce('store', models.Value(0), output_field=models.BigIntegerField()), django.db.models.functions.comparison.Coalesce('tech_user', models.Value(0), output_field=models.BigIntegerField()), name='qc_rollup_key_uniq'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+# Postgres: the default collation isn't bytewise, so the term prefix match
+# is a LIKE 'q%', which only a pattern_ops index can serve. SQLite keeps
+# using the (term, unit) index with a range scan.
+POSTGRES_FORWARD = [
+    "CREATE INDEX qc_unit_term_prefix_idx ON qc_unitsearchterm (term varchar_pattern_ops, unit_id)",
+]
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS qc_unit_term_prefix_idx",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for sql in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qc', '0019_rollup_key_nulls'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({"postgresql": POSTGRES_FORWARD}),
+            _run({"postgresql": POSTGRES_REVERSE}),
+        ),
+    ]
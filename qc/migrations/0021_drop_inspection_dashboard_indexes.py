@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:17
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qc', '0020_unit_term_prefix_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='inspection',
+            name='qc_insp_completed_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='inspection',
+            name='qc_insp_fpy_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='inspection',
+            name='qc_insp_result_idx',
+        ),
+    ]
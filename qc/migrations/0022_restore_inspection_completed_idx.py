@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qc', '0021_drop_inspection_dashboard_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inspection',
+            index=models.Index(fields=['completed_at', 'started_at'], name='qc_insp_completed_idx'),
+        ),
+    ]
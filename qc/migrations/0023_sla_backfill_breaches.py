@@ -0,0 +1,48 @@
+from django.db import migrations
+from django.utils import timezone
+
+BATCH_SIZE = 500
+
+
+def record_overdue_breaches(apps, schema_editor):
+    """
+    0018 only armed alarms for deadlines still ahead, so units already
+    overdue and open when it ran never got a breach event and fell out
+    of urgent_sla_breaches. Record their events here in batches instead
+    of arming alarms for the first scheduler tick to flood in.
+    """
+    Unit = apps.get_model("qc", "Unit")
+    SlaBreachEvent = apps.get_model("qc", "SlaBreachEvent")
+    now = timezone.now()
+    overdue = (
+        Unit.objects.exclude(status="STORE_READY")
+        .filter(sla_alarm_at__isnull=True, sla_deadline__lte=now, sla_breach__isnull=True)
+        .order_by("id")
+        .values_list("id", "priority", "store_id", "status", "sla_deadline")
+    )
+    last_id = 0
+    while True:
+        rows = list(overdue.filter(id__gt=last_id)[:BATCH_SIZE])
+        if not rows:
+            break
+        SlaBreachEvent.objects.bulk_create(
+            [
+                SlaBreachEvent(
+                    unit_id=unit_id, priority=priority, store_id=store_id, status=status, deadline=deadline, detected_at=now
+                )
+                for unit_id, priority, store_id, status, deadline in rows
+            ],
+            ignore_conflicts=True,
+        )
+        last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qc', '0022_restore_inspection_completed_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(record_overdue_breaches, migrations.RunPython.noop),
+    ]
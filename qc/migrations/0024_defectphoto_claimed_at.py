@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qc', '0023_sla_backfill_breaches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='defectphoto',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def backfill_rollups(apps, schema_editor):
+    """
+    Rollups were only filled as inspections were finalized, so a database
+    deployed with inspection history showed FPY 0 until someone ran
+    qc_rebuild_rollups. Build them once here from the raw inspections.
+    """
+    from qc.services.rollups import rebuild_rollups
+
+    rebuild_rollups(apps=apps)
+
+
+class Migration(migrations.Migration):
+    # rebuild_rollups commits each pass of days on its own
+    atomic = False
+
+    dependencies = [
+        ('qc', '0024_defectphoto_claimed_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
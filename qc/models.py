@@ -3,8 +3,12 @@ from __future__ import annotations
 
 from django.conf import settings
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
+from .storage import content_addressed_storage
+
 
 # =============================================================================
 # Store
@@ -40,6 +44,9 @@ class Unit(models.Model):
         ("RETEST", "Retest"),
     ]
 
+    # statuses waiting at the QC bench (served by qc.services.work_queue)
+    QUEUE_STATUSES = ("RECEIVED", "RETEST")
+
     unit_id = models.CharField(max_length=64, unique=True)
     order_id = models.CharField(max_length=64, blank=True, null=True)
 
@@ -48,6 +55,8 @@ class Unit(models.Model):
 
     priority = models.CharField(max_length=20, choices=PRIORITY_CHOICES, default="NORMAL")
     status = models.CharField(max_length=30, choices=STATUS_CHOICES, default="RECEIVED")
+    # bumped by every status change (qc.services.unit_status); writers check it
+    version = models.PositiveIntegerField(default=0)
 
     # Optional link to store (safe if you want it; null OK)
     store = models.ForeignKey(Store, on_delete=models.SET_NULL, null=True, blank=True)
@@ -55,12 +64,192 @@ class Unit(models.Model):
     received_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Current-state columns, maintained by qc.services.inspections
+    # (backfill: manage.py qc_backfill_unit_state)
+    last_attempt_number = models.PositiveIntegerField(default=0)
+    last_inspection = models.ForeignKey(
+        "Inspection", on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    last_result = models.CharField(max_length=10, blank=True, default="")
+    first_pass = models.BooleanField(null=True, blank=True)
+
+    # Work queue: 0 = URGENT, 1 = NORMAL while waiting for QC, NULL otherwise.
+    # Computed by the database so bulk writes can't leave it stale.
+    queue_rank = models.GeneratedField(
+        expression=models.Case(
+            models.When(status__in=QUEUE_STATUSES, priority="URGENT", then=models.Value(0)),
+            models.When(status__in=QUEUE_STATUSES, then=models.Value(1)),
+            default=None,
+        ),
+        output_field=models.PositiveSmallIntegerField(null=True),
+        db_persist=True,
+    )
+    claimed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    # SLA (qc.services.sla): the deadline is stamped when the unit is received;
+    # sla_alarm_at is the same instant while the clock runs and is cleared
+    # once a breach is recorded or the unit is STORE_READY.
+    sla_deadline = models.DateTimeField(null=True, blank=True)
+    sla_alarm_at = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         ordering = ["-received_at"]
+        indexes = [
+            # next units for the bench: queue_rank IS NOT NULL, in queue order
+            models.Index(fields=["queue_rank", "sla_deadline", "received_at", "id"], name="qc_unit_queue_idx"),
+            # SLA scheduler: sla_alarm_at <= now, only units whose clock runs
+            models.Index(fields=["sla_alarm_at"], name="qc_unit_sla_alarm_idx"),
+            # keyset pagination of frames_list: (received_at, id) desc, optionally per status
+            models.Index(fields=["-received_at", "-id"], name="qc_unit_recv_keyset_idx"),
+            models.Index(fields=["status", "-received_at", "-id"], name="qc_unit_status_keyset_idx"),
+            models.Index(fields=["lab", "frame_model"], name="qc_unit_lab_model_idx"),
+            models.Index(fields=["frame_model"], name="qc_unit_model_idx"),
+        ]
 
     def __str__(self) -> str:
         return self.unit_id
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        unit = super().from_db(db, field_names, values)
+        # what the search index holds; saves that keep it skip reindexing
+        unit._search_key = (unit.__dict__.get("unit_id"), unit.__dict__.get("order_id"))
+        return unit
+
+
+class UnitSearchTerm(models.Model):
+    """
+    Lookup table behind the frames search: every suffix of the lowercased
+    unit_id and order_id, so "contains q" becomes an indexed prefix match
+    on `term`: a bytewise range on SQLite, LIKE 'q%' over a
+    varchar_pattern_ops index on Postgres. Maintained by
+    qc.services.unit_search.
+    """
+
+    unit = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name="search_terms")
+    term = models.CharField(max_length=64)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["term", "unit"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.term} -> {self.unit_id}"
+
+
+# =============================================================================
+# SLA
+# =============================================================================
+class SlaPolicy(models.Model):
+    """
+    QC turnaround allowed for a priority, at one store or (store empty)
+    everywhere. Without a policy the QC_SLA_HOURS setting applies.
+    """
+
+    priority = models.CharField(max_length=20, choices=Unit.PRIORITY_CHOICES)
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, null=True, blank=True, related_name="sla_policies")
+    hours = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ["priority", "store__code"]
+        constraints = [
+            models.UniqueConstraint(fields=["priority", "store"], name="qc_sla_policy_store_uniq"),
+            models.UniqueConstraint(
+                fields=["priority"], condition=models.Q(store__isnull=True), name="qc_sla_policy_default_uniq"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.priority} @ {self.store.code if self.store else 'all stores'}: {self.hours}h"
+
+
+class SlaBreachEvent(models.Model):
+    """
+    A unit that was not STORE_READY by its SLA deadline. One per unit,
+    written by qc.services.sla.emit_breaches.
+    """
+
+    unit = models.OneToOneField(Unit, on_delete=models.CASCADE, related_name="sla_breach")
+    priority = models.CharField(max_length=20)
+    store = models.ForeignKey(Store, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    status = models.CharField(max_length=30)  # unit status when the breach was detected
+    deadline = models.DateTimeField()
+    detected_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-deadline", "-id"]
+        indexes = [
+            models.Index(fields=["-deadline", "-id"], name="qc_sla_breach_recent_idx"),
+            # open-breach counts per priority join to the unit from here
+            models.Index(fields=["priority", "unit"], name="qc_sla_breach_prio_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"SLA breach {self.unit_id} ({self.priority}, due {self.deadline:%Y-%m-%d %H:%M})"
+
+
+# =============================================================================
+# Import jobs (frames CSV)
+# =============================================================================
+class ImportJob(models.Model):
+    """
+    A spooled frames CSV import, run outside the request by
+    qc.services.import_jobs. Progress columns are committed together with
+    each batch of rows, so a crashed job resumes after `last_committed_line`.
+    """
+
+    STATUS_CHOICES = [
+        ("QUEUED", "Queued"),
+        ("RUNNING", "Running"),
+        ("DONE", "Done"),
+        ("FAILED", "Failed"),
+    ]
+
+    file = models.FileField(upload_to="import_jobs/")
+    original_name = models.CharField(max_length=255, blank=True, default="")
+    file_size = models.PositiveBigIntegerField(default=0)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="QUEUED")
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="import_jobs",
+    )
+
+    last_committed_line = models.PositiveIntegerField(default=0)
+    bytes_processed = models.PositiveBigIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    updated_count = models.PositiveIntegerField(default=0)
+    unchanged_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    message = models.TextField(blank=True, default="")
+
+    worker = models.CharField(max_length=100, blank=True, default="")
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+    @property
+    def rows_processed(self) -> int:
+        return self.created_count + self.updated_count + self.unchanged_count + self.error_count
+
+    def __str__(self) -> str:
+        return f"ImportJob {self.id} ({self.original_name}, {self.status})"
+
 
 # =============================================================================
 # Inspection
@@ -90,6 +279,12 @@ class Inspection(models.Model):
 
     class Meta:
         ordering = ["-started_at"]
+        indexes = [
+            # completed_at ranges: rollup rebuilds, defect_counts, flag replay
+            models.Index(fields=["completed_at", "started_at"], name="qc_insp_completed_idx"),
+            # next attempt number for a unit
+            models.Index(fields=["unit", "-attempt_number"], name="qc_insp_unit_attempt_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"Inspection {self.id} ({self.unit.unit_id}) Attempt {self.attempt_number}"
@@ -156,10 +351,19 @@ class Defect(models.Model):
 
 class DefectPhoto(models.Model):
     defect = models.ForeignKey(Defect, on_delete=models.CASCADE, related_name="photos")
-    image = models.ImageField(upload_to="defect_photos/")
+    image = models.ImageField(upload_to="defect_photos/", storage=content_addressed_storage)
     annotation_json = models.JSONField(null=True, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
 
+    # Filled by qc.services.images after upload: `image` is replaced by a
+    # downscaled, EXIF-free re-encode and `thumbnail` is added.
+    thumbnail = models.ImageField(
+        upload_to="defect_photos/thumbs/", storage=content_addressed_storage, blank=True, default=""
+    )
+    processed_at = models.DateTimeField(null=True, blank=True)
+    # set by the worker processing it; lapses after QC_PHOTO_CLAIM_MINUTES
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         ordering = ["-id"]
 
@@ -205,6 +409,33 @@ class ReworkTicket(models.Model):
         return f"ReworkTicket {self.id} ({self.unit.unit_id})"
 
 
+# =============================================================================
+# Batched (offline) inspection submissions
+# =============================================================================
+class InspectionSubmission(models.Model):
+    """
+    One applied batch from a bench tablet, keyed by the client-generated
+    key so a retried upload is answered from `response` instead of
+    being applied twice (see qc.services.submissions).
+    """
+
+    client_key = models.CharField(max_length=64, unique=True)
+    inspection = models.ForeignKey(Inspection, on_delete=models.CASCADE, related_name="submissions")
+    submitted_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    actions = models.PositiveIntegerField(default=0)
+    response = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self) -> str:
+        return f"Submission {self.client_key} (inspection {self.inspection_id})"
+
+
 # =============================================================================
 # Quality flags
 # =============================================================================
@@ -224,8 +455,11 @@ class QualityFlag(models.Model):
     defect_rate = models.FloatField(default=0.0)
     threshold = models.FloatField(default=10.0)
 
+    # lifecycle: opened (created_at) -> updated in place -> closed
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(default=timezone.now)
+    closed_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ["-created_at"]
@@ -234,11 +468,121 @@ class QualityFlag(models.Model):
             models.Index(fields=["window_start", "window_end"]),
             models.Index(fields=["is_active"]),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["flag_type", "flag_key"],
+                condition=models.Q(is_active=True),
+                name="qc_flag_one_active_per_key",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.flag_type}:{self.flag_key} ({self.defect_rate:.1f}%)"
 
 
+class QualityFlagHistory(models.Model):
+    """
+    Snapshot of a duplicate QualityFlag row folded into `flag` by
+    `manage.py qc_compact_flags`.
+    """
+
+    flag = models.ForeignKey(QualityFlag, on_delete=models.CASCADE, related_name="history")
+
+    window_start = models.DateTimeField()
+    window_end = models.DateTimeField()
+    sample_size = models.PositiveIntegerField(default=0)
+    defect_rate = models.FloatField(default=0.0)
+    threshold = models.FloatField(default=10.0)
+
+    was_active = models.BooleanField(default=False)
+    recorded_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["flag_id", "recorded_at"]
+
+    def __str__(self) -> str:
+        return f"{self.flag_id} @ {self.recorded_at} ({self.defect_rate:.1f}%)"
+
+
+class FlagDetectorState(models.Model):
+    """
+    Streaming flag detector state for one (flag_type, flag_key):
+    exponentially decayed inspection/failure counts as of `last_event_at`.
+    Constant size per key; maintained by qc.services.flags.
+    """
+
+    flag_type = models.CharField(max_length=20, choices=QualityFlag.FLAG_TYPE_CHOICES)
+    flag_key = models.CharField(max_length=255)
+
+    weight = models.FloatField(default=0.0)
+    failures = models.FloatField(default=0.0)
+    last_event_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = [("flag_type", "flag_key")]
+
+    def __str__(self) -> str:
+        return f"{self.flag_type}:{self.flag_key} ({self.failures:.1f}/{self.weight:.1f})"
+
+
+# =============================================================================
+# Daily quality rollups
+# =============================================================================
+class DailyQualityRollup(models.Model):
+    """
+    Completed-inspection totals per day and (lab, frame_model, store,
+    tech_user). Incremented when an inspection is finalized and rebuilt
+    from raw rows by `manage.py qc_rebuild_rollups`; dashboard metrics read
+    these instead of Inspection/Defect.
+    """
+
+    day = models.DateField()
+    lab = models.CharField(max_length=255, blank=True, default="")
+    frame_model = models.CharField(max_length=255, blank=True, default="")
+    store = models.ForeignKey(Store, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    tech_user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+
+    inspections = models.PositiveIntegerField(default=0)
+    failures = models.PositiveIntegerField(default=0)
+    first_attempts = models.PositiveIntegerField(default=0)
+    first_attempt_passes = models.PositiveIntegerField(default=0)
+
+    defects_low = models.PositiveIntegerField(default=0)
+    defects_med = models.PositiveIntegerField(default=0)
+    defects_high = models.PositiveIntegerField(default=0)
+
+    # summed completed_at - started_at
+    qc_seconds = models.FloatField(default=0.0)
+
+    class Meta:
+        ordering = ["-day", "lab", "frame_model"]
+        constraints = [
+            # store/tech_user are often NULL (imported units); coalesce so
+            # concurrent first finalizes of one key collide instead of
+            # creating duplicate rows
+            models.UniqueConstraint(
+                "day",
+                "lab",
+                "frame_model",
+                Coalesce("store", Value(0), output_field=models.BigIntegerField()),
+                Coalesce("tech_user", Value(0), output_field=models.BigIntegerField()),
+                name="qc_rollup_key_uniq",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["day"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.day} {self.lab}/{self.frame_model} ({self.failures}/{self.inspections})"
+
+
 # =============================================================================
 # Complaints
 # =============================================================================
@@ -296,6 +640,12 @@ class Complaint(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # keyset pagination of complaints_list without a search term
+            models.Index(fields=["-created_at", "-id"], name="qc_complaint_created_idx"),
+            models.Index(fields=["status", "-created_at", "-id"], name="qc_complaint_status_idx"),
+        ]
+        # full-text index (FTS5 table / tsvector column) lives in migration 0014, see qc.services.complaint_search
 
     def __str__(self) -> str:
         return f"Complaint {self.id}: {self.title}"
@@ -303,7 +653,7 @@ class Complaint(models.Model):
 
 class ComplaintAttachment(models.Model):
     complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name="attachments")
-    file = models.FileField(upload_to="complaint_attachments/")
+    file = models.FileField(upload_to="complaint_attachments/", storage=content_addressed_storage)
     note = models.TextField(blank=True, default="")
 
     uploaded_by = models.ForeignKey(
@@ -321,3 +671,84 @@ class ComplaintAttachment(models.Model):
 
     def __str__(self) -> str:
         return f"Attachment {self.id} (complaint {self.complaint_id})"
+
+
+class UploadSession(models.Model):
+    """
+    A chunked, resumable upload of one or more complaint attachments
+    (qc.services.uploads). `files` is fixed at creation:
+    [{"name": ..., "size": ...}, ...]; received chunks are UploadChunk rows.
+    """
+
+    STATUS_CHOICES = [
+        ("OPEN", "Open"),
+        ("COMPLETE", "Complete"),
+        ("EXPIRED", "Expired"),
+    ]
+
+    key = models.CharField(max_length=32, unique=True)
+    complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name="upload_sessions")
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="upload_sessions",
+    )
+    note = models.TextField(blank=True, default="")
+
+    files = models.JSONField(default=list)
+    chunk_size = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="OPEN")
+
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(default=timezone.now)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "updated_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"UploadSession {self.key} ({self.status})"
+
+
+class UploadChunk(models.Model):
+    session = models.ForeignKey(UploadSession, on_delete=models.CASCADE, related_name="chunks")
+    file_index = models.PositiveIntegerField()
+    chunk_index = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = [("session", "file_index", "chunk_index")]
+
+    def __str__(self) -> str:
+        return f"{self.session_id}:{self.file_index}:{self.chunk_index}"
+
+
+# =============================================================================
+# Stored blobs (content-addressed files)
+# =============================================================================
+class StoredBlob(models.Model):
+    """
+    One file in ContentAddressedStorage. `refcount` counts the DefectPhoto
+    and ComplaintAttachment file fields pointing at `name` (kept by
+    qc.services.blobs); blobs at zero are removed by `manage.py qc_gc_blobs`.
+    """
+
+    digest = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    refcount = models.IntegerField(default=0)
+
+    created_at = models.DateTimeField(default=timezone.now)
+    touched_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["refcount", "touched_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.refcount} refs)"
@@ -0,0 +1 @@
+# qc/services/__init__.py
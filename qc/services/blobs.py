@@ -0,0 +1,207 @@
+# qc/services/blobs.py
+from __future__ import annotations
+
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from qc.models import ComplaintAttachment, DefectPhoto, StoredBlob
+from qc.storage import BLOB_PREFIX, content_addressed_storage
+
+# models/fields whose files live in ContentAddressedStorage
+FILE_FIELDS = {
+    DefectPhoto: ("image", "thumbnail"),
+    ComplaintAttachment: ("file",),
+}
+
+
+def _names(instance) -> list[str]:
+    return [getattr(instance, f).name for f in FILE_FIELDS[type(instance)] if getattr(instance, f).name]
+
+
+def _bump(names, delta: int) -> None:
+    # one UPDATE per distinct multiplicity, not per file
+    by_count = {}
+    for name, n in Counter(n for n in names if n).items():
+        by_count.setdefault(n, []).append(name)
+    for n, batch in by_count.items():
+        StoredBlob.objects.filter(name__in=batch).update(refcount=F("refcount") + delta * n)
+
+
+def add_refs(names) -> None:
+    _bump(names, 1)
+
+
+def release_refs(names) -> None:
+    _bump(names, -1)
+
+
+def add_refs_for(instances) -> None:
+    """
+    Reference the files of instances written with bulk_create (which
+    skips the save signals).
+    """
+    add_refs([name for obj in instances for name in _names(obj)])
+
+
+# =============================================================================
+# Signal handlers (connected in QcConfig.ready)
+# =============================================================================
+def on_file_model_pre_save(sender, instance, update_fields=None, **kwargs) -> None:
+    fields = FILE_FIELDS[sender]
+    if instance.pk is None or (update_fields is not None and not set(fields) & set(update_fields)):
+        instance._blob_names_before = None
+        return
+    row = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+    instance._blob_names_before = [n for n in (row or ()) if n]
+
+
+def on_file_model_post_save(sender, instance, created: bool, **kwargs) -> None:
+    before = getattr(instance, "_blob_names_before", None)
+    if created or before is None:
+        if created:
+            add_refs(_names(instance))
+        return
+    after = _names(instance)
+    release_refs(list((Counter(before) - Counter(after)).elements()))
+    add_refs(list((Counter(after) - Counter(before)).elements()))
+
+
+def on_file_model_post_delete(sender, instance, **kwargs) -> None:
+    release_refs(_names(instance))
+
+
+# =============================================================================
+# Maintenance
+# =============================================================================
+def recount_refs() -> int:
+    """
+    Recompute every refcount from the file fields (repairs drift, e.g.
+    after raw SQL deletes). Returns the number of blobs whose count changed.
+    """
+    actual = Counter()
+    for model, fields in FILE_FIELDS.items():
+        for field in fields:
+            for name in model.objects.exclude(**{field: ""}).values_list(field, flat=True).iterator(chunk_size=5000):
+                actual[name] += 1
+
+    changed = []
+    for blob in StoredBlob.objects.only("id", "name", "refcount").iterator(chunk_size=5000):
+        if blob.refcount != actual.get(blob.name, 0):
+            blob.refcount = actual.get(blob.name, 0)
+            changed.append(blob)
+    StoredBlob.objects.bulk_update(changed, ["refcount"], batch_size=1000)
+    return len(changed)
+
+
+def collect_garbage(grace_seconds: int = 3600, batch_size: int = 500) -> dict:
+    """
+    Delete blobs nobody references that haven't been touched for
+    `grace_seconds` (an upload saves its blob before its row commits).
+    Rows go first, in short batches; files are removed after each commit,
+    unless the same bytes were saved again meanwhile (re-registering the
+    name). Then sweeps files that never got a row (sweep_orphan_files).
+    """
+    storage = content_addressed_storage()
+    cutoff = timezone.now() - timedelta(seconds=grace_seconds)
+    removed = freed = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                StoredBlob.objects.select_for_update()
+                .filter(id__gt=last_id, refcount__lte=0, touched_at__lt=cutoff)
+                .order_by("id")
+                .values_list("id", "name", "size")[:batch_size]
+            )
+            if not batch:
+                break
+            StoredBlob.objects.filter(id__in=[b[0] for b in batch]).delete()
+        reborn = set(StoredBlob.objects.filter(name__in=[b[1] for b in batch]).values_list("name", flat=True))
+        for _id, name, size in batch:
+            if name not in reborn:
+                storage.purge(name)
+            removed += 1
+            freed += size
+        last_id = batch[-1][0]
+
+    orphans, orphan_bytes = sweep_orphan_files(grace_seconds, batch_size)
+    return {"removed": removed, "bytes_freed": freed + orphan_bytes, "orphans_removed": orphans}
+
+
+def sweep_orphan_files(grace_seconds: int = 3600, batch_size: int = 500) -> tuple[int, int]:
+    """
+    Remove files under blobs/ that have no StoredBlob row and were last
+    modified more than `grace_seconds` ago: blobs written by a transaction
+    that rolled back, and temp files of an interrupted save. Returns
+    (files removed, bytes freed).
+    """
+    storage = content_addressed_storage()
+    root = storage.path(BLOB_PREFIX)
+    cutoff = (timezone.now() - timedelta(seconds=grace_seconds)).timestamp()
+    removed = freed = 0
+
+    def sweep(batch: dict) -> None:
+        nonlocal removed, freed
+        known = set(StoredBlob.objects.filter(name__in=list(batch)).values_list("name", flat=True))
+        for name, size in batch.items():
+            if name not in known:
+                storage.purge(name)
+                removed += 1
+                freed += size
+
+    batch = {}
+    for dirpath, _dirs, files in os.walk(root):
+        for filename in files:
+            stat = os.stat(os.path.join(dirpath, filename))
+            if stat.st_mtime >= cutoff:
+                continue
+            name = os.path.relpath(os.path.join(dirpath, filename), storage.location).replace(os.sep, "/")
+            batch[name] = stat.st_size
+            if len(batch) >= batch_size:
+                sweep(batch)
+                batch = {}
+    if batch:
+        sweep(batch)
+    return removed, freed
+
+
+def adopt_legacy_files(batch_size: int = 500) -> dict:
+    """
+    Move files stored before content addressing (defect_photos/...,
+    complaint_attachments/...) into the blob store: each is hashed and
+    saved as a blob (identical files collapse into one), its rows are
+    repointed, the old file is removed, and refcounts are recomputed.
+    Without this, deleting such a row leaks its file. Safe to re-run.
+    """
+    storage = content_addressed_storage()
+    adopted = missing = 0
+    for model, fields in FILE_FIELDS.items():
+        for field in fields:
+            legacy = model.objects.exclude(**{field: ""}).exclude(**{f"{field}__startswith": f"{BLOB_PREFIX}/"})
+            last = ""
+            while True:
+                names = list(
+                    legacy.filter(**{f"{field}__gt": last})
+                    .order_by(field)
+                    .values_list(field, flat=True)
+                    .distinct()[:batch_size]
+                )
+                if not names:
+                    break
+                last = names[-1]
+                for name in names:
+                    if not storage.exists(name):
+                        missing += 1
+                        continue
+                    with storage.open(name, "rb") as f:
+                        blob_name = storage.save(name, f)
+                    model.objects.filter(**{field: name}).update(**{field: blob_name})
+                    storage.purge(name)
+                    adopted += 1
+    recount_refs()
+    return {"adopted": adopted, "missing": missing}
@@ -0,0 +1,227 @@
+# qc/services/complaint_search.py
+from __future__ import annotations
+
+import re
+
+from django.db import connection
+from django.db.models import Count, Q
+
+from qc.models import Complaint, Store
+from qc.services.listing import complaint_rows
+from qc.services.pagination import decode_cursor, encode_cursor, keyset_page
+
+# SQLite bm25() column weights: title, description, unit_id_text, order_id_text
+SQLITE_WEIGHTS = (10.0, 1.0, 5.0, 5.0)
+
+# SQLite trigger DDL (same as migration 0014); re-created by rebuild_index()
+# because a table rebuild by a later ALTER drops triggers with the old table.
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS qc_complaint_fts_ai AFTER INSERT ON qc_complaint BEGIN
+        INSERT INTO qc_complaint_fts(rowid, title, description, unit_id_text, order_id_text)
+        VALUES (new.id, new.title, new.description, new.unit_id_text, new.order_id_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS qc_complaint_fts_ad AFTER DELETE ON qc_complaint BEGIN
+        INSERT INTO qc_complaint_fts(qc_complaint_fts, rowid, title, description, unit_id_text, order_id_text)
+        VALUES ('delete', old.id, old.title, old.description, old.unit_id_text, old.order_id_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS qc_complaint_fts_au AFTER UPDATE OF title, description, unit_id_text, order_id_text
+    ON qc_complaint BEGIN
+        INSERT INTO qc_complaint_fts(qc_complaint_fts, rowid, title, description, unit_id_text, order_id_text)
+        VALUES ('delete', old.id, old.title, old.description, old.unit_id_text, old.order_id_text);
+        INSERT INTO qc_complaint_fts(rowid, title, description, unit_id_text, order_id_text)
+        VALUES (new.id, new.title, new.description, new.unit_id_text, new.order_id_text);
+    END
+    """,
+]
+
+
+def backend() -> str:
+    """ "fts5", "tsvector", or "icontains" (no full-text index on this database)."""
+    return {"sqlite": "fts5", "postgresql": "tsvector"}.get(connection.vendor, "icontains")
+
+
+def query_terms(q: str) -> list[str]:
+    # words only: FTS5 / to_tsquery syntax characters never reach the database
+    return re.findall(r"\w+", (q or "").lower())
+
+
+# =============================================================================
+# Matching (one FROM clause per backend; every query below builds on it)
+# =============================================================================
+def _match_sql(terms: list[str]) -> tuple[str, list]:
+    """
+    SQL selecting (id, status, store_id, score) for every complaint that
+    matches all terms (each as a prefix), higher score = more relevant.
+    """
+    if backend() == "fts5":
+        match = " ".join(f'"{t}"*' for t in terms)
+        weights = ", ".join(str(w) for w in SQLITE_WEIGHTS)
+        sql = (
+            f"SELECT c.id AS id, c.status AS status, c.store_id AS store_id, -bm25(qc_complaint_fts, {weights}) AS score "
+            "FROM qc_complaint_fts JOIN qc_complaint c ON c.id = qc_complaint_fts.rowid "
+            "WHERE qc_complaint_fts MATCH %s"
+        )
+        return sql, [match]
+
+    tsquery = " & ".join(f"{t}:*" for t in terms)
+    sql = (
+        "SELECT c.id AS id, c.status AS status, c.store_id AS store_id, ts_rank_cd(c.search_vector, query) AS score "
+        "FROM qc_complaint c, to_tsquery('simple', %s) query "
+        "WHERE c.search_vector @@ query"
+    )
+    return sql, [tsquery]
+
+
+def _filter_sql(status: str, store_id: int | None) -> tuple[str, list]:
+    where, params = [], []
+    if status:
+        where.append("m.status = %s")
+        params.append(status)
+    if store_id is not None:
+        where.append("m.store_id = %s")
+        params.append(store_id)
+    return " AND ".join(where), params
+
+
+# =============================================================================
+# Search
+# =============================================================================
+def search_complaints(
+    q: str = "",
+    status: str = "",
+    store_code: str = "",
+    cursor: str = "",
+    page_size: int = 50,
+) -> dict:
+    """
+    One page of complaints for complaints_list plus status/store facets.
+
+    With a search term, results are ranked by relevance and paged by
+    (score, id) keyset; without one they are newest first, paged by
+    (created_at, id). Facet counts are over the text match: the status
+    facet honours the store filter and vice versa, so each facet shows
+    what picking one of its values would return.
+
+    Returns {"complaints", "next_cursor", "facets": {"status", "store"}, "total"}.
+    """
+    store_id = None
+    if store_code:
+        store_id = Store.objects.filter(code=store_code).values_list("id", flat=True).first()
+        if store_id is None:
+            return {"complaints": [], "next_cursor": None, "facets": {"status": [], "store": []}, "total": 0}
+
+    terms = query_terms(q)
+    if terms and backend() != "icontains":
+        rows, next_cursor = _ranked_page(terms, status, store_id, cursor, page_size)
+        by_id = complaint_rows().in_bulk([r[0] for r in rows])
+        complaints = []
+        for pk, score in rows:
+            complaint = by_id[pk]
+            complaint.search_score = score
+            complaints.append(complaint)
+        grid = _facet_grid_sql(terms)
+    else:
+        qs = Complaint.objects.all()
+        if terms:
+            q = q.strip()
+            qs = qs.filter(Q(title__icontains=q) | Q(description__icontains=q) | Q(unit_id_text__icontains=q))
+        grid = _facet_grid_orm(qs)
+        if status:
+            qs = qs.filter(status=status)
+        if store_id is not None:
+            qs = qs.filter(store_id=store_id)
+        complaints, next_cursor = keyset_page(complaint_rows(qs), cursor, page_size, date_field="created_at")
+
+    facets, total = _facets(grid, status, store_id)
+    return {"complaints": complaints, "next_cursor": next_cursor, "facets": facets, "total": total}
+
+
+def _ranked_page(terms, status, store_id, cursor, page_size) -> tuple[list[tuple[int, float]], str | None]:
+    match_sql, params = _match_sql(terms)
+    where, where_params = _filter_sql(status, store_id)
+    params += where_params
+
+    values = decode_cursor(cursor)
+    if values and len(values) == 2 and isinstance(values[0], (int, float)) and isinstance(values[1], int):
+        after = "(m.score < %s OR (m.score = %s AND m.id < %s))"
+        where = f"{where} AND {after}" if where else after
+        params += [values[0], values[0], values[1]]
+
+    sql = f"SELECT m.id, m.score FROM ({match_sql}) m"
+    if where:
+        sql += f" WHERE {where}"
+    sql += " ORDER BY m.score DESC, m.id DESC LIMIT %s"
+    params.append(page_size + 1)
+
+    with connection.cursor() as c:
+        c.execute(sql, params)
+        rows = c.fetchall()
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, encode_cursor(rows[-1][1], rows[-1][0])
+
+
+# =============================================================================
+# Facets: one grouped query gives the (status, store) grid, both facets come from it
+# =============================================================================
+def _facet_grid_sql(terms) -> list[tuple[str, int | None, int]]:
+    match_sql, params = _match_sql(terms)
+    with connection.cursor() as c:
+        c.execute(f"SELECT m.status, m.store_id, COUNT(*) FROM ({match_sql}) m GROUP BY m.status, m.store_id", params)
+        return c.fetchall()
+
+
+def _facet_grid_orm(qs) -> list[tuple[str, int | None, int]]:
+    return list(qs.order_by().values_list("status", "store_id").annotate(n=Count("id")))
+
+
+def _facets(grid, status: str, store_id: int | None) -> tuple[dict, int]:
+    by_status, by_store = {}, {}
+    total = 0
+    for row_status, row_store, n in grid:
+        if store_id is None or row_store == store_id:
+            by_status[row_status] = by_status.get(row_status, 0) + n
+        if not status or row_status == status:
+            by_store[row_store] = by_store.get(row_store, 0) + n
+        if (store_id is None or row_store == store_id) and (not status or row_status == status):
+            total += n
+
+    stores = Store.objects.in_bulk([s for s in by_store if s is not None])
+    labels = dict(Complaint.STATUS_CHOICES)
+    return {
+        "status": [
+            {"value": s, "label": labels.get(s, s), "count": by_status[s]}
+            for s in sorted(by_status, key=lambda s: -by_status[s])
+        ],
+        "store": [
+            {
+                "value": stores[s].code if s in stores else "",
+                "label": stores[s].name if s in stores else "No store",
+                "count": by_store[s],
+            }
+            for s in sorted(by_store, key=lambda s: -by_store[s])
+        ],
+    }, total
+
+
+# =============================================================================
+# Maintenance
+# =============================================================================
+def rebuild_index() -> str:
+    """
+    Re-create the SQLite sync triggers if missing and rebuild the FTS5
+    table from qc_complaint. The Postgres tsvector column is generated,
+    so there is nothing to rebuild there. Returns the backend name.
+    """
+    if backend() == "fts5":
+        with connection.cursor() as c:
+            for sql in SQLITE_TRIGGERS:
+                c.execute(sql)
+            c.execute("INSERT INTO qc_complaint_fts(qc_complaint_fts) VALUES ('rebuild')")
+    return backend()
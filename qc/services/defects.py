@@ -0,0 +1,101 @@
+# qc/services/defects.py
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from qc.models import DailyQualityRollup, Defect, Inspection, InspectionStageResult
+from qc.services.rollups import window_start_day
+
+# public dimension name -> Defect lookup
+DIMENSIONS = {
+    "lab": "stage_result__inspection__unit__lab",
+    "frame_model": "stage_result__inspection__unit__frame_model",
+    "category": "category",
+    "reason_code": "reason_code",
+    "severity": "severity",
+}
+
+# dimensions the per-unit rates can be grouped by (rollup columns)
+RATE_DIMENSIONS = ("lab", "frame_model")
+
+
+# =============================================================================
+# Counts
+# =============================================================================
+def defect_counts(days: int = 7, by: tuple[str, ...] = tuple(DIMENSIONS)) -> list[dict]:
+    """
+    Defects found on inspections completed in the last `days` days,
+    counted per combination of the `by` dimensions, largest first.
+    One grouped query however many labs/models there are.
+    """
+    unknown = set(by) - set(DIMENSIONS)
+    if unknown:
+        raise ValueError(f"Unknown defect dimension(s): {', '.join(sorted(unknown))}")
+
+    start = timezone.now() - timedelta(days=days)
+    rows = (
+        Defect.objects.filter(stage_result__in=_stage_results_since(start))
+        .values(*(DIMENSIONS[d] for d in by))
+        .annotate(defects=Count("id"))
+        .order_by("-defects")
+    )
+    return [{**{d: row[DIMENSIONS[d]] for d in by}, "defects": row["defects"]} for row in rows]
+
+
+def _stage_results_since(start):
+    # nested IN lists drive the query from the Inspection completed_at index,
+    # so stage results and defects are only probed for the window's rows
+    # instead of scanned
+    inspections = Inspection.objects.filter(completed_at__gte=start).values("id")
+    return InspectionStageResult.objects.filter(inspection__in=inspections).values("id")
+
+
+# =============================================================================
+# Rates
+# =============================================================================
+def defect_rates(days: int = 7, by: tuple[str, ...] = RATE_DIMENSIONS) -> list[dict]:
+    """
+    Both defect-rate definitions per `by` key over the last `days` days,
+    read from the daily rollups:
+    - fail_rate_percent: % of inspections that ended FAIL
+    - defects_per_100_units: defects logged per 100 inspected units
+    """
+    unknown = set(by) - set(RATE_DIMENSIONS)
+    if unknown:
+        raise ValueError(f"Rates can only be grouped by {', '.join(RATE_DIMENSIONS)}")
+
+    rows = (
+        DailyQualityRollup.objects.filter(day__gte=window_start_day(days))
+        .values(*by)
+        .annotate(
+            inspections=Sum("inspections"),
+            failures=Sum("failures"),
+            defects=Sum(F("defects_low") + F("defects_med") + F("defects_high")),
+        )
+        .order_by(*by)
+    )
+
+    rates = []
+    for row in rows:
+        n = row["inspections"] or 0
+        rates.append(
+            {
+                **{d: row[d] for d in by},
+                "inspections": n,
+                "failures": row["failures"] or 0,
+                "defects": row["defects"] or 0,
+                "fail_rate_percent": round((row["failures"] or 0) / n * 100.0, 2) if n else 0.0,
+                "defects_per_100_units": round((row["defects"] or 0) / n * 100.0, 2) if n else 0.0,
+            }
+        )
+    return rates
+
+
+def worst_defect_rates(days: int = 7, limit: int = 10, min_inspections: int = 10) -> list[dict]:
+    """Lab/model pairs with the most defects per 100 units (dashboard)."""
+    rates = [r for r in defect_rates(days) if r["inspections"] >= min_inspections and r["defects"]]
+    rates.sort(key=lambda r: (-r["defects_per_100_units"], -r["inspections"]))
+    return rates[:limit]
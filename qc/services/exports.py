@@ -0,0 +1,201 @@
+# qc/services/exports.py
+from __future__ import annotations
+
+import csv
+import json
+import zlib
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Iterator
+
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from qc.models import Defect, Inspection, InspectionStageResult, Unit
+
+# rows fetched per round trip (a server-side cursor on Postgres)
+ITERATOR_CHUNK_SIZE = 2000
+
+# bytes gathered before a piece is handed to the response / file
+FLUSH_BYTES = 64 * 1024
+
+FORMATS = ("csv", "jsonl")
+
+# kind -> (model, (header, values_list lookup) pairs, date field, lab lookup)
+EXPORTS = {
+    "units": (
+        Unit,
+        (
+            ("id", "id"),
+            ("unit_id", "unit_id"),
+            ("order_id", "order_id"),
+            ("frame_model", "frame_model"),
+            ("lab", "lab"),
+            ("priority", "priority"),
+            ("status", "status"),
+            ("store", "store__code"),
+            ("received_at", "received_at"),
+            ("last_result", "last_result"),
+            ("attempts", "last_attempt_number"),
+            ("first_pass", "first_pass"),
+        ),
+        "received_at",
+        "lab",
+    ),
+    "inspections": (
+        Inspection,
+        (
+            ("id", "id"),
+            ("unit_id", "unit__unit_id"),
+            ("lab", "unit__lab"),
+            ("frame_model", "unit__frame_model"),
+            ("attempt_number", "attempt_number"),
+            ("tech", "tech_user__username"),
+            ("training", "training_mode_used"),
+            ("started_at", "started_at"),
+            ("completed_at", "completed_at"),
+            ("final_result", "final_result"),
+        ),
+        "started_at",
+        "unit__lab",
+    ),
+    "stage_results": (
+        InspectionStageResult,
+        (
+            ("id", "id"),
+            ("inspection_id", "inspection_id"),
+            ("unit_id", "inspection__unit__unit_id"),
+            ("stage", "stage"),
+            ("status", "status"),
+            ("notes", "notes"),
+            ("data", "data"),
+        ),
+        "inspection__started_at",
+        "inspection__unit__lab",
+    ),
+    "defects": (
+        Defect,
+        (
+            ("id", "id"),
+            ("inspection_id", "stage_result__inspection_id"),
+            ("unit_id", "stage_result__inspection__unit__unit_id"),
+            ("lab", "stage_result__inspection__unit__lab"),
+            ("frame_model", "stage_result__inspection__unit__frame_model"),
+            ("stage", "stage_result__stage"),
+            ("category", "category"),
+            ("reason_code", "reason_code"),
+            ("severity", "severity"),
+            ("notes", "notes"),
+            ("created_at", "created_at"),
+        ),
+        "created_at",
+        "stage_result__inspection__unit__lab",
+    ),
+}
+
+
+def export_queryset(
+    kind: str, since: date | None = None, until: date | None = None, lab: str = ""
+) -> tuple[list[str], QuerySet]:
+    """
+    (header, values_list queryset) for one export, filtered to the local
+    days since..until (inclusive) and one lab, in primary-key order.
+    Raises ValueError for an unknown kind.
+    """
+    if kind not in EXPORTS:
+        raise ValueError(f"Unknown export '{kind}' (choose from {', '.join(EXPORTS)})")
+    model, columns, date_field, lab_field = EXPORTS[kind]
+
+    qs = model.objects.all()
+    tz = timezone.get_current_timezone()
+    if since:
+        qs = qs.filter(**{f"{date_field}__gte": datetime.combine(since, time.min, tzinfo=tz)})
+    if until:
+        qs = qs.filter(**{f"{date_field}__lt": datetime.combine(until + timedelta(days=1), time.min, tzinfo=tz)})
+    if lab:
+        qs = qs.filter(**{lab_field: lab})
+    return [h for h, _ in columns], qs.order_by("id").values_list(*(lookup for _, lookup in columns))
+
+
+# =============================================================================
+# Encoders: rows in, byte pieces of ~FLUSH_BYTES out
+# =============================================================================
+def _cell(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"))
+    return value
+
+
+class _Buffer:
+    """Write target for csv.writer that keeps what was written until drained."""
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def write(self, s: str) -> None:
+        self.parts.append(s)
+        self.size += len(s)
+
+    def drain(self) -> bytes:
+        data = "".join(self.parts).encode("utf-8")
+        self.parts, self.size = [], 0
+        return data
+
+
+def iter_csv(header: list[str], rows: Iterable) -> Iterator[bytes]:
+    buf = _Buffer()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow([_cell(v) for v in row])
+        if buf.size >= FLUSH_BYTES:
+            yield buf.drain()
+    yield buf.drain()
+
+
+def iter_jsonl(header: list[str], rows: Iterable) -> Iterator[bytes]:
+    buf = _Buffer()
+    for row in rows:
+        buf.write(json.dumps(dict(zip(header, map(_cell, row))), ensure_ascii=False, default=str))
+        buf.write("\n")
+        if buf.size >= FLUSH_BYTES:
+            yield buf.drain()
+    yield buf.drain()
+
+
+def gzip_stream(pieces: Iterable[bytes]) -> Iterator[bytes]:
+    """Compress a byte stream on the fly into one gzip member."""
+    z = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for piece in pieces:
+        out = z.compress(piece)
+        if out:
+            yield out
+    yield z.flush()
+
+
+def export_stream(
+    kind: str,
+    fmt: str = "csv",
+    since: date | None = None,
+    until: date | None = None,
+    lab: str = "",
+    gzip: bool = False,
+) -> Iterator[bytes]:
+    """
+    The whole export as an iterator of byte pieces. Rows are pulled
+    ITERATOR_CHUNK_SIZE at a time and never materialised as model
+    instances, so memory stays flat however many rows there are.
+    Raises ValueError for an unknown kind or format (before streaming).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}' (choose from {', '.join(FORMATS)})")
+    header, qs = export_queryset(kind, since=since, until=until, lab=lab)
+    encode = iter_csv if fmt == "csv" else iter_jsonl
+    pieces = encode(header, qs.iterator(chunk_size=ITERATOR_CHUNK_SIZE))
+    return gzip_stream(pieces) if gzip else pieces
+
+
+def export_filename(kind: str, fmt: str, gzip: bool = False) -> str:
+    return f"qc_{kind}_{timezone.localdate():%Y%m%d}.{fmt}" + (".gz" if gzip else "")
@@ -0,0 +1,347 @@
+# qc/services/flags.py
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from qc.models import FlagDetectorState, Inspection, QualityFlag, QualityFlagHistory
+from qc.services import metrics
+
+
+def _flag_key(value: str | None) -> str:
+    return (value or "").strip() or "UNKNOWN"
+
+
+def _keys_for(lab: str | None, frame_model: str | None) -> list[tuple[str, str]]:
+    return [("LAB", _flag_key(lab)), ("MODEL", _flag_key(frame_model))]
+
+
+@dataclass(frozen=True)
+class DetectorConfig:
+    """
+    threshold_percent: fail rate a key must be confidently above to flag
+    min_sample: decayed inspection weight needed before a key can flag
+    half_life_days: age at which an inspection counts half
+    z: confidence of the Wilson bound (1.96 ~ 95%)
+    """
+
+    threshold_percent: float = 10.0
+    min_sample: float = 10.0
+    half_life_days: float = 3.5
+    z: float = 1.96
+
+    @classmethod
+    def from_settings(cls, **overrides) -> DetectorConfig:
+        values = {
+            "threshold_percent": getattr(settings, "QC_FLAG_THRESHOLD_PERCENT", cls.threshold_percent),
+            "min_sample": getattr(settings, "QC_FLAG_MIN_SAMPLE", cls.min_sample),
+            "half_life_days": getattr(settings, "QC_FLAG_HALF_LIFE_DAYS", cls.half_life_days),
+            "z": getattr(settings, "QC_FLAG_Z", cls.z),
+        }
+        values.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(**values)
+
+    @property
+    def half_life_seconds(self) -> float:
+        return self.half_life_days * 86400.0
+
+
+# =============================================================================
+# Statistics
+# =============================================================================
+def wilson_bounds(failures: float, n: float, z: float) -> tuple[float, float]:
+    """
+    Wilson score interval for a fail rate (fractions, 0..1). Works with
+    fractional (decayed) counts.
+    """
+    if n <= 0:
+        return 0.0, 1.0
+    p = min(1.0, max(0.0, failures / n))
+    z2 = z * z
+    center = p + z2 / (2 * n)
+    margin = z * math.sqrt(p * (1 - p) / n + z2 / (4 * n * n))
+    denom = 1 + z2 / n
+    return max(0.0, (center - margin) / denom), min(1.0, (center + margin) / denom)
+
+
+def _decay(since, now, config: DetectorConfig) -> float:
+    if since is None:
+        return 1.0
+    age = max(0.0, (now - since).total_seconds())
+    return 0.5 ** (age / config.half_life_seconds)
+
+
+# =============================================================================
+# Flag lifecycle
+# =============================================================================
+def _apply_flag(state: FlagDetectorState, now, config: DetectorConfig) -> str | None:
+    """
+    Open/update/close the single active flag for `state`'s key.
+    Opens when the Wilson lower bound clears the threshold; closes once
+    the point rate drops below it (or the sample decays away), so a key
+    hovering at the threshold does not flap.
+    Returns "opened", "updated", "closed" or None.
+    """
+    weight = state.weight * _decay(state.last_event_at, now, config)
+    failures = state.failures * _decay(state.last_event_at, now, config)
+    threshold = config.threshold_percent / 100.0
+    rate = failures / weight if weight > 0 else 0.0
+    lower, _upper = wilson_bounds(failures, weight, config.z)
+
+    active = QualityFlag.objects.filter(flag_type=state.flag_type, flag_key=state.flag_key, is_active=True)
+    fields = {
+        "window_end": now,
+        "sample_size": round(weight),
+        "defect_rate": rate * 100.0,
+        "threshold": config.threshold_percent,
+        "updated_at": now,
+    }
+
+    if weight >= config.min_sample and lower > threshold:
+        if active.update(**fields):
+            return "updated"
+        try:
+            with transaction.atomic():
+                QualityFlag.objects.create(
+                    flag_type=state.flag_type,
+                    flag_key=state.flag_key,
+                    is_active=True,
+                    window_start=now,
+                    created_at=now,
+                    **fields,
+                )
+        except IntegrityError:
+            # qc_flag_one_active_per_key: someone else opened it first
+            active.update(**fields)
+            return "updated"
+        return "opened"
+
+    if weight < config.min_sample or rate < threshold:
+        if active.update(is_active=False, closed_at=now, **fields):
+            return "closed"
+    elif active.update(**fields):
+        return "updated"
+    return None
+
+
+def record_inspection(inspection: Inspection, config: DetectorConfig | None = None) -> None:
+    """
+    O(1) streaming update for a just-finalized inspection: decay and bump
+    the LAB and MODEL states (row-locked), then open/update/close their
+    flag. Call inside the finalize transaction.
+    """
+    config = config or DetectorConfig.from_settings()
+    now = inspection.completed_at
+    failed = 1.0 if inspection.final_result == "FAIL" else 0.0
+    changed = False
+
+    for flag_type, flag_key in _keys_for(inspection.unit.lab, inspection.unit.frame_model):
+        FlagDetectorState.objects.get_or_create(flag_type=flag_type, flag_key=flag_key)
+        state = FlagDetectorState.objects.select_for_update().get(flag_type=flag_type, flag_key=flag_key)
+
+        decay = _decay(state.last_event_at, now, config)
+        state.weight = state.weight * decay + 1.0
+        state.failures = state.failures * decay + failed
+        state.last_event_at = max(now, state.last_event_at) if state.last_event_at else now
+        state.save(update_fields=["weight", "failures", "last_event_at"])
+
+        changed |= _apply_flag(state, now, config) is not None
+
+    if changed:
+        metrics.mark_stale("active_flags")
+
+
+def refresh_quality_flags(now=None, config: DetectorConfig | None = None) -> dict:
+    """
+    Periodic sweep (`manage.py qc_run_flags`): re-evaluates only keys that
+    have an active flag, so flags on keys that stopped seeing inspections
+    age out. Everything else is handled at finalize time.
+    """
+    config = config or DetectorConfig.from_settings()
+    now = now or timezone.now()
+    result = {"opened": 0, "updated": 0, "closed": 0}
+
+    flagged = set(QualityFlag.objects.filter(is_active=True).order_by().values_list("flag_type", "flag_key"))
+    for flag_type, flag_key in sorted(flagged):
+        with transaction.atomic():
+            state = (
+                FlagDetectorState.objects.select_for_update().filter(flag_type=flag_type, flag_key=flag_key).first()
+            )
+            if state is None:
+                state = FlagDetectorState(flag_type=flag_type, flag_key=flag_key)
+            outcome = _apply_flag(state, now, config)
+        if outcome:
+            result[outcome] += 1
+
+    metrics.mark_stale("active_flags")
+    return result
+
+
+# =============================================================================
+# Backfill
+# =============================================================================
+def replay_history(now=None, config: DetectorConfig | None = None) -> dict:
+    """
+    Recompute every detector state from the full inspection history in
+    one vectorized pass (NumPy), then re-evaluate all flags. Equivalent to
+    streaming each inspection through record_inspection in order.
+    """
+    import numpy as np
+
+    config = config or DetectorConfig.from_settings()
+    now = now or timezone.now()
+
+    rows = (
+        Inspection.objects.filter(completed_at__isnull=False, final_result__in=["PASS", "FAIL"])
+        .values_list("completed_at", "unit__lab", "unit__frame_model", "final_result")
+        .iterator(chunk_size=5000)
+    )
+    times, labs, models, failed = [], [], [], []
+    for completed_at, lab, frame_model, final_result in rows:
+        times.append(completed_at.timestamp())
+        labs.append(_flag_key(lab))
+        models.append(_flag_key(frame_model))
+        failed.append(final_result == "FAIL")
+
+    states = []
+    if times:
+        t = np.asarray(times, dtype=np.float64)
+        x = np.asarray(failed, dtype=np.float64)
+        for flag_type, keys in (("LAB", labs), ("MODEL", models)):
+            names, idx = np.unique(np.asarray(keys, dtype=object), return_inverse=True)
+            last = np.full(len(names), -np.inf)
+            np.maximum.at(last, idx, t)
+            w = 0.5 ** ((last[idx] - t) / config.half_life_seconds)
+            weight = np.bincount(idx, weights=w, minlength=len(names))
+            fails = np.bincount(idx, weights=w * x, minlength=len(names))
+            states += [
+                FlagDetectorState(
+                    flag_type=flag_type,
+                    flag_key=str(name),
+                    weight=float(weight[i]),
+                    failures=float(fails[i]),
+                    last_event_at=datetime.fromtimestamp(last[i], tz=dt_timezone.utc),
+                )
+                for i, name in enumerate(names)
+            ]
+
+    with transaction.atomic():
+        FlagDetectorState.objects.all().delete()
+        FlagDetectorState.objects.bulk_create(states, batch_size=1000)
+
+        result = {"states": len(states), "opened": 0, "updated": 0, "closed": 0}
+        flagged = set(QualityFlag.objects.filter(is_active=True).order_by().values_list("flag_type", "flag_key"))
+        keyed = {(s.flag_type, s.flag_key): s for s in states}
+        for key in flagged - set(keyed):
+            keyed[key] = FlagDetectorState(flag_type=key[0], flag_key=key[1])
+        for state in keyed.values():
+            outcome = _apply_flag(state, now, config)
+            if outcome:
+                result[outcome] += 1
+
+    metrics.mark_stale("active_flags")
+    return result
+
+
+# =============================================================================
+# Compaction
+# =============================================================================
+def _episodes(rows: list[QualityFlag]) -> list[list[QualityFlag]]:
+    """Split one key's rows (sorted by window_start) into runs of overlapping windows."""
+    episodes = []
+    end = None
+    for row in rows:
+        if end is None or row.window_start > end:
+            episodes.append([])
+            end = row.window_end
+        episodes[-1].append(row)
+        end = max(end, row.window_end)
+    return episodes
+
+
+def _compact_keys(keys: list[tuple[str, str]]) -> tuple[int, int]:
+    key_filter = Q()
+    for flag_type, flag_key in keys:
+        key_filter |= Q(flag_type=flag_type, flag_key=flag_key)
+
+    by_key = {}
+    for row in QualityFlag.objects.filter(key_filter).order_by("flag_type", "flag_key", "window_start", "id"):
+        by_key.setdefault((row.flag_type, row.flag_key), []).append(row)
+
+    history, merged_ids, survivors = [], [], []
+    for rows in by_key.values():
+        for episode in _episodes(rows):
+            if len(episode) < 2:
+                continue
+            survivor = next(
+                (r for r in episode if r.is_active),
+                max(episode, key=lambda r: (r.window_end, r.id)),
+            )
+            others = [r for r in episode if r is not survivor]
+            history += [
+                QualityFlagHistory(
+                    flag=survivor,
+                    window_start=r.window_start,
+                    window_end=r.window_end,
+                    sample_size=r.sample_size,
+                    defect_rate=r.defect_rate,
+                    threshold=r.threshold,
+                    was_active=r.is_active,
+                    recorded_at=r.window_end,
+                )
+                for r in others
+            ]
+            QualityFlagHistory.objects.filter(flag__in=others).update(flag=survivor)
+            merged_ids += [r.id for r in others]
+
+            survivor.window_start = min(r.window_start for r in episode)
+            survivor.created_at = min(r.created_at for r in episode)
+            survivor.updated_at = max(max(r.updated_at for r in episode), max(r.window_end for r in episode))
+            if not survivor.is_active and survivor.closed_at is None:
+                survivor.closed_at = survivor.window_end
+            survivors.append(survivor)
+
+    QualityFlagHistory.objects.bulk_create(history, batch_size=1000)
+    QualityFlag.objects.filter(id__in=merged_ids).delete()
+    QualityFlag.objects.bulk_update(survivors, ["window_start", "created_at", "updated_at", "closed_at"], batch_size=500)
+    return len(merged_ids), len(survivors)
+
+
+def compact_flags(batch_size: int = 100) -> dict:
+    """
+    Fold near-duplicate QualityFlag rows (same key, overlapping windows,
+    as written by the old per-call flagging) into one row per episode,
+    keeping the merged rows as QualityFlagHistory. Works `batch_size`
+    keys per short transaction, walking keys in order, so the table is
+    never locked for long.
+    """
+    merged = episodes = 0
+    last = None
+    while True:
+        keys_qs = (
+            QualityFlag.objects.values("flag_type", "flag_key")
+            .annotate(n=Count("id"))
+            .filter(n__gt=1)
+            .order_by("flag_type", "flag_key")
+        )
+        if last is not None:
+            keys_qs = keys_qs.filter(Q(flag_type__gt=last[0]) | Q(flag_type=last[0], flag_key__gt=last[1]))
+        keys = [(row["flag_type"], row["flag_key"]) for row in keys_qs[:batch_size]]
+        if not keys:
+            break
+
+        with transaction.atomic():
+            m, e = _compact_keys(keys)
+        merged += m
+        episodes += e
+        last = keys[-1]
+
+    if merged:
+        metrics.mark_stale("active_flags")
+    return {"merged": merged, "episodes": episodes}
@@ -0,0 +1,161 @@
+# qc/services/images.py
+from __future__ import annotations
+
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from qc.models import DefectPhoto
+
+logger = logging.getLogger(__name__)
+
+JPEG_QUALITY = 85
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _max_px() -> int:
+    return getattr(settings, "QC_PHOTO_MAX_PX", 2048)
+
+
+def _thumb_px() -> int:
+    return getattr(settings, "QC_PHOTO_THUMB_PX", 320)
+
+
+# =============================================================================
+# Encode
+# =============================================================================
+def _encode_jpeg(img: Image.Image, max_px: int) -> bytes:
+    """
+    Downscale to fit max_px x max_px and re-encode as JPEG. Nothing from
+    the source's metadata is passed to save(), so EXIF (GPS, device...)
+    is dropped.
+    """
+    out = img.copy()
+    if out.mode not in ("RGB", "L"):
+        out = out.convert("RGB")
+    out.thumbnail((max_px, max_px), Image.Resampling.LANCZOS)
+    buf = io.BytesIO()
+    out.save(buf, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buf.getvalue()
+
+
+def _claim(photo_id: int) -> datetime | None:
+    """
+    Conditional UPDATE: take the photo unless it is processed or another
+    worker's claim is still fresh. Returns the claim stamp, or None.
+    """
+    now = timezone.now()
+    stale = now - timedelta(minutes=getattr(settings, "QC_PHOTO_CLAIM_MINUTES", 10))
+    claimed = (
+        DefectPhoto.objects.filter(id=photo_id, processed_at__isnull=True)
+        .filter(Q(claimed_at__isnull=True) | Q(claimed_at__lt=stale))
+        .update(claimed_at=now)
+    )
+    return now if claimed else None
+
+
+def process_photo(photo_id: int) -> DefectPhoto | None:
+    """
+    Replace the uploaded original with a downscaled, EXIF-free JPEG and
+    write its thumbnail. Only the worker holding the claim processes a
+    photo, so the thread pool and qc_process_photos never both work on
+    it; processed or claimed elsewhere, it is skipped (None).
+    """
+    claim = _claim(photo_id)
+    if claim is None:
+        return None
+    photo = DefectPhoto.objects.filter(id=photo_id).first()
+    if photo is None or not photo.image:
+        return None
+
+    max_px = _max_px()
+    try:
+        with photo.image.open("rb") as f:
+            img = Image.open(f)
+            # JPEG: decode straight at (roughly) the target size
+            img.draft("RGB", (max_px, max_px))
+            # bake the EXIF orientation into the pixels before EXIF is dropped
+            img = ImageOps.exif_transpose(img)
+            img.load()
+    except (UnidentifiedImageError, OSError):
+        logger.exception("DefectPhoto %s is not a readable image", photo_id)
+        return None
+
+    full = _encode_jpeg(img, max_px)
+    thumb = _encode_jpeg(img, _thumb_px())
+
+    base = os.path.splitext(os.path.basename(photo.image.name))[0]
+    photo.image.save(f"{base}.jpg", ContentFile(full), save=False)
+    photo.thumbnail.save(f"{base}.jpg", ContentFile(thumb), save=False)
+    photo.processed_at = timezone.now()
+    with transaction.atomic():
+        # still ours? a claim that lapsed mid-way may have been taken over
+        done = DefectPhoto.objects.filter(id=photo_id, claimed_at=claim, processed_at__isnull=True).update(
+            processed_at=photo.processed_at
+        )
+        if not done:
+            # the blobs just written stay unreferenced; qc_gc_blobs reclaims them
+            return None
+        # the original's blob loses its reference here; qc_gc_blobs reclaims it
+        photo.save(update_fields=["image", "thumbnail", "processed_at"])
+    return photo
+
+
+# =============================================================================
+# Off-request processing
+# =============================================================================
+def enqueue_photo(photo: DefectPhoto) -> None:
+    """
+    Process a new upload off the request thread once the transaction
+    commits. With QC_IMAGE_WORKER = "command" photos wait for
+    `manage.py qc_process_photos`.
+    """
+    if getattr(settings, "QC_IMAGE_WORKER", "thread") == "thread":
+        photo_id = photo.id
+        transaction.on_commit(lambda: _submit(photo_id))
+
+
+def _submit(photo_id: int) -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "QC_IMAGE_THREADS", 2),
+                thread_name_prefix="qc-image",
+            )
+    _executor.submit(_process_in_thread, photo_id)
+
+
+def _process_in_thread(photo_id: int) -> bool:
+    close_old_connections()
+    try:
+        return process_photo(photo_id) is not None
+    except Exception:
+        logger.exception("Processing DefectPhoto %s crashed", photo_id)
+        return False
+    finally:
+        close_old_connections()
+
+
+def backfill_photos(workers: int = 4) -> dict:
+    """
+    Process every not-yet-processed photo on a pool of `workers` threads
+    (Pillow releases the GIL while decoding/resampling).
+    """
+    ids = list(DefectPhoto.objects.filter(processed_at__isnull=True).order_by("id").values_list("id", flat=True))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qc-image-backfill") as pool:
+        results = list(pool.map(_process_in_thread, ids))
+    done = sum(results)
+    return {"processed": done, "skipped": len(ids) - done}
@@ -0,0 +1,259 @@
+# qc/services/import_jobs.py
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from qc.importers import MAX_REPORTED_ERRORS, import_frames_csv
+from qc.models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# thread mode: minimum seconds between sweeps for orphaned jobs
+SWEEP_INTERVAL = 30
+_last_sweep = 0.0
+
+
+class LostJob(Exception):
+    """The job was reclaimed by another worker; this one must stop writing."""
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def _stale_before():
+    return timezone.now() - timedelta(seconds=getattr(settings, "QC_IMPORT_STALE_SECONDS", 300))
+
+
+# =============================================================================
+# Enqueue
+# =============================================================================
+def enqueue_import(uploaded_file, user=None) -> ImportJob:
+    """
+    Spool the upload to storage (chunk by chunk) and queue a job for it.
+    With QC_IMPORT_WORKER = "thread" the job starts on this process's
+    pool once the transaction commits; with "command" it waits for
+    `manage.py qc_import_worker`.
+    """
+    sweep_orphaned_jobs()
+    job = ImportJob(
+        original_name=uploaded_file.name[:255],
+        file_size=uploaded_file.size or 0,
+        created_by=user if user and user.is_authenticated else None,
+    )
+    job.file.save(os.path.basename(uploaded_file.name), uploaded_file, save=False)
+    job.save()
+
+    if getattr(settings, "QC_IMPORT_WORKER", "thread") == "thread":
+        transaction.on_commit(lambda: _submit(job.id))
+    return job
+
+
+def _submit(job_id: int) -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "QC_IMPORT_THREADS", 2),
+                thread_name_prefix="qc-import",
+            )
+    _executor.submit(_run_in_thread, job_id)
+
+
+def _run_in_thread(job_id: int) -> None:
+    close_old_connections()
+    try:
+        worker = worker_name()
+        if claim_job(job_id, worker):
+            run_import_job(job_id, worker)
+    except LostJob:
+        logger.warning("Import job %s was reclaimed by another worker", job_id)
+    except Exception:
+        logger.exception("Import job %s crashed", job_id)
+    finally:
+        close_old_connections()
+
+
+# =============================================================================
+# Claim + run
+# =============================================================================
+def _claimable() -> Q:
+    # queued, or running but abandoned by a worker that stopped heartbeating
+    return Q(status="QUEUED") | Q(status="RUNNING", heartbeat_at__lt=_stale_before())
+
+
+def claim_job(job_id: int, worker: str) -> bool:
+    """
+    Atomically take ownership of one job (conditional UPDATE, so two
+    workers can never both win).
+    """
+    now = timezone.now()
+    return bool(
+        ImportJob.objects.filter(_claimable(), id=job_id).update(
+            status="RUNNING", worker=worker, heartbeat_at=now
+        )
+    )
+
+
+def sweep_orphaned_jobs(force: bool = False) -> list[int]:
+    """
+    Thread mode has no polling worker: resubmit jobs whose worker stopped
+    heartbeating (or that were queued but never started, e.g. the process
+    restarted before its pool ran them). Called on enqueue and from the
+    status poll, at most every SWEEP_INTERVAL seconds. Returns the job ids
+    submitted; claim_job still decides who runs them.
+    """
+    global _last_sweep
+    if getattr(settings, "QC_IMPORT_WORKER", "thread") != "thread":
+        return []
+    now = time.monotonic()
+    with _executor_lock:
+        if not force and now - _last_sweep < SWEEP_INTERVAL:
+            return []
+        _last_sweep = now
+
+    stale = _stale_before()
+    job_ids = list(
+        ImportJob.objects.filter(
+            Q(status="QUEUED", created_at__lt=stale) | Q(status="RUNNING", heartbeat_at__lt=stale)
+        ).values_list("id", flat=True)
+    )
+    for job_id in job_ids:
+        _submit(job_id)
+    return job_ids
+
+
+def claim_next_job(worker: str) -> int | None:
+    candidates = ImportJob.objects.filter(_claimable()).order_by("created_at").values_list("id", flat=True)[:5]
+    for job_id in candidates:
+        if claim_job(job_id, worker):
+            return job_id
+    return None
+
+
+class _CountingReader:
+    """Binary reader that tracks how far into the spooled file we are."""
+
+    def __init__(self, f):
+        self.f = f
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.f.read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def run_import_job(job_id: int, worker: str) -> ImportJob:
+    """
+    Run (or resume) a job claimed by `worker`. Progress is written inside
+    each batch's transaction, so after a crash the next claim continues
+    after `last_committed_line` without re-applying committed batches.
+
+    Every progress write is fenced on `worker`: once the job has been
+    reclaimed the batch in flight rolls back and LostJob is raised. The
+    spooled file is deleted when the job finishes.
+    """
+    job = ImportJob.objects.get(id=job_id)
+    owned = ImportJob.objects.filter(id=job_id, worker=worker)
+    if job.started_at is None:
+        owned.update(started_at=timezone.now())
+
+    # resume from the committed totals
+    base = {
+        "created": job.created_count,
+        "updated": job.updated_count,
+        "unchanged": job.unchanged_count,
+        "error_count": job.error_count,
+    }
+    saved_errors = list(job.errors)
+
+    def on_batch(progress: dict) -> None:
+        if progress["new_errors"] and len(saved_errors) < MAX_REPORTED_ERRORS:
+            saved_errors.extend(progress["new_errors"][: MAX_REPORTED_ERRORS - len(saved_errors)])
+        fenced = owned.filter(status="RUNNING").update(
+            last_committed_line=max(progress["line"], job.last_committed_line),
+            created_count=base["created"] + progress["created"],
+            updated_count=base["updated"] + progress["updated"],
+            unchanged_count=base["unchanged"] + progress["unchanged"],
+            error_count=base["error_count"] + progress["error_count"],
+            errors=saved_errors,
+            bytes_processed=reader.bytes_read,
+            heartbeat_at=timezone.now(),
+        )
+        if not fenced:
+            # raised inside the batch transaction: its rows roll back too
+            raise LostJob(job_id)
+
+    try:
+        with job.file.open("rb") as f:
+            reader = _CountingReader(f)
+            import_frames_csv(reader, start_after_line=job.last_committed_line, on_batch=on_batch)
+    except LostJob:
+        raise
+    except Exception as e:
+        _finish(job, owned, status="FAILED", message=str(e)[:1000])
+        if not isinstance(e, ValueError):
+            raise
+    else:
+        _finish(job, owned, status="DONE")
+
+    job.refresh_from_db()
+    return job
+
+
+def _finish(job: ImportJob, owned, **fields) -> None:
+    if not owned.filter(status="RUNNING").update(finished_at=timezone.now(), file="", **fields):
+        raise LostJob(job.id)
+    # the spool is only needed to resume; finished jobs keep their totals
+    job.file.delete(save=False)
+
+
+# =============================================================================
+# Polling
+# =============================================================================
+def job_progress(job: ImportJob) -> dict:
+    """
+    JSON-safe snapshot for the import page poller.
+    """
+    end = job.finished_at or timezone.now()
+    elapsed = (end - job.started_at).total_seconds() if job.started_at else 0.0
+    rows = job.rows_processed
+
+    if job.status == "DONE":
+        percent = 100.0
+    elif job.file_size:
+        percent = min(99.0, job.bytes_processed / job.file_size * 100.0)
+    else:
+        percent = 0.0
+
+    return {
+        "id": job.id,
+        "file": job.original_name,
+        "status": job.status,
+        "percent": round(percent, 1),
+        "rows_processed": rows,
+        "rows_per_second": round(rows / elapsed, 1) if elapsed > 0 else 0.0,
+        "created": job.created_count,
+        "updated": job.updated_count,
+        "unchanged": job.unchanged_count,
+        "error_count": job.error_count,
+        "errors": job.errors[:50],
+        "message": job.message,
+        "finished": job.status in ("DONE", "FAILED"),
+    }
+
@@ -0,0 +1,239 @@
+# qc/services/inspections.py
+from __future__ import annotations
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Q
+from django.utils import timezone
+
+from qc.models import Defect, Inspection, InspectionStageResult, ReworkTicket, Unit
+from qc.services import flags, metrics, rollups, unit_status
+from qc.services.listing import OPEN_REWORK_STATUSES
+
+
+def _stage_placeholders(inspection: Inspection) -> list[InspectionStageResult]:
+    return [
+        InspectionStageResult(inspection=inspection, stage=stage, status="PASS", notes="", data={})
+        for stage, _label in InspectionStageResult.STAGE_CHOICES
+    ]
+
+
+def start_inspection(unit: Unit, user=None, training_mode: bool = False) -> Inspection:
+    return start_inspections([unit], user, training_mode)[0]
+
+
+def start_inspections(units, user=None, training_mode: bool = False) -> list[Inspection]:
+    """
+    Open the next attempt for each unit (a scanned tray, or just one),
+    with one placeholder result per stage, as a single unit of work.
+
+    Attempt numbers come from an atomic `last_attempt_number + 1` on the
+    Unit rows rather than reading Inspection, so two techs starting the
+    same unit at once are serialized by the row write and get different
+    numbers. Every unit moves to QC_IN_PROGRESS through
+    unit_status.transition_many, so a unit changed since it was read
+    raises StatusConflict and no inspection is opened.
+    """
+    units = list({u.pk: u for u in units}.values())
+    if not units:
+        return []
+    pks = [u.pk for u in units]
+
+    with transaction.atomic():
+        # starting a unit also ends any work-queue claim on it
+        unit_status.transition_many(
+            units,
+            "QC_IN_PROGRESS",
+            last_attempt_number=F("last_attempt_number") + 1,
+            claimed_by=None,
+            claimed_at=None,
+        )
+        attempts = dict(Unit.objects.filter(pk__in=pks).values_list("id", "last_attempt_number"))
+
+        created = Inspection.objects.bulk_create(
+            [
+                Inspection(
+                    unit=unit,
+                    attempt_number=attempts[unit.pk],
+                    tech_user=user,
+                    training_mode_used=training_mode,
+                )
+                for unit in units
+            ]
+        )
+        InspectionStageResult.objects.bulk_create(
+            [sr for inspection in created for sr in _stage_placeholders(inspection)]
+        )
+
+        for unit, inspection in zip(units, created):
+            unit.last_attempt_number = inspection.attempt_number
+            unit.last_inspection = inspection
+        Unit.objects.bulk_update(units, ["last_inspection"])
+
+    metrics.mark_stale(*metrics.STATUS_SECTIONS)
+    return created
+
+
+def save_stage(stage_result: InspectionStageResult, **values) -> list[str]:
+    """
+    Set status / notes / data on a stage result and write only the
+    columns that actually changed (nothing at all if none did).
+    Returns the changed field names.
+    """
+    changed = [name for name, value in values.items() if getattr(stage_result, name) != value]
+    for name in changed:
+        setattr(stage_result, name, values[name])
+    if changed:
+        stage_result.save(update_fields=changed)
+    return changed
+
+
+def add_defect(
+    stage_result: InspectionStageResult,
+    category: str = "UNKNOWN",
+    reason_code: str = "UNKNOWN",
+    severity: str = "LOW",
+    notes: str = "",
+) -> Defect:
+    """Log a defect against a stage; the stage becomes FAIL."""
+    defect = Defect.objects.create(
+        stage_result=stage_result, category=category, reason_code=reason_code, severity=severity, notes=notes
+    )
+    save_stage(stage_result, status="FAIL")
+    return defect
+
+
+def finalize_inspection(
+    inspection: Inspection,
+    final_result: str,
+    failed_stage: str = "COSMETIC",
+    reason_summary: str = "Failed QC",
+    unit_version: int | None = None,
+) -> ReworkTicket | None:
+    """
+    Record the decision: PASS -> STORE_READY, FAIL -> REWORK + open ticket.
+    Keeps the Unit's current-state columns in the same transaction.
+
+    The status change is conditional on the unit still being as it was
+    read (or at `unit_version`, e.g. the one the wizard page showed):
+    otherwise StatusConflict is raised and nothing is recorded. So is a
+    PASS while the unit still has an open rework ticket: rework is signed
+    off through complete_rework, never by the inspection.
+    """
+    unit = inspection.unit
+    if unit_version is not None:
+        unit.version = unit_version
+    now = timezone.now()
+    passed = final_result == "PASS"
+    first_completion = inspection.completed_at is None
+
+    with transaction.atomic():
+        inspection.final_result = final_result
+        inspection.completed_at = now
+        inspection.save(update_fields=["final_result", "completed_at"])
+        if first_completion:
+            rollups.record_inspection(inspection)
+            flags.record_inspection(inspection)
+
+        unit_fields = {"first_pass": passed} if inspection.attempt_number == 1 else {}
+        unit_status.transition(unit, "STORE_READY" if passed else "REWORK", **unit_fields)
+
+        # only the newest attempt may set the "latest result"
+        Unit.objects.filter(pk=unit.pk, last_attempt_number__lte=inspection.attempt_number).update(
+            last_result=final_result,
+            last_inspection=inspection,
+        )
+
+        ticket = None
+        if not passed:
+            ticket = ReworkTicket.objects.create(
+                unit=unit,
+                inspection=inspection,
+                failed_stage=failed_stage,
+                reason_summary=reason_summary,
+                assigned_to=None,
+                status="OPEN",
+            )
+
+    unit.refresh_from_db(fields=["status", "last_result", "last_inspection", "first_pass"])
+    metrics.mark_stale(*metrics.INSPECTION_SECTIONS)
+    return ticket
+
+
+def complete_rework(ticket: ReworkTicket) -> None:
+    """
+    Sign off a rework ticket (DONE). Once the unit has no open rework
+    left, a unit in REWORK moves to RETEST and is back in the QC queue.
+    Raises StatusConflict if the ticket was already closed, or the unit
+    changed since it was read; nothing is written then.
+    """
+    unit = ticket.unit
+    with transaction.atomic():
+        closed = ReworkTicket.objects.filter(pk=ticket.pk, status__in=OPEN_REWORK_STATUSES).update(
+            status="DONE", updated_at=timezone.now()
+        )
+        if not closed:
+            raise unit_status.StatusConflict({unit.unit_id: "rework ticket is already closed"})
+        if unit.status == "REWORK" and not unit_status.open_rework(unit).exists():
+            unit_status.transition(unit, "RETEST")
+
+    ticket.status = "DONE"
+    metrics.mark_stale(*metrics.STATUS_SECTIONS)
+
+
+def backfill_unit_state(batch_size: int = 2000) -> int:
+    """
+    Fill the current-state columns from Inspection history, walking units
+    by primary key. Returns the number of units updated.
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        unit_ids = list(
+            Unit.objects.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:batch_size]
+        )
+        if not unit_ids:
+            break
+        last_id = unit_ids[-1]
+
+        stats = {
+            row["unit_id"]: row
+            for row in Inspection.objects.filter(unit_id__in=unit_ids)
+            .values("unit_id")
+            .annotate(
+                last_attempt=Max("attempt_number"),
+                first_pass_n=Count("id", filter=Q(attempt_number=1, final_result="PASS")),
+                first_fail_n=Count("id", filter=Q(attempt_number=1, final_result="FAIL")),
+            )
+            .order_by()
+        }
+        latest = {}
+        for insp in (
+            Inspection.objects.filter(unit_id__in=unit_ids)
+            .order_by("unit_id", "-attempt_number", "-id")
+            .values("id", "unit_id", "final_result")
+        ):
+            latest.setdefault(insp["unit_id"], insp)
+
+        units = []
+        for unit_id in unit_ids:
+            row = stats.get(unit_id)
+            last = latest.get(unit_id)
+            first_pass = None
+            if row and (row["first_pass_n"] or row["first_fail_n"]):
+                first_pass = bool(row["first_pass_n"])
+            units.append(
+                Unit(
+                    id=unit_id,
+                    last_attempt_number=row["last_attempt"] if row else 0,
+                    last_inspection_id=last["id"] if last else None,
+                    last_result=last["final_result"] if last else "",
+                    first_pass=first_pass,
+                )
+            )
+
+        with transaction.atomic():
+            Unit.objects.bulk_update(
+                units, ["last_attempt_number", "last_inspection", "last_result", "first_pass"], batch_size=500
+            )
+        updated += len(units)
+    return updated
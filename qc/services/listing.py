@@ -0,0 +1,43 @@
+# qc/services/listing.py
+from __future__ import annotations
+
+from django.db.models import Count, IntegerField, OuterRef, QuerySet, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from qc.models import Complaint, ComplaintAttachment, Inspection, ReworkTicket, Unit
+
+# rework tickets that still block the unit
+OPEN_REWORK_STATUSES = ("OPEN", "IN_PROGRESS")
+
+
+def count_subquery(qs: QuerySet, fk: str) -> Coalesce:
+    """
+    Correlated COUNT of `qs` rows whose `fk` is the outer row. Unlike
+    Count() over a join it needs no GROUP BY, so a keyset page is still
+    read in index order and only the rows on the page get counted.
+    """
+    counts = qs.filter(**{fk: OuterRef("pk")}).order_by().values(fk).annotate(n=Count("*")).values("n")
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+# =============================================================================
+# List querysets: everything a row shows comes from the base query
+# =============================================================================
+def unit_rows(qs: QuerySet | None = None) -> QuerySet:
+    """
+    Units for frames_list with inspection_count and open_rework_count
+    (last_result / last_attempt_number are columns on Unit already).
+    """
+    qs = Unit.objects.all() if qs is None else qs
+    return qs.annotate(
+        inspection_count=count_subquery(Inspection.objects.all(), "unit"),
+        open_rework_count=count_subquery(ReworkTicket.objects.filter(status__in=OPEN_REWORK_STATUSES), "unit"),
+    )
+
+
+def complaint_rows(qs: QuerySet | None = None) -> QuerySet:
+    """Complaints for complaints_list with their related rows and attachment_count."""
+    qs = Complaint.objects.all() if qs is None else qs
+    return qs.select_related("store", "unit", "created_by").annotate(
+        attachment_count=count_subquery(ComplaintAttachment.objects.all(), "complaint"),
+    )
@@ -0,0 +1,159 @@
+# qc/services/metrics.py
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from qc.models import DailyQualityRollup, QualityFlag, SlaBreachEvent, Unit
+from qc.services import defects
+from qc.services.rollups import window_start_day
+
+CACHE_PREFIX = "qc:metrics:"
+
+FAILED_STATUSES = ["REWORK", "QUARANTINE", "RETEST"]
+
+
+# =============================================================================
+# Metrics
+# =============================================================================
+def counts_overview() -> dict:
+    """
+    Dashboard counts, all from one grouped query over the status index:
+    - not inspected: RECEIVED
+    - in progress: QC_IN_PROGRESS
+    - passed: STORE_READY
+    - failed: REWORK / QUARANTINE / RETEST (you can adjust)
+    """
+    statuses = [s for s, _ in Unit.STATUS_CHOICES]
+    per_status = dict(
+        Unit.objects.filter(status__in=statuses).order_by().values_list("status").annotate(n=Count("id"))
+    )
+    return {
+        "total": sum(per_status.values()),
+        "not_inspected": per_status.get("RECEIVED", 0),
+        "in_progress": per_status.get("QC_IN_PROGRESS", 0),
+        "passed": per_status.get("STORE_READY", 0),
+        "failed": sum(per_status.get(s, 0) for s in FAILED_STATUSES),
+    }
+
+
+def first_pass_yield(days: int = 7) -> dict:
+    """
+    FPY = % of units that PASS on attempt 1 (within the last `days` days,
+    read from the daily rollups).
+    """
+    totals = DailyQualityRollup.objects.filter(day__gte=window_start_day(days)).aggregate(
+        first=Sum("first_attempts"), passed=Sum("first_attempt_passes")
+    )
+    passed = totals["passed"] or 0
+    denom = totals["first"] or 0
+    failed = denom - passed
+    rate = (passed / denom * 100.0) if denom else 0.0
+
+    return {"days": days, "passed": passed, "failed": failed, "total": denom, "rate_percent": round(rate, 2)}
+
+
+def avg_qc_time_hours(days: int = 7) -> float:
+    """
+    Average inspection duration (hours) for completed inspections in window.
+    """
+    totals = DailyQualityRollup.objects.filter(day__gte=window_start_day(days)).aggregate(
+        n=Sum("inspections"), seconds=Sum("qc_seconds")
+    )
+    if not totals["n"]:
+        return 0.0
+
+    return round(totals["seconds"] / totals["n"] / 3600.0, 2)
+
+
+def urgent_sla_breaches() -> int:
+    """
+    URGENT SLA breaches still open: breach events (qc.services.sla) whose
+    unit is not STORE_READY yet.
+    """
+    return SlaBreachEvent.objects.filter(priority="URGENT").exclude(unit__status="STORE_READY").count()
+
+
+def recent_sla_breaches(limit: int = 25, days: int = 7) -> list[dict]:
+    """
+    Latest breach events with a deadline in the last `days` days, newest
+    deadline first, with the unit's current status.
+    """
+    since = timezone.now() - timedelta(days=days)
+    return list(
+        SlaBreachEvent.objects.filter(deadline__gte=since)
+        .order_by("-deadline", "-id")
+        .values("unit__unit_id", "priority", "store__code", "status", "unit__status", "deadline", "detected_at")[:limit]
+    )
+
+
+def active_flags(limit: int = 25) -> list[dict]:
+    return list(
+        QualityFlag.objects.filter(is_active=True)
+        .order_by("-created_at")
+        .values("flag_type", "flag_key", "defect_rate", "threshold", "sample_size")[:limit]
+    )
+
+
+# =============================================================================
+# Cached dashboard snapshot
+# =============================================================================
+# Each section is cached under its own key so a write only has to mark the
+# counters it actually changed as stale (see mark_stale).
+SECTIONS = {
+    "overview": counts_overview,
+    "fpy": lambda: first_pass_yield(days=7),
+    "avg_hours": lambda: avg_qc_time_hours(days=7),
+    "urgent_breaches": urgent_sla_breaches,
+    "sla_breaches": recent_sla_breaches,
+    "active_flags": active_flags,
+    "defect_rates": lambda: defects.worst_defect_rates(days=7),
+}
+
+# Sections touched by a change of Unit.status
+STATUS_SECTIONS = ("overview", "urgent_breaches", "sla_breaches")
+# Sections touched by finalizing an inspection
+INSPECTION_SECTIONS = ("overview", "fpy", "avg_hours", "urgent_breaches", "sla_breaches", "defect_rates")
+# Sections touched by new SLA breach events
+SLA_SECTIONS = ("urgent_breaches", "sla_breaches")
+
+
+def _cache_key(section: str) -> str:
+    return f"{CACHE_PREFIX}{section}"
+
+
+def dashboard_snapshot() -> dict:
+    """
+    Whole dashboard payload. Fresh sections come from the cache in one
+    round trip; only stale/expired sections are recomputed.
+    """
+    keys = {section: _cache_key(section) for section in SECTIONS}
+    cached = cache.get_many(keys.values())
+
+    payload = {}
+    fresh = {}
+    for section, key in keys.items():
+        if key in cached:
+            payload[section] = cached[key]
+        else:
+            payload[section] = fresh[key] = SECTIONS[section]()
+
+    if fresh:
+        cache.set_many(fresh, timeout=getattr(settings, "QC_METRICS_CACHE_TTL", 60))
+    return payload
+
+
+def mark_stale(*sections: str) -> None:
+    """
+    Drop the given snapshot sections so the next dashboard hit recomputes
+    them. Deferred until the current transaction commits (immediate
+    outside one): dropping them earlier would let a concurrent dashboard
+    hit re-cache the pre-commit numbers until the TTL.
+    """
+    keys = [_cache_key(s) for s in sections or SECTIONS]
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,53 @@
+# qc/services/pagination.py
+from __future__ import annotations
+
+import base64
+import json
+
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps([v.isoformat() if hasattr(v, "isoformat") else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list | None:
+    """
+    Returns the cursor values, or None if the cursor is missing/garbled
+    (callers then start from the first page).
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        return None
+    return values if isinstance(values, list) else None
+
+
+def keyset_page(qs: QuerySet, cursor: str, page_size: int, date_field: str = "received_at") -> tuple[list, str | None]:
+    """
+    One page of `qs` ordered by (date_field, id) descending, starting after
+    `cursor`. Costs an index range scan of page_size + 1 rows no matter
+    how deep the page is (unlike OFFSET).
+
+    Returns (rows, next_cursor or None).
+    """
+    qs = qs.order_by(f"-{date_field}", "-id")
+
+    values = decode_cursor(cursor)
+    if values and len(values) == 2:
+        after_date, after_id = parse_datetime(str(values[0])), values[1]
+        if after_date is not None and isinstance(after_id, int):
+            qs = qs.filter(Q(**{f"{date_field}__lt": after_date}) | Q(**{date_field: after_date, "id__lt": after_id}))
+
+    rows = list(qs[: page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, date_field), last.id)
@@ -0,0 +1,197 @@
+# qc/services/rollups.py
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from qc.models import DailyQualityRollup, Defect, Inspection
+
+SEVERITY_FIELDS = {"LOW": "defects_low", "MED": "defects_med", "HIGH": "defects_high"}
+
+# days aggregated per pass of rebuild_rollups (bounds memory on long histories)
+REBUILD_DAYS_PER_PASS = 31
+
+COUNTER_FIELDS = (
+    "inspections",
+    "failures",
+    "first_attempts",
+    "first_attempt_passes",
+    "defects_low",
+    "defects_med",
+    "defects_high",
+    "qc_seconds",
+)
+
+
+def _day_start(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def window_start_day(days: int, today: date | None = None) -> date:
+    """First day of a `days`-day window ending today (inclusive)."""
+    return (today or timezone.localdate()) - timedelta(days=days - 1)
+
+
+# =============================================================================
+# Incremental update (finalize)
+# =============================================================================
+def record_inspection(inspection: Inspection) -> None:
+    """
+    Fold one just-finalized inspection into its rollup row. Call inside
+    the finalize transaction so the rollup commits with the result.
+    """
+    unit = inspection.unit
+    key = {
+        "day": timezone.localdate(inspection.completed_at),
+        "lab": unit.lab or "",
+        "frame_model": unit.frame_model or "",
+        "store_id": unit.store_id,
+        "tech_user_id": inspection.tech_user_id,
+    }
+
+    deltas = {
+        "inspections": 1,
+        "failures": int(inspection.final_result == "FAIL"),
+        "first_attempts": int(inspection.attempt_number == 1),
+        "first_attempt_passes": int(inspection.attempt_number == 1 and inspection.final_result == "PASS"),
+        "qc_seconds": max(0.0, (inspection.completed_at - inspection.started_at).total_seconds()),
+    }
+    severities = (
+        Defect.objects.filter(stage_result__inspection=inspection)
+        .values("severity")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    for row in severities:
+        field = SEVERITY_FIELDS.get(row["severity"])
+        if field:
+            deltas[field] = row["n"]
+
+    increments = {field: F(field) + n for field, n in deltas.items() if n}
+    if DailyQualityRollup.objects.filter(**key).update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            DailyQualityRollup.objects.create(**key, **deltas)
+    except IntegrityError:
+        # another finalize created the row first
+        DailyQualityRollup.objects.filter(**key).update(**increments)
+
+
+# =============================================================================
+# Rebuild / backfill
+# =============================================================================
+def _models(apps=None) -> tuple:
+    """(DailyQualityRollup, Defect, Inspection): live, or a migration's historical ones."""
+    if apps is None:
+        return DailyQualityRollup, Defect, Inspection
+    return tuple(apps.get_model("qc", name) for name in ("DailyQualityRollup", "Defect", "Inspection"))
+
+
+def _aggregate_range(start: date, end: date, apps=None) -> dict:
+    """
+    Rollup values for inspections completed on days [start, end), from two
+    grouped queries (inspections, defects by severity).
+    """
+    _, Defect, Inspection = _models(apps)
+    completed = Q(completed_at__gte=_day_start(start), completed_at__lt=_day_start(end))
+    totals = defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+
+    inspection_rows = (
+        Inspection.objects.filter(completed, final_result__in=["PASS", "FAIL"])
+        .annotate(
+            day=TruncDate("completed_at"),
+            dur=ExpressionWrapper(F("completed_at") - F("started_at"), output_field=DurationField()),
+        )
+        .values("day", "unit__lab", "unit__frame_model", "unit__store", "tech_user")
+        .annotate(
+            n=Count("id"),
+            failed=Count("id", filter=Q(final_result="FAIL")),
+            first=Count("id", filter=Q(attempt_number=1)),
+            first_passed=Count("id", filter=Q(attempt_number=1, final_result="PASS")),
+            seconds=Sum("dur"),
+        )
+        .order_by()
+    )
+    for row in inspection_rows:
+        t = totals[(row["day"], row["unit__lab"], row["unit__frame_model"], row["unit__store"], row["tech_user"])]
+        t["inspections"] += row["n"]
+        t["failures"] += row["failed"]
+        t["first_attempts"] += row["first"]
+        t["first_attempt_passes"] += row["first_passed"]
+        t["qc_seconds"] += max(0.0, row["seconds"].total_seconds()) if row["seconds"] else 0.0
+
+    defect_rows = (
+        Defect.objects.filter(
+            stage_result__inspection__completed_at__gte=_day_start(start),
+            stage_result__inspection__completed_at__lt=_day_start(end),
+            stage_result__inspection__final_result__in=["PASS", "FAIL"],
+        )
+        .annotate(day=TruncDate("stage_result__inspection__completed_at"))
+        .values(
+            "day",
+            "stage_result__inspection__unit__lab",
+            "stage_result__inspection__unit__frame_model",
+            "stage_result__inspection__unit__store",
+            "stage_result__inspection__tech_user",
+            "severity",
+        )
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    for row in defect_rows:
+        field = SEVERITY_FIELDS.get(row["severity"])
+        if not field:
+            continue
+        key = (
+            row["day"],
+            row["stage_result__inspection__unit__lab"],
+            row["stage_result__inspection__unit__frame_model"],
+            row["stage_result__inspection__unit__store"],
+            row["stage_result__inspection__tech_user"],
+        )
+        if key in totals:
+            totals[key][field] += row["n"]
+    return totals
+
+
+def rebuild_rollups(start: date | None = None, end: date | None = None, apps=None) -> int:
+    """
+    Recompute rollup rows for days [start, end] from raw inspections.
+    Defaults to the whole history. Each pass of REBUILD_DAYS_PER_PASS days
+    is replaced in its own transaction. Returns the rows written.
+
+    Migration 0025 runs this once over the whole history (passing its
+    `apps`), so a deployed database has rollups for the inspections it
+    already holds; `manage.py qc_rebuild_rollups` reruns it on demand.
+    """
+    DailyQualityRollup, _, Inspection = _models(apps)
+    if start is None:
+        first = Inspection.objects.filter(completed_at__isnull=False).aggregate(m=Min("completed_at"))["m"]
+        if first is None:
+            DailyQualityRollup.objects.all().delete()
+            return 0
+        start = timezone.localdate(first)
+    end = end or timezone.localdate()
+
+    written = 0
+    day = start
+    while day <= end:
+        stop = min(day + timedelta(days=REBUILD_DAYS_PER_PASS), end + timedelta(days=1))
+        rows = [
+            DailyQualityRollup(
+                day=k[0], lab=k[1] or "", frame_model=k[2] or "", store_id=k[3], tech_user_id=k[4], **values
+            )
+            for k, values in _aggregate_range(day, stop, apps).items()
+        ]
+        with transaction.atomic():
+            DailyQualityRollup.objects.filter(day__gte=day, day__lt=stop).delete()
+            DailyQualityRollup.objects.bulk_create(rows, batch_size=1000)
+        written += len(rows)
+        day = stop
+    return written
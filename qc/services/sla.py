@@ -0,0 +1,124 @@
+# qc/services/sla.py
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from qc.models import SlaBreachEvent, SlaPolicy, Unit
+from qc.services import metrics
+
+# units turned into breach events per transaction
+EMIT_BATCH_SIZE = 500
+
+# fallback when neither a policy nor QC_SLA_HOURS covers a priority
+DEFAULT_HOURS = 48
+
+
+# =============================================================================
+# Deadlines
+# =============================================================================
+def load_policies() -> dict:
+    """{(priority, store_id or None): hours} for every SlaPolicy."""
+    return {(p, store_id): hours for p, store_id, hours in SlaPolicy.objects.values_list("priority", "store_id", "hours")}
+
+
+def hours_for(priority: str, store_id: int | None, policies: dict) -> int:
+    if (priority, store_id) in policies:
+        return policies[(priority, store_id)]
+    if (priority, None) in policies:
+        return policies[(priority, None)]
+    return getattr(settings, "QC_SLA_HOURS", {}).get(priority, DEFAULT_HOURS)
+
+
+def stamp(unit: Unit, policies: dict) -> None:
+    """Set the unit's deadline from received_at/priority/store; the alarm runs unless QC is done."""
+    unit.sla_deadline = unit.received_at + timedelta(hours=hours_for(unit.priority, unit.store_id, policies))
+    unit.sla_alarm_at = None if unit.status == "STORE_READY" else unit.sla_deadline
+
+
+def on_unit_pre_save(sender, instance: Unit, update_fields=None, **kwargs) -> None:
+    """
+    Stamp the deadline when a unit is received, and re-stamp a running
+    clock when priority or store change through save().
+    """
+    if instance._state.adding:
+        if instance.sla_deadline is None:
+            stamp(instance, load_policies())
+    elif instance.sla_alarm_at is not None and (update_fields is None or {"priority", "store"} & set(update_fields)):
+        stamp(instance, load_policies())
+
+
+def recompute_deadlines(priority: str | None = None) -> int:
+    """
+    Re-stamp every running clock (of one priority) from the current
+    policies: one set-based UPDATE per store policy plus one for the
+    rest. Breached or finished units keep their deadline. Returns the
+    number of units updated.
+    """
+    policies = load_policies()
+    priorities = [priority] if priority else [c[0] for c in Unit.PRIORITY_CHOICES]
+    updated = 0
+    for p in priorities:
+        running = Unit.objects.filter(priority=p, sla_alarm_at__isnull=False)
+        store_ids = [store_id for (pp, store_id) in policies if pp == p and store_id is not None]
+        for store_id in store_ids:
+            updated += _restamp(running.filter(store_id=store_id), hours_for(p, store_id, policies))
+        updated += _restamp(running.exclude(store_id__in=store_ids), hours_for(p, None, policies))
+    return updated
+
+
+def _restamp(qs, hours: int) -> int:
+    deadline = F("received_at") + timedelta(hours=hours)
+    return qs.update(sla_deadline=deadline, sla_alarm_at=deadline)
+
+
+def on_policy_changed(sender, instance: SlaPolicy, **kwargs) -> None:
+    recompute_deadlines(instance.priority)
+
+
+# =============================================================================
+# Breach scheduler
+# =============================================================================
+def emit_breaches(now: datetime | None = None, batch_size: int = EMIT_BATCH_SIZE) -> int:
+    """
+    Record an SlaBreachEvent for every unit whose alarm is due, and
+    clear the alarm in the same transaction. Reads `sla_alarm_at <= now`
+    off qc_unit_sla_alarm_idx, so a tick only touches units that just
+    came due, however many units are on the clock. Safe to run from
+    several schedulers: the one-event-per-unit constraint makes repeats
+    no-ops, and SKIP LOCKED (where supported) keeps them off each
+    other's rows. Returns the number of new events.
+    """
+    now = now or timezone.now()
+    emitted = 0
+    while True:
+        with transaction.atomic():
+            due = Unit.objects.filter(sla_alarm_at__lte=now).order_by("sla_alarm_at", "id")
+            if connection.features.has_select_for_update_skip_locked:
+                due = due.select_for_update(skip_locked=True)
+            rows = list(due.values_list("id", "priority", "store_id", "status", "sla_deadline")[:batch_size])
+            if not rows:
+                break
+
+            ids = [row[0] for row in rows]
+            done = set(SlaBreachEvent.objects.filter(unit_id__in=ids).values_list("unit_id", flat=True))
+            SlaBreachEvent.objects.bulk_create(
+                [
+                    SlaBreachEvent(
+                        unit_id=unit_id, priority=priority, store_id=store_id, status=status, deadline=deadline, detected_at=now
+                    )
+                    for unit_id, priority, store_id, status, deadline in rows
+                    if unit_id not in done
+                ],
+                ignore_conflicts=True,
+            )
+            Unit.objects.filter(id__in=ids, sla_alarm_at__lte=now).update(sla_alarm_at=None)
+        emitted += len(rows) - len(done)
+
+    if emitted:
+        metrics.mark_stale(*metrics.SLA_SECTIONS)
+    return emitted
@@ -0,0 +1,106 @@
+# qc/services/submissions.py
+from __future__ import annotations
+
+from django.db import IntegrityError, transaction
+
+from qc.models import DefectPhoto, Inspection, InspectionSubmission
+from qc.services import images, inspections
+
+# longest client key accepted (InspectionSubmission.client_key)
+MAX_KEY_LENGTH = 64
+
+
+class KeyConflict(ValueError):
+    """The client_key was already used for a different inspection."""
+
+
+def submit(client_key: str, inspection_id: int, ops: list[dict], user=None) -> dict:
+    """
+    Apply one tablet batch (an inspection's queued wizard steps) in a
+    single transaction, at most once per `client_key`.
+
+    `ops` are already-parsed steps, applied in order:
+    - {"op": "stage", "stage": ..., "values": {status/notes/data}}
+    - {"op": "defect", "stage": ..., "fields": {...}, "photo": File|None, "annotation": ...}
+    - {"op": "finalize", "final_result": ..., "failed_stage": ..., "reason_summary": ..., "unit_version": int|None}
+
+    A retry of an applied key returns the stored response with
+    duplicate=True and changes nothing; reusing a key for another
+    inspection raises KeyConflict. Raises ValueError (nothing applied,
+    key not consumed) if any step is invalid.
+    """
+    client_key = (client_key or "").strip()
+    if not client_key or len(client_key) > MAX_KEY_LENGTH:
+        raise ValueError(f"client_key must be 1-{MAX_KEY_LENGTH} characters")
+
+    done = _stored_response(client_key, inspection_id)
+    if done is not None:
+        return done
+
+    try:
+        with transaction.atomic():
+            inspection = Inspection.objects.select_for_update().select_related("unit").filter(id=inspection_id).first()
+            if inspection is None:
+                raise ValueError(f"Unknown inspection {inspection_id}")
+            # claims the key first: a concurrent retry blocks here, then fails the unique check
+            submission = InspectionSubmission.objects.create(
+                client_key=client_key,
+                inspection=inspection,
+                submitted_by=user if user and user.is_authenticated else None,
+                actions=len(ops),
+            )
+            response = {"client_key": client_key, "inspection_id": inspection.id, **_apply(inspection, ops)}
+            submission.response = response
+            submission.save(update_fields=["response"])
+    except IntegrityError:
+        done = _stored_response(client_key, inspection_id)
+        if done is None:
+            raise
+        return done
+    return {**response, "duplicate": False}
+
+
+def _stored_response(client_key: str, inspection_id: int) -> dict | None:
+    stored = InspectionSubmission.objects.filter(client_key=client_key).values_list("inspection_id", "response").first()
+    if stored is None:
+        return None
+    if stored[0] != inspection_id:
+        raise KeyConflict(f"client_key {client_key} was already used for inspection {stored[0]}")
+    return {**stored[1], "duplicate": True}
+
+
+def _apply(inspection: Inspection, ops: list[dict]) -> dict:
+    stage_results = {sr.stage: sr for sr in inspection.stage_results.all()}
+    defect_ids = []
+    ticket = None
+
+    for op in ops:
+        if op["op"] == "finalize":
+            ticket = inspections.finalize_inspection(
+                inspection,
+                op["final_result"],
+                failed_stage=op["failed_stage"],
+                reason_summary=op["reason_summary"],
+                unit_version=op.get("unit_version"),
+            )
+            continue
+
+        sr = stage_results.get(op["stage"])
+        if sr is None:
+            raise ValueError(f"Unknown stage {op['stage']}")
+        if op["op"] == "stage":
+            inspections.save_stage(sr, **op["values"])
+        else:
+            defect = inspections.add_defect(sr, **op["fields"])
+            defect_ids.append(defect.id)
+            if op.get("photo"):
+                images.enqueue_photo(
+                    DefectPhoto.objects.create(defect=defect, image=op["photo"], annotation_json=op.get("annotation"))
+                )
+
+    return {
+        "stages": {stage: sr.status for stage, sr in stage_results.items()},
+        "defects": defect_ids,
+        "final_result": inspection.final_result,
+        "rework_ticket_id": ticket.id if ticket else None,
+    }
@@ -0,0 +1,111 @@
+# qc/services/unit_search.py
+from __future__ import annotations
+
+from django.db import connection, transaction
+
+from qc.models import Unit, UnitSearchTerm
+
+# upper bound for the SQLite prefix range scan: term >= q AND term < q + MAX_CHAR
+MAX_CHAR = "\U0010ffff"
+
+# units per delete/insert round trip when (re)indexing
+INDEX_BATCH_SIZE = 500
+
+
+def terms_for(*values: str | None) -> set[str]:
+    """
+    All suffixes of the lowercased values. "contains q" on the original
+    value is then "some suffix starts with q".
+    """
+    terms = set()
+    for value in values:
+        value = (value or "").strip().lower()
+        for i in range(len(value)):
+            terms.add(value[i:])
+    return terms
+
+
+def index_units(rows, fresh: bool = False) -> int:
+    """
+    (Re)build the search terms for an iterable of (id, unit_id, order_id).
+    `fresh=True` skips deleting old terms (rows that were just inserted).
+    Returns the number of terms written.
+    """
+    written = 0
+    rows = list(rows)
+    for start in range(0, len(rows), INDEX_BATCH_SIZE):
+        batch = rows[start : start + INDEX_BATCH_SIZE]
+        terms = [
+            UnitSearchTerm(unit_id=pk, term=term)
+            for pk, unit_id, order_id in batch
+            for term in terms_for(unit_id, order_id)
+        ]
+        with transaction.atomic():
+            if not fresh:
+                UnitSearchTerm.objects.filter(unit_id__in=[r[0] for r in batch]).delete()
+            UnitSearchTerm.objects.bulk_create(terms, batch_size=2000)
+        written += len(terms)
+    return written
+
+
+def index_new_units(units) -> int:
+    """
+    Index Unit instances that were just bulk-created (bulk writes bypass
+    the post_save signal). Falls back to a lookup if the backend didn't
+    return primary keys.
+    """
+    units = list(units)
+    if any(u.pk is None for u in units):
+        rows = Unit.objects.filter(unit_id__in=[u.unit_id for u in units]).values_list("id", "unit_id", "order_id")
+    else:
+        rows = [(u.pk, u.unit_id, u.order_id) for u in units]
+    return index_units(rows, fresh=True)
+
+
+def rebuild_index(batch_size: int = 5000) -> int:
+    """
+    Backfill/repair the whole table, walking units by primary key.
+    """
+    written = 0
+    last_id = 0
+    while True:
+        rows = list(
+            Unit.objects.filter(id__gt=last_id).order_by("id").values_list("id", "unit_id", "order_id")[:batch_size]
+        )
+        if not rows:
+            break
+        written += index_units(rows)
+        last_id = rows[-1][0]
+    return written
+
+
+def matching_unit_ids(q: str):
+    """
+    Subquery of Unit ids whose unit_id or order_id contains `q`
+    (case-insensitive), answered from the term index.
+    """
+    q = q.strip().lower()
+    if connection.vendor == "sqlite":
+        # SQLite compares text bytewise, so the range is exactly the prefix
+        # match (and, unlike LIKE, it is served by the term index)
+        terms = UnitSearchTerm.objects.filter(term__gte=q, term__lt=q + MAX_CHAR)
+    else:
+        # collation-aware ordering (Postgres) would make the range match
+        # across punctuation; LIKE 'q%' uses qc_unit_term_prefix_idx
+        terms = UnitSearchTerm.objects.filter(term__startswith=q)
+    return terms.values("unit_id").distinct()
+
+
+def search_key(unit: Unit) -> tuple:
+    """The indexed values as loaded/assigned (never triggers a deferred-field load)."""
+    return unit.__dict__.get("unit_id"), unit.__dict__.get("order_id")
+
+
+def on_unit_saved(sender, instance: Unit, created: bool, update_fields=None, **kwargs) -> None:
+    if update_fields is not None and not {"unit_id", "order_id"} & set(update_fields):
+        return
+    # plain save() of a loaded unit: reindex only if unit_id/order_id changed
+    if not created and search_key(instance) == getattr(instance, "_search_key", None):
+        return
+    index_units([(instance.id, instance.unit_id, instance.order_id)])
+    instance._search_key = search_key(instance)
@@ -0,0 +1,125 @@
+# qc/services/unit_status.py
+from __future__ import annotations
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from qc.models import ReworkTicket, Unit
+from qc.services.listing import OPEN_REWORK_STATUSES
+
+STATUSES = [c[0] for c in Unit.STATUS_CHOICES]
+
+# status -> statuses the QC workflow may move a unit to
+TRANSITIONS = {
+    "RECEIVED": {"QC_IN_PROGRESS", "QUARANTINE"},
+    # a new attempt may supersede an abandoned one
+    "QC_IN_PROGRESS": {"QC_IN_PROGRESS", "STORE_READY", "REWORK", "QUARANTINE"},
+    "REWORK": {"QC_IN_PROGRESS", "RETEST", "QUARANTINE"},
+    "RETEST": {"QC_IN_PROGRESS", "QUARANTINE"},
+    "STORE_READY": {"QC_IN_PROGRESS", "RETEST", "QUARANTINE"},
+    "QUARANTINE": {"RECEIVED", "REWORK", "RETEST"},
+}
+
+# the frames import mirrors the lab system and may set any status, except
+# on a unit that is being inspected (the inspection decides that one)
+IMPORT_TRANSITIONS = {s: set() if s == "QC_IN_PROGRESS" else set(STATUSES) for s in STATUSES}
+
+
+class StatusConflict(ValueError):
+    """
+    Units changed since they were read (or an open rework ticket blocks
+    STORE_READY); nothing was written. `errors` maps unit_id -> reason.
+    """
+
+    def __init__(self, errors: dict[str, str]):
+        self.errors = errors
+        super().__init__("; ".join(f"{unit_id}: {reason}" for unit_id, reason in list(errors.items())[:5]))
+
+
+class _Partial(Exception):
+    pass
+
+
+def allowed(from_status: str, to_status: str, transitions: dict = TRANSITIONS) -> bool:
+    return to_status in transitions.get(from_status, ())
+
+
+def open_rework(unit_ref=OuterRef("pk")):
+    return ReworkTicket.objects.filter(unit=unit_ref, status__in=OPEN_REWORK_STATUSES)
+
+
+# =============================================================================
+# Transitions: conditional UPDATE ... WHERE status = <read> AND version = <read>
+# =============================================================================
+def transition(unit: Unit, to_status: str, transitions: dict = TRANSITIONS, **fields) -> None:
+    transition_many([unit], to_status, transitions, **fields)
+
+
+def transition_many(units, to_status: str, transitions: dict = TRANSITIONS, **fields) -> None:
+    """
+    Move units from the status/version they were read with to `to_status`,
+    bumping `version`. Units read with the same (status, version) share one
+    UPDATE, so a tray of fresh units costs a single statement. `fields`
+    (values or F() expressions) are written in the same statements;
+    reaching STORE_READY also stops the SLA clock (sla_alarm_at).
+
+    All or nothing: raises ValueError for a transition `transitions` does
+    not allow, and StatusConflict if any row changed since it was read or,
+    for STORE_READY, has an open rework ticket. On success the instances'
+    status, version, updated_at and plain-value fields are brought up to
+    date.
+    """
+    units = list({u.pk: u for u in units}.values())
+    bad = [u for u in units if not allowed(u.status, to_status, transitions)]
+    if bad:
+        raise ValueError(f"Unit {bad[0].unit_id}: {bad[0].status} -> {to_status} is not allowed")
+    if not units:
+        return
+
+    groups = defaultdict(list)
+    for unit in units:
+        groups[(unit.status, unit.version)].append(unit.pk)
+    if to_status == "STORE_READY":
+        fields.setdefault("sla_alarm_at", None)
+
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            updated = 0
+            for (status, version), pks in groups.items():
+                qs = Unit.objects.filter(pk__in=pks, status=status, version=version)
+                if to_status == "STORE_READY":
+                    qs = qs.filter(~Exists(open_rework()))
+                updated += qs.update(status=to_status, version=F("version") + 1, updated_at=now, **fields)
+            if updated != len(units):
+                raise _Partial
+    except _Partial:
+        raise _conflict(units, to_status) from None
+
+    values = {k: v for k, v in fields.items() if not hasattr(v, "resolve_expression")}
+    for unit in units:
+        unit.status, unit.version, unit.updated_at = to_status, unit.version + 1, now
+        for k, v in values.items():
+            setattr(unit, k, v)
+
+
+def _conflict(units: list[Unit], to_status: str) -> StatusConflict:
+    current = {
+        row[0]: row[1:]
+        for row in Unit.objects.filter(pk__in=[u.pk for u in units])
+        .annotate(has_open_rework=Exists(open_rework()))
+        .values_list("id", "status", "version", "has_open_rework")
+    }
+    errors = {}
+    for unit in units:
+        status, version, has_open_rework = current.get(unit.pk, (None, None, False))
+        if status is None:
+            errors[unit.unit_id] = "unit no longer exists"
+        elif (status, version) != (unit.status, unit.version):
+            errors[unit.unit_id] = f"changed to {status} by someone else (expected {unit.status}); reload and retry"
+        elif to_status == "STORE_READY" and has_open_rework:
+            errors[unit.unit_id] = "has an open rework ticket, cannot be STORE_READY"
+    return StatusConflict(errors or {u.unit_id: "changed by someone else; reload and retry" for u in units})
@@ -0,0 +1,219 @@
+# qc/services/uploads.py
+from __future__ import annotations
+
+import math
+import os
+import shutil
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from qc.models import Complaint, ComplaintAttachment, UploadChunk, UploadSession
+from qc.services import blobs
+
+# bytes copied per read from the request stream / part file
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+def _chunk_size() -> int:
+    return getattr(settings, "QC_UPLOAD_CHUNK_SIZE", 5 * 1024 * 1024)
+
+
+def _upload_dir() -> Path:
+    return Path(getattr(settings, "QC_UPLOAD_DIR", "") or Path(settings.MEDIA_ROOT) / "upload_sessions")
+
+
+def _session_dir(session: UploadSession) -> Path:
+    return _upload_dir() / session.key
+
+
+def _part_path(session: UploadSession, file_index: int) -> Path:
+    return _session_dir(session) / f"{file_index}.part"
+
+
+def chunk_count(size: int, chunk_size: int) -> int:
+    return max(1, math.ceil(size / chunk_size))
+
+
+# =============================================================================
+# Sessions
+# =============================================================================
+def create_session(complaint: Complaint, user, files: list, note: str = "") -> UploadSession:
+    """
+    Open a session for `files` ([{"name": ..., "size": ...}, ...]).
+    Raises ValueError on a bad file list.
+    """
+    max_files = getattr(settings, "QC_UPLOAD_MAX_FILES", 20)
+    max_bytes = getattr(settings, "QC_UPLOAD_MAX_BYTES", 2 * 1024**3)
+
+    if not isinstance(files, list) or not files:
+        raise ValueError("No files in upload")
+    if len(files) > max_files:
+        raise ValueError(f"At most {max_files} files per upload")
+
+    cleaned = []
+    for f in files:
+        name = os.path.basename(str((f or {}).get("name", "")).strip())[:200]
+        size = (f or {}).get("size")
+        if not name:
+            raise ValueError("Every file needs a name")
+        if not isinstance(size, int) or size <= 0 or size > max_bytes:
+            raise ValueError(f"{name}: size must be between 1 and {max_bytes} bytes")
+        cleaned.append({"name": name, "size": size})
+
+    session = UploadSession.objects.create(
+        key=uuid.uuid4().hex,
+        complaint=complaint,
+        created_by=user if user and user.is_authenticated else None,
+        note=note,
+        files=cleaned,
+        chunk_size=_chunk_size(),
+    )
+    _session_dir(session).mkdir(parents=True, exist_ok=True)
+    return session
+
+
+def progress(session: UploadSession) -> dict:
+    """
+    JSON-safe state for the client; `missing` lists the chunk indexes
+    still to send, which is all a client needs to resume.
+    """
+    received = {}
+    for file_index, chunk_index in UploadChunk.objects.filter(session=session).values_list(
+        "file_index", "chunk_index"
+    ):
+        received.setdefault(file_index, set()).add(chunk_index)
+
+    files = []
+    for i, f in enumerate(session.files):
+        total = chunk_count(f["size"], session.chunk_size)
+        got = received.get(i, set())
+        files.append(
+            {
+                "index": i,
+                "name": f["name"],
+                "size": f["size"],
+                "chunks": total,
+                "received": len(got),
+                "missing": [c for c in range(total) if c not in got],
+            }
+        )
+    return {
+        "session": session.key,
+        "status": session.status,
+        "chunk_size": session.chunk_size,
+        "files": files,
+        "complete": session.status == "COMPLETE",
+    }
+
+
+# =============================================================================
+# Chunks
+# =============================================================================
+def write_chunk(session: UploadSession, file_index: int, chunk_index: int, stream) -> None:
+    """
+    Copy one fixed-size chunk from `stream` into its place in the file's
+    part file (at chunk_index * chunk_size), COPY_BUFFER_SIZE bytes at a
+    time. Re-sending a chunk just overwrites it. Raises ValueError if the
+    chunk doesn't belong to the session or has the wrong length.
+    """
+    if session.status != "OPEN":
+        raise ValueError(f"Upload session is {session.status.lower()}")
+    if not 0 <= file_index < len(session.files):
+        raise ValueError("Unknown file")
+    size = session.files[file_index]["size"]
+    if not 0 <= chunk_index < chunk_count(size, session.chunk_size):
+        raise ValueError("Chunk index out of range")
+
+    offset = chunk_index * session.chunk_size
+    expected = min(session.chunk_size, size - offset)
+
+    path = _part_path(session, file_index)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # O_CREAT without O_TRUNC: chunks of the same file may arrive in parallel
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    written = 0
+    with os.fdopen(fd, "r+b") as out:
+        out.seek(offset)
+        while True:
+            buf = stream.read(min(COPY_BUFFER_SIZE, expected + 1 - written))
+            if not buf:
+                break
+            if written + len(buf) > expected:
+                raise ValueError(f"Chunk {chunk_index} is longer than {expected} bytes")
+            out.write(buf)
+            written += len(buf)
+    if written != expected:
+        raise ValueError(f"Chunk {chunk_index} should be {expected} bytes, got {written}")
+
+    UploadChunk.objects.bulk_create(
+        [UploadChunk(session=session, file_index=file_index, chunk_index=chunk_index)], ignore_conflicts=True
+    )
+    UploadSession.objects.filter(id=session.id).update(updated_at=timezone.now())
+
+
+# =============================================================================
+# Completion
+# =============================================================================
+def complete_session(session_id: int) -> list[ComplaintAttachment]:
+    """
+    Once every chunk has landed: stream each part file into attachment
+    storage (bounded memory), then create all attachment rows with one
+    bulk_create. Raises ValueError listing what is still missing.
+    """
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(id=session_id)
+        if session.status == "COMPLETE":
+            return []
+        if session.status != "OPEN":
+            raise ValueError(f"Upload session is {session.status.lower()}")
+
+        state = progress(session)
+        incomplete = [f["name"] for f in state["files"] if f["missing"]]
+        if incomplete:
+            raise ValueError(f"Missing chunks for: {', '.join(incomplete)}")
+
+        field = ComplaintAttachment._meta.get_field("file")
+        attachments = []
+        for i, f in enumerate(session.files):
+            path = _part_path(session, i)
+            if path.stat().st_size != f["size"]:
+                raise ValueError(f"{f['name']}: reassembled size does not match")
+            attachment = ComplaintAttachment(
+                complaint_id=session.complaint_id, note=session.note, uploaded_by_id=session.created_by_id
+            )
+            with path.open("rb") as part:
+                name = field.generate_filename(attachment, f["name"])
+                attachment.file.name = field.storage.save(name, File(part, name=f["name"]))
+            attachments.append(attachment)
+
+        ComplaintAttachment.objects.bulk_create(attachments)
+        blobs.add_refs_for(attachments)
+
+        session.status = "COMPLETE"
+        session.completed_at = session.updated_at = timezone.now()
+        session.save(update_fields=["status", "completed_at", "updated_at"])
+        session.chunks.all().delete()
+
+        session_dir = _session_dir(session)
+        transaction.on_commit(lambda: shutil.rmtree(session_dir, ignore_errors=True))
+    return attachments
+
+
+def expire_sessions(hours: int = 24) -> int:
+    """
+    Drop the part files of sessions with no chunk for `hours` hours.
+    """
+    cutoff = timezone.now() - timedelta(hours=hours)
+    expired = 0
+    for session in UploadSession.objects.filter(status="OPEN", updated_at__lt=cutoff).iterator():
+        if UploadSession.objects.filter(id=session.id, status="OPEN").update(status="EXPIRED"):
+            session.chunks.all().delete()
+            shutil.rmtree(_session_dir(session), ignore_errors=True)
+            expired += 1
+    return expired
@@ -0,0 +1,101 @@
+# qc/services/work_queue.py
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from qc.models import Unit
+
+# URGENT first, then earliest SLA deadline, then oldest;
+# qc_unit_queue_idx serves it as a range scan.
+QUEUE_ORDER = ("queue_rank", "sla_deadline", "received_at", "id")
+
+# candidates read per conditional-update round, per unit still wanted
+CANDIDATE_FACTOR = 3
+
+
+def _stale_before():
+    return timezone.now() - timedelta(minutes=getattr(settings, "QC_QUEUE_CLAIM_MINUTES", 30))
+
+
+def _claimable() -> Q:
+    # waiting for QC and not held by a live claim (abandoned claims lapse)
+    return Q(queue_rank__isnull=False) & (Q(claimed_by__isnull=True) | Q(claimed_at__lt=_stale_before()))
+
+
+def waiting() -> QuerySet:
+    """Units waiting for QC (Unit.QUEUE_STATUSES), in queue order."""
+    return Unit.objects.filter(queue_rank__isnull=False).order_by(*QUEUE_ORDER)
+
+
+def claims(user) -> QuerySet:
+    """The user's live claims, in queue order."""
+    return waiting().filter(claimed_by=user, claimed_at__gte=_stale_before())
+
+
+# =============================================================================
+# Claiming
+# =============================================================================
+def claim(user, n: int = 1) -> list[int]:
+    """
+    Claim the next `n` claimable units for `user`; returns their ids
+    (fewer when the queue runs dry).
+
+    With SKIP LOCKED (Postgres) candidates are locked as they are read
+    and rows another tech is claiming are skipped, so concurrent claims
+    neither wait nor collide. Elsewhere (SQLite) each candidate is taken
+    by a conditional UPDATE that only matches while it is still
+    claimable; a lost race moves on to the next candidate.
+    """
+    if n <= 0:
+        return []
+    now = timezone.now()
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(
+                Unit.objects.filter(_claimable())
+                .order_by(*QUEUE_ORDER)
+                .select_for_update(skip_locked=True)
+                .values_list("id", flat=True)[:n]
+            )
+            Unit.objects.filter(id__in=ids).update(claimed_by=user, claimed_at=now)
+        return ids
+
+    claimed = []
+    while len(claimed) < n:
+        wanted = n - len(claimed)
+        candidates = list(
+            Unit.objects.filter(_claimable())
+            .order_by(*QUEUE_ORDER)
+            .values_list("id", flat=True)[: wanted * CANDIDATE_FACTOR]
+        )
+        if not candidates:
+            break
+        for unit_id in candidates:
+            if Unit.objects.filter(_claimable(), id=unit_id).update(claimed_by=user, claimed_at=now):
+                claimed.append(unit_id)
+                if len(claimed) == n:
+                    break
+    return claimed
+
+
+def next_units(user, n: int | None = None) -> list[Unit]:
+    """
+    Up to `n` (QC_QUEUE_BATCH) units for `user`: their live claims,
+    topped up with newly claimed ones.
+    """
+    n = n or getattr(settings, "QC_QUEUE_BATCH", 5)
+    held = claims(user).count()
+    if held < n:
+        claim(user, n - held)
+    return list(claims(user).select_related("store")[:n])
+
+
+def release(user, unit_ids) -> int:
+    """Hand the user's claims on `unit_ids` back to the queue."""
+    return Unit.objects.filter(id__in=unit_ids, claimed_by=user).update(claimed_by=None, claimed_at=None)
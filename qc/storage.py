@@ -0,0 +1,124 @@
+# qc/storage.py
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# every blob lives under blobs/<2 hex>/<2 hex>/<sha256><ext>
+BLOB_PREFIX = "blobs"
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Local storage that keeps each distinct file content once, named by
+    its SHA-256. Saving bytes that are already stored writes nothing and
+    returns the existing name. Every blob has a StoredBlob row whose
+    refcount is kept by qc.services.blobs; `delete()` is a no-op and
+    unreferenced blobs are reclaimed by `manage.py qc_gc_blobs`.
+    """
+
+    def _digest(self, content) -> tuple[str, int]:
+        sha = hashlib.sha256()
+        size = 0
+        for chunk in content.chunks(HASH_CHUNK_SIZE):
+            sha.update(chunk)
+            size += len(chunk)
+        return sha.hexdigest(), size
+
+    def _blob_name(self, digest: str, name: str) -> str:
+        ext = os.path.splitext(name)[1].lower()[:16]
+        return f"{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+    def _save(self, name, content):
+        seekable = hasattr(content, "seek") and getattr(content, "seekable", lambda: True)()
+        if seekable:
+            # hash first so duplicate content costs a read, not a write
+            content.seek(0)
+            digest, size = self._digest(content)
+            existing = self._touch_existing(digest)
+            if existing:
+                return existing
+            content.seek(0)
+            return self._write_blob(self._blob_name(digest, name), content, digest, size)
+
+        # one-shot stream: hash while spooling to a temp file beside the blobs
+        sha = hashlib.sha256()
+        size = 0
+        os.makedirs(self.path(BLOB_PREFIX), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path(BLOB_PREFIX), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                for chunk in content.chunks(HASH_CHUNK_SIZE):
+                    sha.update(chunk)
+                    size += len(chunk)
+                    tmp.write(chunk)
+            digest = sha.hexdigest()
+            existing = self._touch_existing(digest)
+            if existing:
+                return existing
+            blob_name = self._blob_name(digest, name)
+            os.makedirs(os.path.dirname(self.path(blob_name)), exist_ok=True)
+            os.replace(tmp_path, self.path(blob_name))
+            tmp_path = None
+            return self._register(blob_name, digest, size)
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _touch_existing(self, digest: str) -> str | None:
+        from qc.models import StoredBlob
+
+        # touch first: restarts the garbage collector's grace period for a blob
+        # about to be referenced, and 0 rows means the collector just deleted
+        # it (its file is about to be purged), so the bytes are saved afresh
+        if not StoredBlob.objects.filter(digest=digest).update(touched_at=timezone.now()):
+            return None
+        blob = StoredBlob.objects.filter(digest=digest).values_list("name", flat=True).first()
+        if blob is None or not self.exists(blob):
+            return None
+        return blob
+
+    def _write_blob(self, blob_name: str, content, digest: str, size: int) -> str:
+        if not self.exists(blob_name):
+            written = super()._save(blob_name, content)
+            if written != blob_name:
+                # a concurrent writer stored the same bytes first
+                super().delete(written)
+        return self._register(blob_name, digest, size)
+
+    def _register(self, blob_name: str, digest: str, size: int) -> str:
+        from qc.models import StoredBlob
+
+        try:
+            with transaction.atomic():
+                StoredBlob.objects.get_or_create(digest=digest, defaults={"name": blob_name, "size": size})
+        except IntegrityError:
+            pass
+        StoredBlob.objects.filter(digest=digest).update(touched_at=timezone.now())
+        return StoredBlob.objects.filter(digest=digest).values_list("name", flat=True).get()
+
+    def delete(self, name):
+        """Shared blobs are only removed by the garbage collector (purge)."""
+
+    def purge(self, name):
+        super().delete(name)
+
+
+_storage = None
+
+
+def content_addressed_storage() -> ContentAddressedStorage:
+    """Storage callable for the attachment/photo FileFields (MEDIA_ROOT)."""
+    global _storage
+    if _storage is None:
+        _storage = ContentAddressedStorage()
+    return _storage
@@ -1,3 +1,1650 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import timedelta
+from unittest import addModuleCleanup, mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from .importers import LOOKUP_CHUNK_SIZE, import_frames_csv, iter_csv_rows
+from .middleware import request_stats
+from .models import (
+    Complaint,
+    ComplaintAttachment,
+    DailyQualityRollup,
+    Defect,
+    DefectPhoto,
+    FlagDetectorState,
+    ImportJob,
+    Inspection,
+    InspectionStageResult,
+    InspectionSubmission,
+    QualityFlag,
+    ReworkTicket,
+    SlaBreachEvent,
+    SlaPolicy,
+    Store,
+    StoredBlob,
+    Unit,
+    UploadSession,
+)
+from .services import (
+    blobs,
+    complaint_search,
+    defects,
+    exports,
+    flags,
+    images,
+    import_jobs,
+    inspections,
+    metrics,
+    rollups,
+    sla,
+    unit_search,
+    unit_status,
+    uploads,
+    work_queue,
+)
+from .services.pagination import keyset_page
+
+# benchmark timings; silent unless the "qc.bench" logger is enabled
+bench_log = logging.getLogger("qc.bench")
+
+
+def setUpModule():
+    # slow-request warnings are noise in a test run (the test client is slow);
+    # RequestStatsTests reads them through assertLogs, which sets its own level
+    request_log = logging.getLogger("qc.requests")
+    addModuleCleanup(request_log.setLevel, request_log.level)
+    request_log.setLevel(logging.CRITICAL)
+
+
+def _frames_csv(rows: list[list[str]]) -> io.BytesIO:
+    lines = ["unit_id,order_id,frame_model,lab,priority,status"]
+    lines += [",".join(r) for r in rows]
+    return io.BytesIO(("\ufeff" + "\n".join(lines) + "\n").encode("utf-8"))
+
+
+def _explain(sql: str) -> str:
+    prefix = "EXPLAIN QUERY PLAN " if connection.vendor == "sqlite" else "EXPLAIN "
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql)
+        return "\n".join(" ".join(str(c) for c in row) for row in cursor.fetchall())
+
+
+class FramesImportTests(TestCase):
+    def test_creates_updates_and_reports_bad_rows(self):
+        Unit.objects.create(unit_id="U-1", frame_model="Old", lab="Lab A")
+
+        result = import_frames_csv(
+            _frames_csv(
+                [
+                    ["U-1", "ORD-1", "Model 100", "Lab A", "normal", "received"],
+                    ["U-2", "", "Model 200", "Lab B", "URGENT", ""],
+                    ["", "ORD-3", "Model 300", "Lab B", "NORMAL", "RECEIVED"],
+                    ["U-4", "ORD-4", "Model 300", "Lab B", "SOMEDAY", "RECEIVED"],
+                ]
+            )
+        )
+
+        self.assertEqual((result["created"], result["updated"]), (1, 1))
+        self.assertEqual([e["line"] for e in result["errors"]], [4, 5])
+        self.assertEqual(Unit.objects.get(unit_id="U-1").frame_model, "Model 100")
+        u2 = Unit.objects.get(unit_id="U-2")
+        self.assertEqual((u2.order_id, u2.priority, u2.status), (None, "URGENT", "RECEIVED"))
+
+    def test_streams_chunks_split_mid_character(self):
+        data = "unit_id,order_id,frame_model,lab,priority,status\r\nU-é1,,Modèle 1,Lab A,,\r\n".encode("utf-8")
+        chunks = [b"\xef\xbb\xbf"] + [data[i : i + 3] for i in range(0, len(data), 3)]
+
+        rows = list(iter_csv_rows(chunks))
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual((rows[0]["unit_id"], rows[0]["frame_model"]), ("U-é1", "Modèle 1"))
+
+    def test_missing_columns(self):
+        with self.assertRaises(ValueError):
+            import_frames_csv(io.BytesIO(b"unit_id,lab\nU-1,Lab A\n"))
+
+
+class FramesImportBenchmark(TestCase):
+    ROWS = 5000
+
+    def test_bulk_import_throughput(self):
+        rows = [[f"U-{i:06d}", f"ORD-{i:06d}", f"Model {i % 7}", f"Lab {i % 3}", "NORMAL", "RECEIVED"] for i in range(self.ROWS)]
+
+        t0 = time.perf_counter()
+        with CaptureQueriesContext(connection) as ctx:
+            result = import_frames_csv(_frames_csv(rows), batch_size=1000)
+        created_rps = self.ROWS / (time.perf_counter() - t0)
+        self.assertEqual(result["created"], self.ROWS)
+        # set-based: a bounded number of statements per lookup chunk, not two per row
+        self.assertLess(len(ctx.captured_queries), self.ROWS // LOOKUP_CHUNK_SIZE * 30)
+
+        for r in rows[::2]:
+            r[5] = "STORE_READY"
+        t0 = time.perf_counter()
+        with CaptureQueriesContext(connection) as ctx:
+            result = import_frames_csv(_frames_csv(rows), batch_size=1000)
+        updated_rps = self.ROWS / (time.perf_counter() - t0)
+        self.assertEqual((result["updated"], result["unchanged"]), (self.ROWS // 2, self.ROWS // 2))
+        self.assertLess(len(ctx.captured_queries), self.ROWS // LOOKUP_CHUNK_SIZE * 30)
+
+        bench_log.info(f"frames import: create {created_rps:,.0f} rows/s, re-import {updated_rps:,.0f} rows/s")
+
+    def test_rows_consumed_in_chunks(self):
+        # memory stays flat in file size if the importer writes each batch before
+        # reading far ahead: record, as each 500-row chunk of the file is handed
+        # over, how many unit INSERTs have already run
+        n, chunk_rows = 8000, 500
+        inserts, lags = [0], []
+
+        def chunks():
+            yield b"unit_id,order_id,frame_model,lab,priority,status\n"
+            for i in range(0, n, chunk_rows):
+                lags.append(i // chunk_rows - inserts[0])
+                yield "".join(f"M-{j:07d},ORD-{j:07d},Model 1,Lab A,NORMAL,RECEIVED\n" for j in range(i, i + chunk_rows)).encode()
+
+        class Upload:
+            def chunks(self, chunk_size=None):
+                return chunks()
+
+        def count_inserts(execute, sql, params, many, context):
+            if sql.startswith('INSERT INTO "qc_unit" '):
+                inserts[0] += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_inserts):
+            result = import_frames_csv(Upload(), batch_size=500)
+
+        self.assertEqual(result["created"], n)
+        self.assertGreaterEqual(inserts[0], n // 500)
+        # never more than a batch and a chunk read ahead of what was written
+        self.assertLessEqual(max(lags), 2)
+
+
+@override_settings(QC_IMPORT_WORKER="command")
+class ImportJobTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media.name))
+
+    def _spooled(self) -> list[str]:
+        return os.listdir(os.path.join(self.media.name, "import_jobs"))
+
+    def _upload(self, n: int) -> SimpleUploadedFile:
+        data = _frames_csv([[f"J-{i:04d}", "", "Model 1", "Lab A", "NORMAL", "RECEIVED"] for i in range(n)])
+        return SimpleUploadedFile("manifest.csv", data.getvalue(), content_type="text/csv")
+
+    def test_upload_queues_job_and_worker_reports_progress(self):
+        self.client.force_login(User.objects.create_user("tech"))
+
+        resp = self.client.post("/ui/import/upload/", {"file": self._upload(25)})
+        job = ImportJob.objects.get()
+        self.assertRedirects(resp, f"/ui/import/?job={job.id}", fetch_redirect_response=False)
+        self.assertEqual((job.status, Unit.objects.count()), ("QUEUED", 0))
+
+        job_id = import_jobs.claim_next_job("test")
+        import_jobs.run_import_job(job_id, "test")
+
+        progress = self.client.get(f"/ui/import/jobs/{job.id}/").json()
+        self.assertEqual((progress["status"], progress["created"], progress["percent"]), ("DONE", 25, 100.0))
+        self.assertEqual(self._spooled(), [])  # the spool goes once the job is done
+
+    def test_resumes_after_last_committed_batch(self):
+        job = import_jobs.enqueue_import(self._upload(30))
+        # a worker committed the first 10 rows (lines 2..11) and died
+        ImportJob.objects.filter(id=job.id).update(
+            status="RUNNING", last_committed_line=11, created_count=10, heartbeat_at=timezone.now()
+        )
+
+        self.assertIsNone(import_jobs.claim_next_job("test"))  # still heartbeating
+        ImportJob.objects.filter(id=job.id).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        job_id = import_jobs.claim_next_job("test")
+
+        job = import_jobs.run_import_job(job_id, "test")
+
+        self.assertEqual((job.status, job.created_count), ("DONE", 30))
+        self.assertEqual(Unit.objects.count(), 20)  # rows before the resume point were not re-read
+
+    def test_reclaimed_worker_stops_without_applying_rows(self):
+        job = import_jobs.enqueue_import(self._upload(30))
+        import_jobs.claim_job(job.id, "slow")
+        # the slow worker stopped heartbeating and the job was taken over
+        ImportJob.objects.filter(id=job.id).update(worker="new")
+
+        with self.assertRaises(import_jobs.LostJob):
+            import_jobs.run_import_job(job.id, "slow")
+
+        self.assertEqual(Unit.objects.count(), 0)
+        self.assertEqual(ImportJob.objects.values_list("status", "created_count").get(), ("RUNNING", 0))
+
+    @override_settings(QC_IMPORT_WORKER="thread")
+    def test_thread_mode_sweeps_abandoned_jobs(self):
+        with mock.patch.object(import_jobs, "_submit"):
+            job = import_jobs.enqueue_import(self._upload(5))
+            ImportJob.objects.filter(id=job.id).update(
+                status="RUNNING", worker="dead", heartbeat_at=timezone.now() - timedelta(hours=1)
+            )
+
+            self.assertEqual(import_jobs.sweep_orphaned_jobs(force=True), [job.id])
+
+
+class UnitCurrentStateTests(TestCase):
+    def test_attempts_and_results_are_kept_on_unit(self):
+        unit = Unit.objects.create(unit_id="U-1", order_id="ORD-1")
+
+        first = inspections.start_inspection(unit)
+        inspections.complete_rework(inspections.finalize_inspection(first, "FAIL"))
+        second = inspections.start_inspection(unit)
+        inspections.finalize_inspection(second, "PASS")
+
+        unit.refresh_from_db()
+        self.assertEqual((first.attempt_number, second.attempt_number), (1, 2))
+        self.assertEqual(
+            (unit.last_attempt_number, unit.last_inspection_id, unit.last_result, unit.first_pass, unit.status),
+            (2, second.id, "PASS", False, "STORE_READY"),
+        )
+
+    def test_backfill_matches_history(self):
+        unit = Unit.objects.create(unit_id="U-2", order_id="ORD-2")
+        now = timezone.now()
+        Inspection.objects.create(unit=unit, attempt_number=1, final_result="PASS", completed_at=now)
+        latest = Inspection.objects.create(unit=unit, attempt_number=2)
+        Unit.objects.create(unit_id="U-3", order_id="ORD-3")
+
+        self.assertEqual(inspections.backfill_unit_state(batch_size=1), 2)
+
+        unit.refresh_from_db()
+        self.assertEqual(
+            (unit.last_attempt_number, unit.last_inspection_id, unit.last_result, unit.first_pass),
+            (2, latest.id, "", True),
+        )
+        self.assertEqual(Unit.objects.get(unit_id="U-3").last_attempt_number, 0)
+
+
+class UnitStatusTests(TestCase):
+    def test_transition_is_conditional_on_what_was_read(self):
+        unit = Unit.objects.create(unit_id="S-1", order_id="ORD-S-1")
+        stale = Unit.objects.get(pk=unit.pk)
+
+        unit_status.transition(unit, "QC_IN_PROGRESS")
+        self.assertEqual((unit.status, unit.version), ("QC_IN_PROGRESS", 1))
+
+        with self.assertRaises(unit_status.StatusConflict) as ctx:
+            unit_status.transition(stale, "QUARANTINE")
+        self.assertIn("S-1", ctx.exception.errors)
+        self.assertEqual(Unit.objects.values_list("status", "version").get(pk=unit.pk), ("QC_IN_PROGRESS", 1))
+
+        with self.assertRaisesMessage(ValueError, "QC_IN_PROGRESS -> RECEIVED is not allowed"):
+            unit_status.transition(unit, "RECEIVED")
+
+    def test_open_rework_blocks_store_ready(self):
+        unit = Unit.objects.create(unit_id="S-2", order_id="ORD-S-2")
+        inspections.finalize_inspection(inspections.start_inspection(unit), "FAIL")
+        retest = inspections.start_inspection(unit)
+        ReworkTicket.objects.create(unit=unit, reason_summary="Customer complaint")
+
+        with self.assertRaisesMessage(unit_status.StatusConflict, "open rework ticket"):
+            inspections.finalize_inspection(retest, "PASS")
+        retest.refresh_from_db()
+        self.assertIsNone(retest.completed_at)
+
+        # a passing retest doesn't sign off rework: the first attempt's ticket still blocks
+        ReworkTicket.objects.filter(inspection=None).update(status="CLOSED")
+        with self.assertRaisesMessage(unit_status.StatusConflict, "open rework ticket"):
+            inspections.finalize_inspection(retest, "PASS")
+        self.assertEqual(ReworkTicket.objects.get(inspection__attempt_number=1).status, "OPEN")
+
+    def test_completed_rework_lets_the_retest_pass(self):
+        unit = Unit.objects.create(unit_id="S-3", order_id="ORD-S-3")
+        ticket = inspections.finalize_inspection(inspections.start_inspection(unit), "FAIL")
+
+        inspections.complete_rework(ticket)
+        self.assertEqual(Unit.objects.get(pk=unit.pk).status, "RETEST")
+        with self.assertRaisesMessage(unit_status.StatusConflict, "already closed"):
+            inspections.complete_rework(ReworkTicket.objects.get(pk=ticket.pk))
+
+        inspections.finalize_inspection(inspections.start_inspection(Unit.objects.get(pk=unit.pk)), "PASS")
+        self.assertEqual(Unit.objects.get(pk=unit.pk).status, "STORE_READY")
+        self.assertEqual(ReworkTicket.objects.get(pk=ticket.pk).status, "DONE")
+
+    def test_wizard_finalize_on_a_stale_page_is_reported(self):
+        self.client.force_login(User.objects.create_user("tech"))
+        unit = Unit.objects.create(unit_id="S-3", order_id="ORD-S-3")
+        first = inspections.start_inspection(unit)
+        inspections.start_inspection(unit)  # another tech took the unit over
+
+        resp = self.client.post(f"/ui/inspect/{first.id}/", {"action": "finalize", "final_result": "PASS", "unit_version": 1})
+
+        self.assertRedirects(resp, f"/ui/inspect/{first.id}/", fetch_redirect_response=False)
+        first.refresh_from_db()
+        self.assertIsNone(first.completed_at)
+        self.assertEqual(Unit.objects.get(pk=unit.pk).status, "QC_IN_PROGRESS")
+
+    def test_reimport_never_overwrites_a_guarded_status(self):
+        inspecting = Unit.objects.create(unit_id="S-4", order_id="ORD-S-4", lab="Lab A")
+        inspections.start_inspection(inspecting)
+        reworking = Unit.objects.create(unit_id="S-5", order_id="ORD-S-5", lab="Lab A")
+        inspections.finalize_inspection(inspections.start_inspection(reworking), "FAIL")
+        Unit.objects.create(unit_id="S-6", order_id="ORD-S-6", lab="Lab A")
+
+        result = import_frames_csv(
+            _frames_csv(
+                [
+                    ["S-4", "ORD-S-4", "", "Lab B", "NORMAL", "STORE_READY"],
+                    ["S-5", "ORD-S-5", "", "Lab B", "NORMAL", "STORE_READY"],
+                    ["S-6", "ORD-S-6", "", "Lab B", "NORMAL", "QUARANTINE"],
+                ]
+            )
+        )
+
+        self.assertEqual(result["updated"], 1)
+        self.assertEqual([(e["line"], e["unit_id"]) for e in result["errors"]], [(2, "S-4"), (3, "S-5")])
+        self.assertEqual(
+            dict(Unit.objects.values_list("unit_id", "status")),
+            {"S-4": "QC_IN_PROGRESS", "S-5": "REWORK", "S-6": "QUARANTINE"},
+        )
+        self.assertEqual(Unit.objects.get(unit_id="S-4").lab, "Lab A")
+
+
+class UnitRaceTests(TransactionTestCase):
+    """Real concurrent connections: needs the file-based SQLite test database (or Postgres)."""
+
+    def setUp(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("threads need a file-based test database")
+
+    def _race(self, work, n=4) -> list[tuple[bool, object]]:
+        barrier = threading.Barrier(n)
+        outcomes = [None] * n
+
+        def run(i):
+            try:
+                barrier.wait()
+                outcomes[i] = (True, work(i))
+            except Exception as e:
+                outcomes[i] = (False, e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return outcomes
+
+    def test_concurrent_starts_open_one_attempt(self):
+        unit = Unit.objects.create(unit_id="C-1", order_id="ORD-C-1")
+        loaded = [Unit.objects.get(pk=unit.pk) for _ in range(4)]
+
+        outcomes = self._race(lambda i: inspections.start_inspection(loaded[i]))
+
+        self.assertEqual(sum(ok for ok, _ in outcomes), 1)
+        self.assertTrue(all(isinstance(e, unit_status.StatusConflict) for ok, e in outcomes if not ok))
+        self.assertEqual(Inspection.objects.filter(unit=unit).count(), 1)
+        self.assertEqual(Unit.objects.values_list("last_attempt_number", "version").get(pk=unit.pk), (1, 1))
+
+    def test_concurrent_finalizes_never_leave_store_ready_with_open_rework(self):
+        unit = Unit.objects.create(unit_id="C-2", order_id="ORD-C-2")
+        inspection_id = inspections.start_inspection(unit).id
+        # every tech has the wizard open before anyone submits
+        loaded = [Inspection.objects.select_related("unit").get(id=inspection_id) for _ in range(4)]
+        decisions = ["PASS", "FAIL", "PASS", "FAIL"]
+
+        outcomes = self._race(lambda i: inspections.finalize_inspection(loaded[i], decisions[i]))
+
+        winners = [i for i, (ok, _) in enumerate(outcomes) if ok]
+        self.assertEqual(len(winners), 1)
+        self.assertTrue(all(isinstance(e, unit_status.StatusConflict) for ok, e in outcomes if not ok))
+        won = decisions[winners[0]]
+        unit.refresh_from_db()
+        self.assertEqual((unit.status, unit.version), ("STORE_READY" if won == "PASS" else "REWORK", 2))
+        self.assertEqual(Inspection.objects.get(id=inspection_id).final_result, won)
+        self.assertEqual(ReworkTicket.objects.filter(unit=unit).count(), int(won == "FAIL"))
+
+    def test_concurrent_claims_never_share_a_unit(self):
+        for i in range(10):
+            Unit.objects.create(unit_id=f"C-Q-{i}", order_id=f"ORD-C-Q-{i}")
+        techs = [User.objects.create_user(f"tech{i}") for i in range(4)]
+
+        outcomes = self._race(lambda i: work_queue.claim(techs[i], 3))
+
+        claimed = [unit_id for ok, ids in outcomes if ok for unit_id in ids]
+        self.assertTrue(all(ok for ok, _ in outcomes), outcomes)
+        self.assertEqual(sorted(claimed), sorted(set(claimed)))
+        self.assertEqual(len(claimed), 10)
+        for tech, (_, ids) in zip(techs, outcomes):
+            self.assertEqual(set(Unit.objects.filter(claimed_by=tech).values_list("id", flat=True)), set(ids))
+
+
+class WorkQueueTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.tech, self.other = User.objects.create_user("tech"), User.objects.create_user("other")
+        for unit_id, priority, status, hours in [
+            ("Q-old", "NORMAL", "RECEIVED", 30),
+            ("Q-urgent-new", "URGENT", "RECEIVED", 1),
+            ("Q-urgent-old", "URGENT", "RETEST", 5),
+            ("Q-done", "URGENT", "STORE_READY", 50),
+            ("Q-new", "NORMAL", "RECEIVED", 2),
+        ]:
+            Unit.objects.create(
+                unit_id=unit_id, order_id=unit_id, priority=priority, status=status, received_at=now - timedelta(hours=hours)
+            )
+
+    def _ids(self, pks):
+        return [Unit.objects.get(pk=pk).unit_id for pk in pks]
+
+    def test_urgent_first_then_oldest_and_claims_are_exclusive(self):
+        self.assertEqual(self._ids(work_queue.claim(self.tech, 3)), ["Q-urgent-old", "Q-urgent-new", "Q-old"])
+        self.assertEqual(self._ids(work_queue.claim(self.other, 3)), ["Q-new"])
+
+        # an abandoned claim lapses back into the queue
+        Unit.objects.filter(unit_id="Q-old").update(claimed_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(self._ids(work_queue.claim(self.other, 3)), ["Q-old"])
+
+    def test_starting_a_unit_takes_it_off_the_queue(self):
+        units = work_queue.next_units(self.tech, 2)
+        self.assertEqual([u.unit_id for u in units], ["Q-urgent-old", "Q-urgent-new"])
+
+        inspections.start_inspection(units[0], self.tech)
+
+        unit = Unit.objects.get(pk=units[0].pk)
+        self.assertEqual((unit.queue_rank, unit.claimed_by_id), (None, None))
+        self.assertEqual([u.unit_id for u in work_queue.next_units(self.tech, 2)], ["Q-urgent-new", "Q-old"])
+
+    def test_queue_page(self):
+        self.client.force_login(self.tech)
+        self.assertRedirects(self.client.post("/ui/queue/", {"action": "next"}), "/ui/queue/")
+
+        page = self.client.get("/ui/queue/")
+        self.assertEqual([u.unit_id for u in page.context["units"]], ["Q-urgent-old", "Q-urgent-new", "Q-old", "Q-new"])
+        self.assertEqual(page.context["waiting"], 4)
+
+        self.client.post("/ui/queue/", {"action": "release", "unit": page.context["units"][0].id})
+        self.assertIsNone(Unit.objects.get(unit_id="Q-urgent-old").claimed_by_id)
+
+
+class SlaTests(TestCase):
+    def setUp(self):
+        self.north = Store.objects.create(name="North", code="N")
+        self.received = timezone.now() - timedelta(hours=10)
+
+    def _unit(self, unit_id, priority="NORMAL", **kwargs):
+        return Unit.objects.create(unit_id=unit_id, order_id=unit_id, priority=priority, received_at=self.received, **kwargs)
+
+    def test_deadline_follows_priority_and_store_policy(self):
+        normal, urgent = self._unit("D-normal"), self._unit("D-urgent", "URGENT")
+        self.assertEqual(normal.sla_deadline, self.received + timedelta(hours=48))
+        self.assertEqual((urgent.sla_deadline, urgent.sla_alarm_at), (self.received + timedelta(hours=6),) * 2)
+
+        SlaPolicy.objects.create(priority="URGENT", store=self.north, hours=4)
+        self.assertEqual(self._unit("D-north", "URGENT", store=self.north).sla_deadline, self.received + timedelta(hours=4))
+
+        # a new default re-stamps running clocks, store policies still win
+        SlaPolicy.objects.create(priority="URGENT", hours=8)
+        self.assertEqual(Unit.objects.get(pk=urgent.pk).sla_alarm_at, self.received + timedelta(hours=8))
+        self.assertEqual(Unit.objects.get(unit_id="D-north").sla_alarm_at, self.received + timedelta(hours=4))
+
+    def test_breach_is_emitted_once(self):
+        late, on_time = self._unit("B-late", "URGENT"), self._unit("B-on-time")
+
+        self.assertEqual(sla.emit_breaches(), 1)
+        self.assertEqual(sla.emit_breaches(), 0)
+
+        event = SlaBreachEvent.objects.get()
+        self.assertEqual((event.unit_id, event.status, event.deadline), (late.pk, "RECEIVED", late.sla_deadline))
+        self.assertIsNone(Unit.objects.get(pk=late.pk).sla_alarm_at)
+        self.assertIsNotNone(Unit.objects.get(pk=on_time.pk).sla_alarm_at)
+        self.assertEqual(metrics.urgent_sla_breaches(), 1)
+
+    def test_store_ready_stops_the_clock(self):
+        unit = self._unit("C-1", "URGENT")
+        inspections.finalize_inspection(inspections.start_inspection(unit), "PASS")
+
+        self.assertIsNone(Unit.objects.get(pk=unit.pk).sla_alarm_at)
+        self.assertEqual(sla.emit_breaches(), 0)
+
+    def test_import_stamps_deadlines(self):
+        import_frames_csv(_frames_csv([["I-1", "ORD-1", "M", "Lab A", "URGENT", "RECEIVED"]]))
+        unit = Unit.objects.get(unit_id="I-1")
+        self.assertEqual(unit.sla_deadline, unit.received_at + timedelta(hours=6))
+
+        import_frames_csv(_frames_csv([["I-1", "ORD-1", "M", "Lab A", "NORMAL", "RECEIVED"]]))
+        self.assertEqual(Unit.objects.get(unit_id="I-1").sla_alarm_at, unit.received_at + timedelta(hours=48))
+
+    def test_dashboard_lists_breaches(self):
+        self._unit("B-dash", "URGENT", store=self.north)
+        call_command("qc_sla_scheduler", "--once", stdout=io.StringIO())
+
+        self.client.force_login(User.objects.create_user("viewer"))
+        page = self.client.get("/ui/dashboard/")
+        self.assertEqual(page.context["urgent_breaches"], 1)
+        self.assertEqual([b["unit__unit_id"] for b in page.context["sla_breaches"]], ["B-dash"])
+        self.assertContains(page, "B-dash")
+
+
+class MigrationTestCase(TransactionTestCase):
+    """Seeds data at `before` with the historical models, then migrates to the latest state."""
+
+    before = []
+
+    def _migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def _migrate_back(self):
+        self.addCleanup(self._migrate, MigrationExecutor(connection).loader.graph.leaf_nodes("qc"))
+        return self._migrate(self.before)
+
+    def _migrate_forward(self):
+        self._migrate(MigrationExecutor(connection).loader.graph.leaf_nodes("qc"))
+
+
+class SlaBackfillMigrationTests(MigrationTestCase):
+    """Runs the SLA migrations over a unit that was already overdue before them."""
+
+    before = [("qc", "0017_work_queue")]
+
+    def test_overdue_urgent_unit_keeps_counting(self):
+        old_apps = self._migrate_back()
+        OldUnit = old_apps.get_model("qc", "Unit")
+        OldUnit.objects.create(
+            unit_id="L-1", order_id="ORD-L-1", priority="URGENT", status="RECEIVED", received_at=timezone.now() - timedelta(days=2)
+        )
+        # the count the pre-SLA dashboard showed: URGENT, open, received > 6h ago
+        cutoff = timezone.now() - timedelta(hours=6)
+        self.assertEqual(OldUnit.objects.filter(priority="URGENT", received_at__lte=cutoff).count(), 1)
+
+        self._migrate_forward()
+
+        self.assertEqual(metrics.urgent_sla_breaches(), 1)
+        # recorded by the migration, not left for the scheduler
+        self.assertIsNone(Unit.objects.get(unit_id="L-1").sla_alarm_at)
+        self.assertEqual(sla.emit_breaches(), 0)
+
+
+class RollupBackfillMigrationTests(MigrationTestCase):
+    """Inspections finalized before rollups existed show up in FPY after migrating."""
+
+    before = [("qc", "0024_defectphoto_claimed_at")]
+
+    def test_existing_inspections_are_rolled_up(self):
+        old_apps = self._migrate_back()
+        OldUnit, OldInspection = old_apps.get_model("qc", "Unit"), old_apps.get_model("qc", "Inspection")
+        now = timezone.now()
+        for i, result in enumerate(["PASS", "PASS", "FAIL"]):
+            unit = OldUnit.objects.create(unit_id=f"H-{i}", order_id=f"ORD-H-{i}", lab="Lab A")
+            OldInspection.objects.create(
+                unit=unit, attempt_number=1, final_result=result, started_at=now - timedelta(hours=1), completed_at=now
+            )
+        self.assertFalse(old_apps.get_model("qc", "DailyQualityRollup").objects.exists())
+
+        self._migrate_forward()
+
+        self.assertEqual(metrics.first_pass_yield(days=7)["rate_percent"], 66.67)
+
+
+class MetricsSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.unit = Unit.objects.create(unit_id="M-1", order_id="ORD-M-1")
+
+    def _cached_sections(self) -> set[str]:
+        return {s for s in metrics.SECTIONS if cache.get(metrics._cache_key(s)) is not None}
+
+    def test_snapshot_is_served_from_cache(self):
+        metrics.dashboard_snapshot()
+        with self.assertNumQueries(0):
+            metrics.dashboard_snapshot()
+
+    @override_settings(QC_METRICS_CACHE_TTL=0)
+    def test_expired_sections_are_recomputed(self):
+        metrics.dashboard_snapshot()
+        self.assertEqual(self._cached_sections(), set())
+
+    def test_finalize_invalidates_its_sections_after_commit(self):
+        inspection = inspections.start_inspection(self.unit)
+        metrics.dashboard_snapshot()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            inspections.finalize_inspection(inspection, "PASS")
+            # still cached until the finalize commits
+            self.assertEqual(self._cached_sections(), set(metrics.SECTIONS))
+
+        self.assertEqual(self._cached_sections(), set(metrics.SECTIONS) - set(metrics.INSPECTION_SECTIONS))
+
+    def test_import_invalidates_status_sections(self):
+        metrics.dashboard_snapshot()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            import_frames_csv(_frames_csv([["M-2", "ORD-M-2", "M", "Lab A", "NORMAL", "RECEIVED"]]))
+
+        self.assertEqual(self._cached_sections(), set(metrics.SECTIONS) - set(metrics.STATUS_SECTIONS))
+
+
+class DailyRollupTests(TestCase):
+    def test_incremental_rollups_match_rebuild(self):
+        tech = User.objects.create_user("tech")
+        for i in range(6):
+            unit = Unit.objects.create(unit_id=f"R-{i}", order_id=f"ORD-R-{i}", lab=f"Lab {i % 2}", frame_model="M1")
+            inspection = inspections.start_inspection(unit, tech)
+            inspections.finalize_inspection(inspection, "FAIL" if i % 3 == 0 else "PASS")
+        inspections.complete_rework(ReworkTicket.objects.select_related("unit").get(unit__unit_id="R-0"))
+        retry = inspections.start_inspection(Unit.objects.get(unit_id="R-0"), tech)
+        inspections.finalize_inspection(retry, "PASS")
+
+        fields = (
+            "day", "lab", "frame_model", "tech_user_id", "inspections", "failures", "first_attempts", "first_attempt_passes"
+        )
+        incremental = sorted(DailyQualityRollup.objects.values_list(*fields))
+        rollups.rebuild_rollups()
+        self.assertEqual(sorted(DailyQualityRollup.objects.values_list(*fields)), incremental)
+
+        self.assertEqual(
+            metrics.first_pass_yield(days=90),
+            {"days": 90, "passed": 4, "failed": 2, "total": 6, "rate_percent": 66.67},
+        )
+
+
+    def test_null_store_and_tech_share_one_row(self):
+        for i in range(2):
+            unit = Unit.objects.create(unit_id=f"N-{i}", order_id=f"ORD-N-{i}", lab="Lab A", frame_model="M1")
+            inspections.finalize_inspection(inspections.start_inspection(unit), "PASS")
+
+        row = DailyQualityRollup.objects.get()
+        self.assertEqual((row.store_id, row.tech_user_id, row.inspections), (None, None, 2))
+
+        # a concurrent first finalize creating the same key hits the retry path
+        with self.assertRaises(IntegrityError):
+            DailyQualityRollup.objects.create(day=row.day, lab="Lab A", frame_model="M1")
+
+
+class DefectAnalyticsTests(TestCase):
+    def setUp(self):
+        for i in range(4):
+            unit = Unit.objects.create(unit_id=f"D-{i}", order_id=f"ORD-D-{i}", lab=f"Lab {i % 2}", frame_model="M1")
+            inspection = inspections.start_inspection(unit)
+            stage = inspection.stage_results.get(stage="COSMETIC")
+            for severity in ["HIGH", "LOW"][: i % 3]:
+                Defect.objects.create(stage_result=stage, category="FRAME", reason_code="SCRATCH", severity=severity)
+            inspections.finalize_inspection(inspection, "FAIL" if i % 3 else "PASS")
+
+    def test_counts_in_one_grouped_query(self):
+        with self.assertNumQueries(1):
+            rows = defects.defect_counts(days=7, by=("lab", "severity"))
+
+        self.assertEqual(
+            sorted((r["lab"], r["severity"], r["defects"]) for r in rows),
+            [("Lab 0", "HIGH", 1), ("Lab 0", "LOW", 1), ("Lab 1", "HIGH", 1)],
+        )
+
+    def test_fail_rate_and_defects_per_100_units(self):
+        rates = {r["lab"]: r for r in defects.defect_rates(days=7, by=("lab",))}
+
+        self.assertEqual((rates["Lab 0"]["fail_rate_percent"], rates["Lab 0"]["defects_per_100_units"]), (50.0, 100.0))
+        self.assertEqual((rates["Lab 1"]["fail_rate_percent"], rates["Lab 1"]["defects_per_100_units"]), (50.0, 50.0))
+
+
+@override_settings(QC_IMAGE_WORKER="command", QC_PHOTO_MAX_PX=1024, QC_PHOTO_THUMB_PX=200)
+class DefectPhotoPipelineTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media.name))
+
+    def _phone_photo(self) -> SimpleUploadedFile:
+        img = Image.new("RGB", (4000, 3000), (200, 30, 30))
+        exif = Image.Exif()
+        exif[0x0112] = 6  # orientation: rotate 90 CW
+        exif[0x010F] = "PhoneMaker"
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", exif=exif, quality=95)
+        return SimpleUploadedFile("IMG_0001.jpeg", buf.getvalue(), content_type="image/jpeg")
+
+    def test_upload_is_downscaled_thumbnailed_and_exif_free(self):
+        unit = Unit.objects.create(unit_id="P-1", order_id="ORD-P-1")
+        inspection = inspections.start_inspection(unit)
+        self.client.force_login(User.objects.create_user("tech"))
+        self.client.post(
+            f"/ui/inspect/{inspection.id}/",
+            {"action": "add_defect", "defect_stage": "COSMETIC", "defect_photo": self._phone_photo()},
+        )
+        photo = DefectPhoto.objects.get()
+        original = photo.image.path
+        self.assertIsNone(photo.processed_at)
+
+        images.process_photo(photo.id)
+
+        photo.refresh_from_db()
+        with Image.open(photo.image.path) as full:
+            self.assertEqual(full.size, (768, 1024))  # rotated upright, fits 1024
+            self.assertFalse(full.getexif())
+        with Image.open(photo.thumbnail.path) as thumb:
+            self.assertLessEqual(max(thumb.size), 200)
+        self.assertIsNone(images.process_photo(photo.id))  # already processed
+        blobs.collect_garbage(grace_seconds=0)
+        self.assertFalse(os.path.exists(original))
+
+        page = self.client.get(f"/ui/inspect/{inspection.id}/")
+        self.assertContains(page, 'loading="lazy"')
+
+    def test_only_the_claiming_worker_processes_a_photo(self):
+        unit = Unit.objects.create(unit_id="P-2", order_id="ORD-P-2")
+        stage = inspections.start_inspection(unit).stage_results.get(stage="COSMETIC")
+        photo = DefectPhoto.objects.create(defect=inspections.add_defect(stage), image=self._phone_photo())
+        original = photo.image.name
+
+        # another worker holds a fresh claim
+        DefectPhoto.objects.filter(pk=photo.pk).update(claimed_at=timezone.now())
+        self.assertIsNone(images.process_photo(photo.id))
+
+        # its claim lapses, we take over, then lose it to a third worker mid-way
+        DefectPhoto.objects.filter(pk=photo.pk).update(claimed_at=timezone.now() - timedelta(minutes=11))
+        encode = images._encode_jpeg
+
+        def taken_over(img, max_px):
+            DefectPhoto.objects.filter(pk=photo.pk).update(claimed_at=timezone.now() + timedelta(seconds=1))
+            return encode(img, max_px)
+
+        with mock.patch.object(images, "_encode_jpeg", taken_over):
+            self.assertIsNone(images.process_photo(photo.id))
+        photo.refresh_from_db()
+        self.assertEqual((photo.image.name, photo.processed_at), (original, None))
+
+        DefectPhoto.objects.filter(pk=photo.pk).update(claimed_at=None)
+        self.assertIsNotNone(images.process_photo(photo.id))
+        self.assertIsNone(images.process_photo(photo.id))
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media.name))
+        self.user = User.objects.create_user("store")
+        self.complaint = Complaint.objects.create(title="Scratched lens", created_by=self.user)
+
+    def test_duplicate_uploads_share_one_blob_until_collected(self):
+        for name in ("a.pdf", "b.pdf"):
+            ComplaintAttachment.objects.create(
+                complaint=self.complaint, file=SimpleUploadedFile(name, b"%PDF same bytes"), uploaded_by=self.user
+            )
+        ComplaintAttachment.objects.create(complaint=self.complaint, file=SimpleUploadedFile("c.pdf", b"%PDF other"))
+
+        names = set(ComplaintAttachment.objects.values_list("file", flat=True))
+        self.assertEqual(len(names), 2)
+        self.assertEqual(sorted(StoredBlob.objects.values_list("refcount", flat=True)), [1, 2])
+        path = ComplaintAttachment.objects.first().file.path
+
+        self.complaint.delete()  # cascades to the attachments
+
+        self.assertEqual(set(StoredBlob.objects.values_list("refcount", flat=True)), {0})
+        self.assertEqual(blobs.collect_garbage(grace_seconds=0)["removed"], 2)
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(StoredBlob.objects.exists())
+
+    def test_bytes_saved_again_after_collection_get_a_fresh_blob(self):
+        first = ComplaintAttachment.objects.create(complaint=self.complaint, file=SimpleUploadedFile("a.pdf", b"%PDF"))
+        path = first.file.path
+        first.delete()
+        # collected (row gone) but the file not purged yet
+        StoredBlob.objects.all().delete()
+
+        again = ComplaintAttachment.objects.create(complaint=self.complaint, file=SimpleUploadedFile("b.pdf", b"%PDF"))
+
+        self.assertEqual(again.file.path, path)
+        self.assertEqual(StoredBlob.objects.get().refcount, 1)
+        self.assertEqual(blobs.collect_garbage(grace_seconds=0)["removed"], 0)
+        self.assertTrue(os.path.exists(path))
+
+    def test_legacy_files_are_adopted_into_blobs(self):
+        os.makedirs(os.path.join(self.media.name, "complaint_attachments"))
+        for name in ("old-a.pdf", "old-b.pdf"):
+            with open(os.path.join(self.media.name, "complaint_attachments", name), "wb") as f:
+                f.write(b"%PDF legacy")
+            ComplaintAttachment.objects.create(complaint=self.complaint, file=f"complaint_attachments/{name}")
+        ComplaintAttachment.objects.create(complaint=self.complaint, file="complaint_attachments/gone.pdf")
+
+        call_command("qc_backfill_blobs", stdout=io.StringIO())
+
+        names = set(ComplaintAttachment.objects.values_list("file", flat=True))
+        self.assertEqual(len(names), 2)  # the two copies share a blob; the missing file is left alone
+        self.assertEqual(StoredBlob.objects.get().refcount, 2)
+        self.assertEqual(os.listdir(os.path.join(self.media.name, "complaint_attachments")), [])
+
+    def test_orphan_files_are_swept_after_the_grace_period(self):
+        try:
+            with transaction.atomic():
+                kept = ComplaintAttachment.objects.create(
+                    complaint=self.complaint, file=SimpleUploadedFile("a.pdf", b"%PDF rolled back")
+                )
+                path = kept.file.path
+                raise IntegrityError
+        except IntegrityError:
+            pass
+        self.assertTrue(os.path.exists(path))  # the file outlived its row
+
+        self.assertEqual(blobs.collect_garbage(grace_seconds=3600)["orphans_removed"], 0)
+        self.assertEqual(blobs.collect_garbage(grace_seconds=-1)["orphans_removed"], 1)
+        self.assertFalse(os.path.exists(path))
+
+    def test_bulk_created_rows_bump_refs_explicitly(self):
+        first = ComplaintAttachment.objects.create(complaint=self.complaint, file=SimpleUploadedFile("a.jpg", b"jpg"))
+        copies = ComplaintAttachment.objects.bulk_create(
+            [ComplaintAttachment(complaint=self.complaint, file=first.file.name) for _ in range(3)]
+        )
+        blobs.add_refs_for(copies)
+
+        self.assertEqual(StoredBlob.objects.get().refcount, 4)
+        self.assertEqual(blobs.recount_refs(), 0)
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media.name, QC_UPLOAD_CHUNK_SIZE=4))
+        self.user = User.objects.create_user("store")
+        self.client.force_login(self.user)
+        self.complaint = Complaint.objects.create(title="Cracked temple", created_by=self.user)
+
+    def _put(self, key, file_index, chunk_index, data):
+        return self.client.put(
+            f"/ui/uploads/{key}/{file_index}/{chunk_index}/", data, content_type="application/octet-stream"
+        )
+
+    def test_out_of_order_chunks_resume_and_complete(self):
+        files = {"scan.pdf": b"0123456789", "photo.jpg": b"abc"}
+        r = self.client.post(
+            f"/ui/complaints/{self.complaint.id}/uploads/",
+            json.dumps({"files": [{"name": n, "size": len(b)} for n, b in files.items()], "note": "from store"}),
+            content_type="application/json",
+        )
+        self.assertEqual(r.status_code, 201)
+        key = r.json()["session"]
+
+        self.assertEqual(self._put(key, 0, 2, b"89").status_code, 200)
+        self.assertEqual(self._put(key, 0, 0, b"0123").status_code, 200)
+        # connection drops here; the client asks what is still missing
+        state = self.client.get(f"/ui/uploads/{key}/").json()
+        self.assertEqual([f["missing"] for f in state["files"]], [[1], [0]])
+        self.assertEqual(self.client.post(f"/ui/uploads/{key}/complete/").status_code, 400)
+
+        self._put(key, 0, 1, b"4567")
+        self._put(key, 1, 0, b"abc")
+        with self.captureOnCommitCallbacks(execute=True):
+            r = self.client.post(f"/ui/uploads/{key}/complete/")
+
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r.json()["complete"])
+        attachments = ComplaintAttachment.objects.filter(complaint=self.complaint).order_by("id")
+        self.assertEqual([a.file.read() for a in attachments], list(files.values()))
+        self.assertEqual({a.note for a in attachments}, {"from store"})
+        self.assertEqual(set(StoredBlob.objects.values_list("refcount", flat=True)), {1})
+        self.assertFalse(os.path.exists(os.path.join(self.media.name, "upload_sessions", key)))
+
+    def test_wrong_length_and_foreign_sessions_are_rejected(self):
+        session = uploads.create_session(self.complaint, self.user, [{"name": "a.bin", "size": 6}])
+
+        self.assertEqual(self._put(session.key, 0, 0, b"too long").status_code, 400)
+        self.assertEqual(self._put(session.key, 0, 1, b"x").status_code, 400)
+        self.assertEqual(self._put(session.key, 0, 5, b"xx").status_code, 400)
+        self.assertEqual(uploads.progress(session)["files"][0]["received"], 0)
+
+        self.client.force_login(User.objects.create_user("other"))
+        self.assertEqual(self._put(session.key, 0, 1, b"xx").status_code, 404)
+
+    def test_stale_sessions_expire(self):
+        session = uploads.create_session(self.complaint, self.user, [{"name": "a.bin", "size": 6}])
+        UploadSession.objects.filter(id=session.id).update(updated_at=timezone.now() - timedelta(days=2))
+
+        self.assertEqual(uploads.expire_sessions(hours=24), 1)
+        session.refresh_from_db()
+        with self.assertRaises(ValueError):
+            uploads.write_chunk(session, 0, 0, io.BytesIO(b"abcd"))
+
+
+class StreamingFlagTests(TestCase):
+    def setUp(self):
+        for i in range(20):
+            unit = Unit.objects.create(unit_id=f"F-{i}", order_id=f"ORD-F-{i}", lab="Lab X", frame_model=f"M{i % 4}")
+            inspections.finalize_inspection(inspections.start_inspection(unit), "FAIL" if i % 5 < 2 else "PASS")
+
+    def test_one_flag_per_key_updated_in_place(self):
+        flag = QualityFlag.objects.get()
+        self.assertEqual((flag.flag_type, flag.flag_key, flag.is_active), ("LAB", "Lab X", True))
+        self.assertEqual(flag.sample_size, 20)
+        self.assertAlmostEqual(flag.defect_rate, 40.0, places=3)
+
+    def test_replay_matches_streaming(self):
+        streamed = {(s.flag_type, s.flag_key): (s.weight, s.failures) for s in FlagDetectorState.objects.all()}
+
+        result = flags.replay_history()
+
+        self.assertEqual(result["states"], len(streamed))
+        for s in FlagDetectorState.objects.all():
+            weight, failures = streamed[(s.flag_type, s.flag_key)]
+            self.assertAlmostEqual(s.weight, weight, places=6)
+            self.assertAlmostEqual(s.failures, failures, places=6)
+        self.assertEqual(QualityFlag.objects.filter(is_active=True).count(), 1)
+
+    def test_flag_ages_out_without_new_inspections(self):
+        result = flags.refresh_quality_flags(now=timezone.now() + timedelta(days=60))
+
+        self.assertEqual(result["closed"], 1)
+        self.assertFalse(QualityFlag.objects.filter(is_active=True).exists())
+
+
+class FlagCompactionTests(TestCase):
+    def test_merges_overlapping_duplicates_into_history(self):
+        now = timezone.now()
+        for i in range(5):  # the old per-call flagging: one row per dashboard load
+            QualityFlag.objects.create(
+                flag_type="LAB",
+                flag_key="Lab A",
+                window_start=now - timedelta(days=7, hours=i),
+                window_end=now - timedelta(hours=i),
+                defect_rate=12.0 + i,
+                is_active=i == 0,
+            )
+        QualityFlag.objects.create(
+            flag_type="LAB",
+            flag_key="Lab A",
+            window_start=now - timedelta(days=40),
+            window_end=now - timedelta(days=33),
+            is_active=False,
+        )
+
+        result = flags.compact_flags(batch_size=1)
+
+        self.assertEqual(result, {"merged": 4, "episodes": 1})
+        flag = QualityFlag.objects.get(is_active=True)
+        self.assertEqual(flag.history.count(), 4)
+        self.assertEqual(flag.window_start, now - timedelta(days=7, hours=4))
+        self.assertEqual(QualityFlag.objects.count(), 2)  # the older, separate episode stays
+
+    def test_one_active_flag_per_key_is_enforced(self):
+        now = timezone.now()
+        fields = {"flag_type": "MODEL", "flag_key": "M1", "window_start": now, "window_end": now}
+        QualityFlag.objects.create(**fields)
+        QualityFlag.objects.create(is_active=False, **fields)
+
+        with self.assertRaises(IntegrityError):
+            QualityFlag.objects.create(**fields)
+
+
+class ScanStartTests(TestCase):
+    def test_tray_scan_starts_all_units_in_constant_queries(self):
+        for i in range(20):
+            Unit.objects.create(unit_id=f"T-{i}", order_id=f"ORD-T-{i}")
+        self.client.force_login(User.objects.create_user("tech"))
+        scanned = "\n".join(f"T-{i}" for i in range(20)) + "\nT-404"
+
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.post("/ui/inspect/scan/", {"unit_ids": scanned})
+
+        self.assertRedirects(resp, "/ui/frames/", fetch_redirect_response=False)
+        self.assertEqual(Inspection.objects.count(), 20)
+        self.assertEqual(InspectionStageResult.objects.count(), 20 * len(InspectionStageResult.STAGE_CHOICES))
+        self.assertFalse(Unit.objects.filter(unit_id__startswith="T-").exclude(status="QC_IN_PROGRESS").exists())
+        self.assertLess(len(ctx.captured_queries), 20)
+
+    def test_single_scan_opens_the_wizard(self):
+        Unit.objects.create(unit_id="T-1", order_id="ORD-T-1")
+        self.client.force_login(User.objects.create_user("tech"))
+
+        resp = self.client.post("/ui/inspect/scan/", {"unit_ids": "T-1"})
+
+        inspection = Inspection.objects.get()
+        self.assertRedirects(resp, f"/ui/inspect/{inspection.id}/", fetch_redirect_response=False)
+
+
+class RequestStatsTests(TestCase):
+    def setUp(self):
+        request_stats.reset()
+        self.client.force_login(User.objects.create_user("tech"))
+
+    def test_records_queries_and_latency_per_view(self):
+        self.client.get("/ui/frames/")
+        self.client.get("/ui/frames/")
+        # staff only
+        self.assertEqual(self.client.get("/health/metrics/").status_code, 302)
+        self.client.force_login(User.objects.create_user("ops", is_staff=True))
+
+        stats = self.client.get("/health/metrics/").json()["views"]["frames_list"]
+
+        self.assertEqual(stats["count"], 2)
+        self.assertGreater(stats["queries"]["max"], 0)
+        self.assertGreater(stats["bytes"]["p50"], 0)
+        self.assertEqual(sum(stats["latency_histogram"].values()), 2)
+
+    @override_settings(QC_SLOW_REQUEST_QUERIES=1)
+    def test_logs_sql_of_requests_over_threshold(self):
+        with self.assertLogs("qc.requests", "WARNING") as logs:
+            self.client.get("/ui/frames/")
+
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line["view"], "frames_list")
+        self.assertTrue(any("qc_unit" in q["sql"] for q in line["sql"]))
+
+
+class FramesListKeysetTests(TestCase):
+    def _seed(self, start: int, n: int) -> None:
+        rows = [
+            [f"U-{i:07d}", f"ORD-{i:07d}", "Model 1", "Lab A", "NORMAL", "STORE_READY" if i % 10 else "RECEIVED"]
+            for i in range(start, start + n)
+        ]
+        import_frames_csv(_frames_csv(rows))
+
+    def test_pages_do_not_overlap_and_search_uses_term_index(self):
+        self._seed(0, 250)
+        self.client.force_login(User.objects.create_user("tech"))
+
+        seen = []
+        after = ""
+        while True:
+            resp = self.client.get("/ui/frames/", {"after": after})
+            seen += [u.id for u in resp.context["units"]]
+            after = resp.context["next_cursor"]
+            if not after:
+                break
+        self.assertEqual(len(seen), 250)
+        self.assertEqual(len(set(seen)), 250)
+
+        resp = self.client.get("/ui/frames/", {"q": "d-000012"})
+        self.assertEqual(sorted(u.unit_id for u in resp.context["units"]), [f"U-{i:07d}" for i in range(120, 130)])
+
+    def test_search_index_follows_id_changes_only(self):
+        unit = Unit.objects.create(unit_id="U-1", order_id="ORD-1")
+        unit = Unit.objects.get(pk=unit.pk)
+
+        unit.lab = "Lab B"
+        with CaptureQueriesContext(connection) as ctx:
+            unit.save()
+        self.assertFalse([q for q in ctx.captured_queries if "qc_unitsearchterm" in q["sql"]])
+
+        unit.order_id = "ORD-77"
+        unit.save()
+        self.assertEqual(list(Unit.objects.filter(id__in=unit_search.matching_unit_ids("d-77"))), [unit])
+        self.assertFalse(Unit.objects.filter(id__in=unit_search.matching_unit_ids("ord-1")).exists())
+
+    def test_benchmark_latency_flat_as_table_grows(self):
+        def profile(fn, runs=15):
+            """(median ms, SQL of one run): the timing is logged, the SQL asserted on."""
+            times = []
+            for _ in range(runs):
+                t0 = time.perf_counter()
+                with CaptureQueriesContext(connection) as ctx:
+                    fn()
+                times.append((time.perf_counter() - t0) * 1000)
+            return sorted(times)[runs // 2], [q["sql"] for q in ctx.captured_queries]
+
+        queries = {
+            "first page": lambda: keyset_page(Unit.objects.all(), "", 100),
+            "status page": lambda: keyset_page(Unit.objects.filter(status="RECEIVED"), "", 100),
+            "search": lambda: keyset_page(Unit.objects.filter(id__in=unit_search.matching_unit_ids("0001")), "", 100),
+        }
+
+        self._seed(0, 1000)
+        small = {name: profile(fn) for name, fn in queries.items()}
+        self._seed(1000, 7000)
+        large = {name: profile(fn) for name, fn in queries.items()}
+
+        for name in queries:
+            bench_log.info(f"frames {name}: {small[name][0]:.2f} ms @1k units, {large[name][0]:.2f} ms @8k units")
+            # flat: the same statements at 8x the rows, none reading the whole table. An
+            # index walk in keyset order stops at the LIMIT; a sort is fine over SEARCHed
+            # matches, but after a SCAN it means every row was read first.
+            self.assertEqual(len(large[name][1]), len(small[name][1]))
+            for sql in large[name][1]:
+                plan = _explain(sql)
+                scans = [line for line in plan.splitlines() if "SCAN " in line or "Seq Scan" in line]
+                self.assertFalse([line for line in scans if "INDEX" not in line.upper()], f"{name}:\n{sql}\n{plan}")
+                self.assertFalse(scans and "TEMP B-TREE FOR ORDER BY" in plan, f"{name}:\n{sql}\n{plan}")
+
+
+class ComplaintSearchTests(TestCase):
+    def setUp(self):
+        self.north = Store.objects.create(name="North", code="N")
+        self.south = Store.objects.create(name="South", code="S")
+
+    def _complaint(self, title, description="", store=None, status="OPEN", **kwargs):
+        return Complaint.objects.create(
+            title=title, description=description, store=store or self.north, status=status, **kwargs
+        )
+
+    def test_ranked_prefix_match_with_facets(self):
+        in_title = self._complaint("Scratched lens on delivery")
+        in_text = self._complaint("Customer return", "lens had a scratch near the hinge", store=self.south)
+        self._complaint("Scratched frame", status="RESOLVED")
+        self._complaint("Loose screw")
+
+        result = complaint_search.search_complaints("scratch* lens")
+
+        self.assertEqual([c.id for c in result["complaints"]], [in_title.id, in_text.id])
+        self.assertEqual(result["total"], 2)
+        self.assertEqual({f["value"]: f["count"] for f in result["facets"]["store"]}, {"N": 1, "S": 1})
+
+        result = complaint_search.search_complaints("scratch", store_code="N")
+        self.assertEqual(result["total"], 2)
+        # status facet honours the store filter, store facet ignores it
+        self.assertEqual({f["value"]: f["count"] for f in result["facets"]["status"]}, {"OPEN": 1, "RESOLVED": 1})
+        self.assertEqual({f["value"]: f["count"] for f in result["facets"]["store"]}, {"N": 2, "S": 1})
+
+    def test_index_follows_updates_and_deletes(self):
+        c = self._complaint("Wrong tint", unit_id_text="U-778812")
+        self.assertEqual(complaint_search.search_complaints("778812")["total"], 1)
+
+        Complaint.objects.filter(id=c.id).update(title="Wrong colour")
+        self.assertEqual(complaint_search.search_complaints("tint")["total"], 0)
+        self.assertEqual(complaint_search.search_complaints("colour")["total"], 1)
+
+        c.delete()
+        self.assertEqual(complaint_search.search_complaints("colour")["total"], 0)
+
+    def test_keyset_pages_cover_every_match_once(self):
+        for i in range(23):
+            self._complaint(f"Lens issue {i}", "lens " * (i % 4))
+        self.client.force_login(User.objects.create_user("cs"))
+
+        seen, after = [], ""
+        while True:
+            resp = self.client.get("/ui/complaints/", {"q": "lens", "after": after})
+            seen += [c.id for c in resp.context["complaints"]]
+            after = resp.context["next_cursor"]
+            if not after:
+                break
+        self.assertEqual(sorted(seen), sorted(Complaint.objects.values_list("id", flat=True)))
+
+        page, cursor = [], ""
+        while True:
+            result = complaint_search.search_complaints("lens", cursor=cursor, page_size=5)
+            page += [c.id for c in result["complaints"]]
+            cursor = result["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(len(page), 23)
+        self.assertEqual(len(set(page)), 23)
+
+    def test_benchmark_against_icontains(self):
+        words = ["scratch", "hinge", "tint", "coating", "crack", "screw", "pad", "temple"]
+        Complaint.objects.bulk_create(
+            Complaint(
+                title=f"{words[i % 8]} reported on order {i}",
+                description=" ".join(words[(i + k) % 8] for k in range(3)) + f" batch {i % 97}",
+                store=self.north if i % 2 else self.south,
+                unit_id_text=f"U-{i:07d}",
+            )
+            for i in range(20000)
+        )
+        complaint_search.rebuild_index()  # bulk_create fires the triggers too; this checks rebuild on a big table
+
+        def median_ms(fn, runs=9):
+            times = []
+            for _ in range(runs):
+                t0 = time.perf_counter()
+                fn()
+                times.append((time.perf_counter() - t0) * 1000)
+            return sorted(times)[runs // 2]
+
+        def search_plans(q) -> list[str]:
+            with CaptureQueriesContext(connection) as ctx:
+                complaint_search.search_complaints(q, page_size=100)
+            return [_explain(query["sql"]) for query in ctx.captured_queries]
+
+        def old_path(q):
+            qs = Complaint.objects.order_by("-created_at")
+            qs = qs.filter(title__icontains=q) | qs.filter(description__icontains=q) | qs.filter(unit_id_text__icontains=q)
+            return list(qs[:500])
+
+        # selective: the old path scans the whole table for a handful of rows
+        # broad: half the table matches, so it is ranked and faceted, not just cut at 500
+        for label, q in (("selective", "0012345"), ("broad", "coating")):
+            fts = median_ms(lambda: complaint_search.search_complaints(q, page_size=100))
+            old = median_ms(lambda: old_path(q))
+            bench_log.info(f"complaint search ({label}): fts {fts:.2f} ms, icontains {old:.2f} ms @20k complaints")
+
+            # a fixed handful of statements, matched through the full-text index, and
+            # complaints only fetched by primary key: never the old path's table scan
+            plans = search_plans(q)
+            self.assertLessEqual(len(plans), 4)
+            lines = [line for plan in plans for line in plan.splitlines()]
+            if connection.vendor == "sqlite":
+                self.assertTrue([line for line in lines if _fts_match(line)], "\n".join(lines))
+                self.assertFalse([line for line in lines if "SCAN qc_complaint" in line and not _fts_match(line)])
+            else:
+                self.assertTrue([line for line in lines if "qc_complaint_search_gin" in line], "\n".join(lines))
+        self.assertEqual(
+            complaint_search.search_complaints("0000042")["total"],
+            Complaint.objects.filter(unit_id_text__icontains="0000042").count(),
+        )
+
+
+class ListViewQueryCountTests(TestCase):
+    """
+    frames_list / complaints_list issue the same number of queries however
+    many rows they render (session + user + page + facets/store lookups).
+    """
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("lists"))
+        self.store = Store.objects.create(name="North", code="N")
+
+    def _seed(self, n: int) -> None:
+        start = Unit.objects.count()
+        for i in range(start, start + n):
+            unit = Unit.objects.create(unit_id=f"L-{i}", order_id=f"ORD-L-{i}", lab="Lab A", frame_model="M1")
+            inspections.finalize_inspection(inspections.start_inspection(unit), "FAIL" if i % 2 else "PASS")
+            complaint = Complaint.objects.create(title=f"Lens chip {i}", store=self.store, unit=unit)
+            ComplaintAttachment.objects.bulk_create(
+                [ComplaintAttachment(complaint=complaint, file=f"complaint_attachments/{i}-{k}.jpg") for k in range(i % 3)]
+            )
+
+    def test_frames_list_query_count_is_flat(self):
+        for n in (2, 20):
+            self._seed(n)
+            with self.assertNumQueries(3):
+                resp = self.client.get("/ui/frames/")
+        units = {u.unit_id: u for u in resp.context["units"]}
+        self.assertEqual(len(units), 22)
+        self.assertEqual((units["L-1"].inspection_count, units["L-1"].open_rework_count), (1, 1))
+        self.assertEqual((units["L-2"].inspection_count, units["L-2"].open_rework_count), (1, 0))
+
+    def test_complaints_list_query_count_is_flat(self):
+        for n in (2, 20):
+            self._seed(n)
+            with self.assertNumQueries(6):
+                resp = self.client.get("/ui/complaints/")
+            # ranked path: ids + scores first, then the rows
+            with self.assertNumQueries(7):
+                self.client.get("/ui/complaints/", {"q": "lens"})
+        counts = {c.title: c.attachment_count for c in resp.context["complaints"]}
+        self.assertEqual((counts["Lens chip 3"], counts["Lens chip 4"], counts["Lens chip 5"]), (0, 1, 2))
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        for i in range(6):
+            unit = Unit.objects.create(
+                unit_id=f"E-{i}", order_id=f"ORD-E-{i}", lab="Lab A" if i % 2 else "Lab B", frame_model="M1",
+                received_at=now - timedelta(days=i * 10),
+            )
+            inspection = inspections.start_inspection(unit)
+            stage = inspection.stage_results.get(stage="COSMETIC")
+            Defect.objects.create(stage_result=stage, category="LENS", reason_code="SCRATCH", notes='has, "quotes"')
+            inspections.finalize_inspection(inspection, "FAIL")
+        self.client.force_login(User.objects.create_user("analyst"))
+
+    def test_csv_export_filters_by_lab_and_date(self):
+        since = (timezone.localdate() - timedelta(days=25)).isoformat()
+        resp = self.client.get("/ui/export/units/", {"lab": "Lab A", "since": since})
+
+        self.assertTrue(resp.streaming)
+        self.assertIn("qc_units_", resp["Content-Disposition"])
+        rows = list(csv.DictReader(io.StringIO(b"".join(resp.streaming_content).decode())))
+        self.assertEqual([r["unit_id"] for r in rows], ["E-1"])
+        self.assertEqual(rows[0]["last_result"], "FAIL")
+
+        resp = self.client.get("/ui/export/defects/")
+        rows = list(csv.DictReader(io.StringIO(b"".join(resp.streaming_content).decode())))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]["notes"], 'has, "quotes"')
+
+        self.assertEqual(self.client.get("/ui/export/passwords/").status_code, 400)
+
+    def test_gzipped_jsonl_and_command(self):
+        resp = self.client.get("/ui/export/stage_results/", {"format": "jsonl", "gzip": "1", "lab": "Lab B"})
+
+        self.assertEqual(resp["Content-Type"], "application/gzip")
+        lines = gzip.decompress(b"".join(resp.streaming_content)).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(len(records), 3 * len(InspectionStageResult.STAGE_CHOICES))
+        self.assertEqual({r["unit_id"] for r in records}, {"E-0", "E-2", "E-4"})
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "inspections.csv.gz")
+            call_command("qc_export", "inspections", "--gzip", "--output", path, stdout=io.StringIO())
+            with gzip.open(path, "rt") as f:
+                self.assertEqual(len(list(csv.DictReader(f))), 6)
+
+    def test_peak_memory_bounded_by_one_chunk(self):
+        Unit.objects.bulk_create(
+            Unit(unit_id=f"X-{i:06d}", order_id=f"ORD-X-{i:06d}", lab="Lab C", frame_model="M2") for i in range(20000)
+        )
+        # a fixed budget for one chunk of rows in flight (~1.3 KB a row measured),
+        # far below the 20k rows held at once
+        budget = exports.ITERATOR_CHUNK_SIZE * 2048
+
+        tracemalloc.start()
+        try:
+            size = sum(len(piece) for piece in exports.export_stream("units", "jsonl", gzip=True))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        self.assertGreater(size, 0)
+        self.assertLess(peak, budget)
+
+
+class WizardApiTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("bench"))
+        unit = Unit.objects.create(unit_id="W-1", order_id="ORD-W-1", lab="Lab A", frame_model="M1")
+        self.inspection = inspections.start_inspection(unit)
+
+    def _api(self, action, data):
+        return self.client.post(f"/ui/inspect/{self.inspection.id}/api/{action}/", data)
+
+    def test_stage_save_writes_only_changed_columns(self):
+        steps = {"step_bend_test": "PASS", "step_hinge_stress": "FAIL", "cosmetic_notes": "hinge squeak"}
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self._api("save_cosmetic", steps)
+
+        body = resp.json()
+        self.assertEqual((body["stage"], body["status"]), ("COSMETIC", "FAIL"))
+        self.assertIn('id="stage-badge-COSMETIC"', body["stage_html"])
+        self.assertEqual(sorted(body["changed"]), ["data", "notes", "status"])
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"stage"', updates[0])
+        self.assertLessEqual(len(ctx.captured_queries), 5)
+
+        # re-saving the same values is a read, not a write
+        with CaptureQueriesContext(connection) as ctx:
+            body = self._api("save_cosmetic", steps).json()
+        self.assertEqual(body["changed"], [])
+        self.assertFalse(any(q["sql"].startswith("UPDATE") for q in ctx.captured_queries))
+
+    def test_add_defect_returns_row_fragment(self):
+        with self.assertNumQueries(5):  # session, user, stage, insert defect, stage -> FAIL
+            resp = self._api("add_defect", {"defect_stage": "FIT", "category": "Loose hinge", "severity": "MED"})
+
+        body = resp.json()
+        self.assertIn("Loose hinge", body["defect_html"])
+        self.assertIn(f'id="defect-{body["defect_id"]}"', body["defect_html"])
+        self.assertEqual(self.inspection.stage_results.get(stage="FIT").status, "FAIL")
+
+        page = self.client.get(f"/ui/inspect/{self.inspection.id}/")
+        self.assertContains(page, f'id="defect-{body["defect_id"]}"')
+        self.assertEqual(self._api("finalize", {}).status_code, 400)
+
+
+@override_settings(QC_IMAGE_WORKER="command")
+class BatchSubmissionTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media.name))
+        self.client.force_login(User.objects.create_user("tablet"))
+        self.inspections = [
+            inspections.start_inspection(
+                Unit.objects.create(unit_id=f"B-{i}", order_id=f"ORD-B-{i}", lab="Lab A", frame_model="M1")
+            )
+            for i in range(2)
+        ]
+
+    def _batch(self, key, inspection, final="FAIL"):
+        return {
+            "client_key": key,
+            "inspection_id": inspection.id,
+            "actions": [
+                {"action": "save_intake", "fields": {"intake_status": "PASS", "verified_unit_id": inspection.unit.unit_id}},
+                {"action": "save_cosmetic", "fields": {"step_bend_test": "FAIL", "cosmetic_notes": "stress mark"}},
+                {"action": "add_defect", "fields": {"defect_stage": "COSMETIC", "category": "Stress"}, "photo": "p1"},
+                {"action": "save_fit", "fields": {"fit_status": "PASS", "nosepads": "OK"}},
+                {"action": "finalize", "fields": {"final_result": final, "failed_stage": "COSMETIC"}},
+            ],
+        }
+
+    def _post(self, batches, **files):
+        return self.client.post("/ui/inspect/batch/", {"batches": json.dumps(batches), **files})
+
+    def _photo(self):
+        return SimpleUploadedFile("p.jpg", b"\xff\xd8 not really a jpeg", content_type="image/jpeg")
+
+    def test_whole_inspections_applied_once(self):
+        batches = [self._batch("k-1", self.inspections[0]), self._batch("k-2", self.inspections[1], final="PASS")]
+        results = self._post(batches, p1=self._photo()).json()["results"]
+
+        self.assertEqual([(r["ok"], r["duplicate"]) for r in results], [(True, False), (True, False)])
+        self.assertEqual(results[0]["stages"]["COSMETIC"], "FAIL")
+        self.assertIsNotNone(results[0]["rework_ticket_id"])
+        # fragments the wizard patches in instead of reloading
+        self.assertIn('data-status="FAIL"', results[0]["stage_html"]["COSMETIC"])
+        self.assertIn(f'id="defect-{results[0]["defects"][0]}"', results[0]["defect_html"][0])
+        first = Unit.objects.get(unit_id="B-0")
+        self.assertEqual((first.status, first.last_result), ("REWORK", "FAIL"))
+        self.assertEqual(Defect.objects.count(), 2)
+        self.assertEqual(DefectPhoto.objects.count(), 2)
+
+        # the tablet never saw the response and sends everything again
+        again = self._post(batches, p1=self._photo()).json()["results"]
+
+        self.assertEqual([r["duplicate"] for r in again], [True, True])
+        self.assertEqual(again[0]["defects"], results[0]["defects"])
+        self.assertEqual(Defect.objects.count(), 2)
+        self.assertEqual(ReworkTicket.objects.count(), 1)
+        self.assertEqual(InspectionSubmission.objects.count(), 2)
+
+    def test_bad_batch_rolls_back_and_keeps_key(self):
+        batch = self._batch("k-bad", self.inspections[0])
+        batch["actions"][2]["fields"]["defect_stage"] = "PAINT"
+
+        result = self._post([batch], p1=self._photo()).json()["results"][0]
+
+        self.assertFalse(result["ok"])
+        self.assertEqual(self.inspections[0].stage_results.get(stage="INTAKE").data, {})
+        self.assertFalse(Defect.objects.exists())
+        self.assertFalse(InspectionSubmission.objects.exists())
+
+        # missing photo is rejected before anything runs; a fixed retry with the same key applies
+        self.assertIn("missing", self._post([self._batch("k-bad", self.inspections[0])]).json()["results"][0]["error"])
+        fixed = self._post([self._batch("k-bad", self.inspections[0])], p1=self._photo()).json()["results"][0]
+        self.assertEqual((fixed["ok"], fixed["duplicate"]), (True, False))
+
+    def test_malformed_action_fails_only_its_batch(self):
+        bad = {"client_key": "k-str", "inspection_id": self.inspections[0].id, "actions": ["save_intake", []]}
+        ok = self._batch("k-ok", self.inspections[1], final="PASS")
+        results = self._post([bad, ok], p1=self._photo()).json()["results"]
+
+        self.assertEqual([(r["ok"], r.get("status")) for r in results], [(False, 400), (True, None)])
+        self.assertIn("must be an object", results[0]["error"])
+
+    def test_key_reused_for_another_inspection_conflicts(self):
+        self._post([self._batch("k-1", self.inspections[0])], p1=self._photo())
+
+        result = self._post([self._batch("k-1", self.inspections[1])], p1=self._photo()).json()["results"][0]
+
+        self.assertEqual((result["ok"], result["status"]), (False, 409))
+        self.assertEqual(self.inspections[1].stage_results.get(stage="INTAKE").data, {})
+
+
+def _fts_match(plan_line: str) -> bool:
+    # SQLite FTS5: "SCAN qc_complaint_fts VIRTUAL TABLE INDEX 0:M..." is a MATCH lookup
+    return "VIRTUAL TABLE INDEX" in plan_line and ":M" in plan_line
+
+
+def _partial_index_walk(plan_line: str, partial_indexes: set[str]) -> bool:
+    # SQLite: "SCAN t USING INDEX x" where x is partial only reads the rows x's WHERE admits
+    return any(plan_line.endswith(f"INDEX {name}") for name in partial_indexes)
+
+
+class QueryPlanRegressionTests(TestCase):
+    """
+    Captures EXPLAIN output for each dashboard/list hot query on a seeded
+    dataset and fails when one of them falls back to a full table scan.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        stores = Store.objects.bulk_create(Store(name=f"Store {i}", code=f"S{i:02d}") for i in range(30))
+        units = Unit.objects.bulk_create(
+            Unit(
+                unit_id=f"P-{i:06d}",
+                store=stores[i % len(stores)],
+                order_id=f"ORD-{i:06d}",
+                frame_model=f"Model {i % 40}",
+                lab=f"Lab {i % 8}",
+                priority="URGENT" if i % 20 == 0 else "NORMAL",
+                status="RECEIVED" if i % 25 == 0 else "STORE_READY",
+                received_at=now - timedelta(hours=i),
+            )
+            for i in range(3000)
+        )
+        Inspection.objects.bulk_create(
+            Inspection(
+                unit=u,
+                attempt_number=1 + (i % 3 == 0),
+                started_at=u.received_at + timedelta(minutes=30),
+                completed_at=u.received_at + timedelta(hours=1),
+                final_result="FAIL" if i % 9 == 0 else "PASS",
+            )
+            for i, u in enumerate(units)
+        )
+        stage_results = InspectionStageResult.objects.bulk_create(
+            InspectionStageResult(inspection=inspection, stage="COSMETIC", status="FAIL")
+            for inspection in Inspection.objects.filter(final_result="FAIL")
+        )
+        Defect.objects.bulk_create(
+            Defect(stage_result=sr, category="Scratch", severity=("LOW", "MED", "HIGH")[i % 3])
+            for i, sr in enumerate(stage_results)
+        )
+        Complaint.objects.bulk_create(
+            Complaint(
+                title=f"Scratched lens {i}",
+                description="hinge loose",
+                store=stores[i % 10],
+                unit_id_text=f"P-{i:06d}",
+            )
+            for i in range(500)
+        )
+        # a long history of closed flags and a handful still open
+        QualityFlag.objects.bulk_create(
+            QualityFlag(
+                flag_type="MODEL",
+                flag_key=f"Model {i % 40}",
+                window_start=now - timedelta(days=i + 7),
+                window_end=now - timedelta(days=i),
+                is_active=i < 5,
+                created_at=now - timedelta(days=i),
+                closed_at=None if i < 5 else now - timedelta(days=i - 1),
+            )
+            for i in range(400)
+        )
+        unit_search.rebuild_index()
+        rollups.rebuild_rollups()
+        deadline = F("received_at") + timedelta(hours=6)
+        Unit.objects.filter(status="RECEIVED").update(sla_deadline=deadline, sla_alarm_at=deadline)
+        sla.emit_breaches(now)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def _plans(self, fn) -> list[tuple[str, str]]:
+        with CaptureQueriesContext(connection) as ctx:
+            fn()
+        plans = []
+        for q in ctx.captured_queries:
+            sql = q["sql"]
+            if not sql.lstrip().upper().startswith("SELECT"):
+                continue
+            plans.append((sql, _explain(sql)))
+        self.assertTrue(plans, "no SELECT captured")
+        return plans
+
+    def assertOnlySearches(self, fn):
+        """
+        Every table access must be an index SEARCH: a SCAN, even of a
+        covering index, reads the whole table. Two SCANs are searches in
+        disguise and pass: an FTS5 MATCH lookup (a virtual-table SCAN with
+        a match constraint) and a walk of a partial index, which only holds
+        the rows its WHERE admits (qc_flag_one_active_per_key: active flags).
+        """
+        partial = set()
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql LIKE '% WHERE %'")
+                partial = {name for (name,) in cursor.fetchall()}
+        for sql, plan in self._plans(fn):
+            scans = [
+                line
+                for line in plan.splitlines()
+                if (
+                    "SCAN " in line
+                    and "CONSTANT ROW" not in line
+                    and not _fts_match(line)
+                    and not _partial_index_walk(line, partial)
+                )
+                or "Seq Scan" in line
+            ]
+            self.assertFalse(scans, f"full scan in:\n{sql}\n{plan}")
+
+    def test_counts_overview(self):
+        self.assertOnlySearches(metrics.counts_overview)
+
+    def test_first_pass_yield(self):
+        self.assertOnlySearches(lambda: metrics.first_pass_yield(days=7))
+
+    def test_avg_qc_time(self):
+        self.assertOnlySearches(lambda: metrics.avg_qc_time_hours(days=7))
+
+    def test_urgent_sla_breaches(self):
+        self.assertOnlySearches(lambda: metrics.urgent_sla_breaches())
+
+    def test_sla_breaches(self):
+        self.assertOnlySearches(lambda: sla.emit_breaches(timezone.now()))
+        self.assertOnlySearches(metrics.recent_sla_breaches)
+
+    def test_flag_sweep(self):
+        self.assertOnlySearches(flags.refresh_quality_flags)
+
+    def test_work_queue_claim(self):
+        self.assertOnlySearches(lambda: work_queue.claim(User.objects.create_user("bench"), 5))
+
+    def test_frames_list_status_page(self):
+        self.assertOnlySearches(lambda: keyset_page(Unit.objects.filter(status="RECEIVED"), "", 100))
+
+    def test_frames_search(self):
+        matches = Unit.objects.filter(id__in=unit_search.matching_unit_ids("p-0001"))
+        self.assertOnlySearches(lambda: keyset_page(matches, "", 100))
+
+    def test_active_flags(self):
+        self.assertOnlySearches(metrics.active_flags)
+
+    def test_defect_counts(self):
+        self.assertOnlySearches(lambda: defects.defect_counts(days=7))
+
+    def test_defect_rates(self):
+        self.assertOnlySearches(lambda: defects.worst_defect_rates(days=7))
+
+    def test_complaint_search(self):
+        self.assertOnlySearches(lambda: complaint_search.search_complaints("scratch", page_size=50))
+
+    def test_rebuild_rollups_window(self):
+        today = timezone.localdate()
+        self.assertOnlySearches(lambda: rollups.rebuild_rollups(today - timedelta(days=7), today))
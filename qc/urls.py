@@ -4,6 +4,7 @@ from . import views
 
 urlpatterns = [
     path("health/", views.health, name="health"),
+    path("health/metrics/", views.health_metrics, name="health_metrics"),
 
     # UI shell
     path("", views.home, name="home"),
@@ -12,16 +13,34 @@ urlpatterns = [
 
     # Frames
     path("ui/frames/", views.frames_list, name="frames_list"),
+    path("ui/queue/", views.work_queue_page, name="work_queue"),
     path("ui/import/", views.import_frames_page, name="import_frames_page"),
     path("ui/import/template.csv", views.download_frames_template, name="download_frames_template"),
     path("ui/import/upload/", views.upload_frames_csv, name="upload_frames_csv"),
+    path("ui/import/jobs/<int:job_id>/", views.import_job_status, name="import_job_status"),
+    path("ui/export/<str:kind>/", views.export_data, name="export_data"),
 
     # Inspection flow
+    path("ui/inspect/scan/", views.scan_start_inspections, name="scan_start_inspections"),
+    path("ui/inspect/batch/", views.submit_inspection_batches, name="submit_inspection_batches"),
     path("ui/inspect/<str:unit_id>/start/", views.start_inspection, name="start_inspection"),
     path("ui/inspect/<int:inspection_id>/", views.inspection_wizard, name="inspection_wizard"),
+    path(
+        "ui/inspect/<int:inspection_id>/api/<str:action>/",
+        views.inspection_wizard_action,
+        name="inspection_wizard_action",
+    ),
 
     # Complaints
     path("ui/complaints/", views.complaints_list, name="complaints_list"),
     path("ui/complaints/new/", views.complaints_new, name="complaints_new"),
     path("ui/complaints/<int:complaint_id>/", views.complaints_detail, name="complaints_detail"),
+    path("ui/complaints/<int:complaint_id>/uploads/", views.upload_session_create, name="upload_session_create"),
+    path("ui/uploads/<str:key>/", views.upload_session_status, name="upload_session_status"),
+    path("ui/uploads/<str:key>/complete/", views.upload_session_complete, name="upload_session_complete"),
+    path(
+        "ui/uploads/<str:key>/<int:file_index>/<int:chunk_index>/",
+        views.upload_session_chunk,
+        name="upload_session_chunk",
+    ),
 ]
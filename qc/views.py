@@ -4,14 +4,17 @@ from __future__ import annotations
 import csv
 import io
 import json
-from datetime import timedelta
+import re
+from datetime import date
 
+from django.conf import settings
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.db import transaction
-from django.db.models import Avg, Count, F, Q
-from django.http import HttpResponse, JsonResponse, HttpRequest
+from django.http import HttpResponse, JsonResponse, HttpRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.urls import reverse
 from django.utils import timezone
 from django.views.decorators.http import require_http_methods
 
@@ -21,12 +24,28 @@ from .models import (
     InspectionStageResult,
     Defect,
     DefectPhoto,
-    ReworkTicket,
-    QualityFlag,
     Store,
     Complaint,
     ComplaintAttachment,
+    ImportJob,
+    UploadSession,
 )
+from .middleware import request_stats
+from .services import (
+    complaint_search,
+    exports,
+    images,
+    import_jobs,
+    inspections,
+    listing,
+    metrics,
+    submissions,
+    unit_search,
+    unit_status,
+    uploads,
+    work_queue,
+)
+from .services.pagination import keyset_page
 
 # =============================================================================
 # Deep Cosmetic Steps (4-step process you requested)
@@ -54,160 +73,6 @@ DEEP_COSMETIC_STEPS = [
     },
 ]
 
-# =============================================================================
-# Metrics helpers (INLINE so no qc.services import problems)
-# =============================================================================
-def _window_start(days: int) -> timezone.datetime:
-    return timezone.now() - timedelta(days=days)
-
-
-def counts_overview() -> dict:
-    """
-    Dashboard counts:
-    - not inspected: RECEIVED
-    - in progress: QC_IN_PROGRESS
-    - passed: STORE_READY
-    - failed: REWORK / QUARANTINE / RETEST (you can adjust)
-    """
-    qs = Unit.objects.all()
-
-    not_inspected = qs.filter(status="RECEIVED").count()
-    in_progress = qs.filter(status="QC_IN_PROGRESS").count()
-    passed = qs.filter(status="STORE_READY").count()
-    failed = qs.filter(status__in=["REWORK", "QUARANTINE", "RETEST"]).count()
-
-    total = qs.count()
-
-    return {
-        "total": total,
-        "not_inspected": not_inspected,
-        "in_progress": in_progress,
-        "passed": passed,
-        "failed": failed,
-    }
-
-
-def first_pass_yield(days: int = 7) -> dict:
-    """
-    FPY = % of units that PASS on attempt 1 (within time window).
-    """
-    start = _window_start(days)
-
-    first_attempts = (
-        Inspection.objects.filter(attempt_number=1, completed_at__isnull=False, completed_at__gte=start)
-        .values("final_result")
-        .annotate(n=Count("id"))
-    )
-
-    totals = {row["final_result"]: row["n"] for row in first_attempts}
-    passed = totals.get("PASS", 0)
-    failed = totals.get("FAIL", 0)
-    denom = passed + failed
-    rate = (passed / denom * 100.0) if denom else 0.0
-
-    return {"days": days, "passed": passed, "failed": failed, "rate_percent": round(rate, 2)}
-
-
-def avg_qc_time_hours(days: int = 7) -> float:
-    """
-    Average inspection duration (hours) for completed inspections in window.
-    """
-    start = _window_start(days)
-
-    # Django: duration = completed_at - started_at
-    # Use Avg expression on DurationField result.
-    qs = Inspection.objects.filter(completed_at__isnull=False, completed_at__gte=start).annotate(
-        dur=F("completed_at") - F("started_at")
-    )
-
-    avg_dur = qs.aggregate(a=Avg("dur"))["a"]
-    if not avg_dur:
-        return 0.0
-
-    return round(avg_dur.total_seconds() / 3600.0, 2)
-
-
-def urgent_sla_breaches(hours_threshold: int = 6) -> int:
-    """
-    URGENT SLA breach:
-    URGENT units not STORE_READY after X hours since received.
-    """
-    cutoff = timezone.now() - timedelta(hours=hours_threshold)
-    return Unit.objects.filter(priority="URGENT").exclude(status="STORE_READY").filter(received_at__lte=cutoff).count()
-
-
-def auto_flag(defect_threshold_percent: float = 10.0, days: int = 7, min_sample: int = 10) -> None:
-    """
-    Auto-create QualityFlag records when defect rate exceeds threshold.
-    Defect rate defined as % of inspections that ended FAIL.
-
-    Flags created for:
-      - MODEL  (Unit.frame_model)
-      - LAB    (Unit.lab)
-
-    Safe to run repeatedly (idempotent-ish: won't create duplicates for same window/type/key).
-    """
-    window_start = _window_start(days)
-    window_end = timezone.now()
-
-    inspections = (
-        Inspection.objects.filter(completed_at__isnull=False, completed_at__gte=window_start)
-        .select_related("unit")
-        .only("id", "final_result", "unit__frame_model", "unit__lab")
-    )
-
-    # Aggregate by model
-    by_model = {}
-    by_lab = {}
-
-    for ins in inspections:
-        model = (ins.unit.frame_model or "").strip() or "UNKNOWN"
-        lab = (ins.unit.lab or "").strip() or "UNKNOWN"
-
-        by_model.setdefault(model, {"total": 0, "fail": 0})
-        by_lab.setdefault(lab, {"total": 0, "fail": 0})
-
-        by_model[model]["total"] += 1
-        by_lab[lab]["total"] += 1
-
-        if ins.final_result == "FAIL":
-            by_model[model]["fail"] += 1
-            by_lab[lab]["fail"] += 1
-
-    def maybe_create(flag_type: str, key: str, total: int, fail: int):
-        if total < min_sample:
-            return
-        rate = (fail / total) * 100.0
-        if rate < defect_threshold_percent:
-            return
-
-        exists = QualityFlag.objects.filter(
-            flag_type=flag_type,
-            flag_key=key,
-            window_start=window_start,
-            window_end=window_end,
-        ).exists()
-        if exists:
-            return
-
-        QualityFlag.objects.create(
-            flag_type=flag_type,
-            flag_key=key,
-            window_start=window_start,
-            window_end=window_end,
-            sample_size=total,
-            defect_rate=rate,
-            threshold=defect_threshold_percent,
-            is_active=True,
-        )
-
-    for model, d in by_model.items():
-        maybe_create("MODEL", model, d["total"], d["fail"])
-
-    for lab, d in by_lab.items():
-        maybe_create("LAB", lab, d["total"], d["fail"])
-
-
 # =============================================================================
 # Health
 # =============================================================================
@@ -215,6 +80,13 @@ def health(request: HttpRequest):
     return JsonResponse({"ok": True, "message": "QC service running"})
 
 
+@staff_member_required
+def health_metrics(request: HttpRequest):
+    # per-view query/latency stats for this process (see qc.middleware);
+    # staff only: view names, query counts and sizes map out the app
+    return JsonResponse(request_stats.snapshot())
+
+
 # =============================================================================
 # Home + UI shell
 # =============================================================================
@@ -238,61 +110,95 @@ def ui_dashboard(request: HttpRequest):
     - counts: not inspected / in progress / passed / failed
     - FPY
     - avg QC time
-    - urgent SLA breaches
-    - active quality flags
-    """
-    # safe: must never break dashboard
-    try:
-        auto_flag(defect_threshold_percent=10.0, days=7, min_sample=10)
-    except Exception:
-        pass
+    - open urgent SLA breaches and the latest breach events (`manage.py qc_sla_scheduler`)
+    - active quality flags (maintained by `manage.py qc_run_flags`, read-only here)
 
-    overview = counts_overview()
-    fpy = first_pass_yield(days=7)
-    avg_hours = avg_qc_time_hours(days=7)
-    urgent_breaches = urgent_sla_breaches(hours_threshold=6)
-
-    active_flags = QualityFlag.objects.filter(is_active=True).order_by("-created_at")[:25]
-
-    context = {
-        "overview": overview,
-        "fpy": fpy,
-        "avg_hours": avg_hours,
-        "urgent_breaches": urgent_breaches,
-        "active_flags": active_flags,
-    }
+    Served from the cached metrics snapshot (qc.services.metrics).
+    """
+    context = metrics.dashboard_snapshot()
     return render(request, "qc/dashboard.html", context)
 
 
 # =============================================================================
 # Frames list
 # =============================================================================
+FRAMES_PAGE_SIZE = 100
+
+
 @login_required
 def frames_list(request: HttpRequest):
     status = request.GET.get("status", "").strip()
     q = request.GET.get("q", "").strip()
+    after = request.GET.get("after", "").strip()
 
-    units = Unit.objects.all().order_by("-received_at")
+    units = Unit.objects.all()
     if status:
         units = units.filter(status=status)
     if q:
-        units = units.filter(unit_id__icontains=q) | units.filter(order_id__icontains=q)
+        units = units.filter(id__in=unit_search.matching_unit_ids(q))
+
+    # keyset pagination on (received_at, id): flat cost at any depth;
+    # per-row counts are correlated subqueries in the same statement
+    page, next_cursor = keyset_page(listing.unit_rows(units), after, FRAMES_PAGE_SIZE)
 
     context = {
-        "units": units[:500],
+        "units": page,
         "status": status,
         "q": q,
+        "after": after,
+        "next_cursor": next_cursor,
         "status_choices": [c[0] for c in Unit._meta.get_field("status").choices],
     }
     return render(request, "qc/frames_list.html", context)
 
 
+# =============================================================================
+# Work queue (QC bench)
+# =============================================================================
+@login_required
+def work_queue_page(request: HttpRequest):
+    """
+    The tech's claimed units, URGENT first then by SLA deadline. "next" tops the
+    claims up to QC_QUEUE_BATCH; "release" hands one back.
+    """
+    if request.method == "POST":
+        action = request.POST.get("action", "")
+        if action == "next":
+            if not work_queue.next_units(request.user):
+                messages.info(request, "Nothing waiting for QC.")
+        elif action == "release" and request.POST.get("unit", "").isdigit():
+            work_queue.release(request.user, [int(request.POST["unit"])])
+        return redirect("work_queue")
+
+    context = {
+        "units": list(work_queue.claims(request.user)[: getattr(settings, "QC_QUEUE_BATCH", 5)]),
+        "waiting": work_queue.waiting().count(),
+    }
+    return render(request, "qc/work_queue.html", context)
+
+
 # =============================================================================
 # Import template download/upload
 # =============================================================================
 @login_required
 def import_frames_page(request: HttpRequest):
-    return render(request, "qc/import_frames.html")
+    jobs = ImportJob.objects.order_by("-created_at")[:10]
+    job_id = request.GET.get("job", "")
+    return render(
+        request,
+        "qc/import_frames.html",
+        {"jobs": jobs, "job_id": int(job_id) if job_id.isdigit() else None},
+    )
+
+
+@login_required
+def import_job_status(request: HttpRequest, job_id: int):
+    """
+    JSON progress for one import job (polled by the import page).
+    """
+    import_jobs.sweep_orphaned_jobs()
+    job = get_object_or_404(ImportJob, id=job_id)
+    return JsonResponse(import_jobs.job_progress(job))
 
 
 @login_required
@@ -313,7 +219,6 @@ def download_frames_template(request: HttpRequest):
 
 
 @login_required
-@transaction.atomic
 def upload_frames_csv(request: HttpRequest):
     if request.method != "POST":
         return redirect("import_frames_page")
@@ -323,76 +228,135 @@ def upload_frames_csv(request: HttpRequest):
         messages.error(request, "Please choose a CSV file.")
         return redirect("import_frames_page")
 
+    # spool to disk and hand off to the import worker; the page polls progress
+    job = import_jobs.enqueue_import(f, request.user)
+    messages.success(request, f"Import queued ({job.original_name}).")
+    return redirect(f"{reverse('import_frames_page')}?job={job.id}")
+
+
+# =============================================================================
+# Inspection wizard (4-step deep cosmetic)
+# =============================================================================
+# most unit IDs accepted by one tray scan
+SCAN_MAX_UNITS = 200
+
+
+@login_required
+def start_inspection(request: HttpRequest, unit_id: str):
+    unit = get_object_or_404(Unit, unit_id=unit_id)
+
+    training_mode = request.GET.get("training", "0") == "1"
     try:
-        content = f.read().decode("utf-8-sig")
-    except Exception:
-        messages.error(request, "Could not read file. Please upload a UTF-8 CSV.")
-        return redirect("import_frames_page")
+        inspection = inspections.start_inspection(unit, request.user, training_mode)
+    except ValueError as e:
+        messages.error(request, f"Could not start an inspection: {e}")
+        return redirect("frames_list")
 
-    reader = csv.DictReader(io.StringIO(content))
-    required = {"unit_id", "order_id", "frame_model", "lab", "priority", "status"}
-    if not required.issubset(set(reader.fieldnames or [])):
-        messages.error(request, f"CSV missing columns. Required: {', '.join(sorted(required))}")
-        return redirect("import_frames_page")
+    return redirect("inspection_wizard", inspection_id=inspection.id)
 
-    created = 0
-    updated = 0
-    for row in reader:
-        unit_id = (row.get("unit_id") or "").strip()
-        if not unit_id:
-            continue
 
-        defaults = {
-            "order_id": (row.get("order_id") or "").strip() or None,
-            "frame_model": (row.get("frame_model") or "").strip(),
-            "lab": (row.get("lab") or "").strip(),
-            "priority": (row.get("priority") or "NORMAL").strip().upper(),
-            "status": (row.get("status") or "RECEIVED").strip().upper(),
+@login_required
+def scan_start_inspections(request: HttpRequest):
+    """
+    Start inspections for a whole tray: unit IDs scanned one per line
+    (or separated by spaces/commas), all opened in one transaction.
+    """
+    if request.method != "POST":
+        return redirect("frames_list")
+
+    scanned = list(dict.fromkeys(re.split(r"[\s,;]+", request.POST.get("unit_ids", "").strip())))
+    scanned = [s for s in scanned if s]
+    if not scanned:
+        messages.error(request, "Scan at least one unit ID.")
+        return redirect("frames_list")
+    if len(scanned) > SCAN_MAX_UNITS:
+        messages.error(request, f"A tray can hold at most {SCAN_MAX_UNITS} units (got {len(scanned)}).")
+        return redirect("frames_list")
+
+    units = list(Unit.objects.filter(unit_id__in=scanned))
+    missing = sorted(set(scanned) - {u.unit_id for u in units})
+    training_mode = request.POST.get("training", "0") == "1"
+    try:
+        started = inspections.start_inspections(units, request.user, training_mode)
+    except ValueError as e:
+        messages.error(request, f"No inspections started: {e}")
+        started = []
+
+    if missing:
+        messages.error(request, f"Unknown unit IDs: {', '.join(missing)}")
+    if len(started) == 1 and not missing:
+        return redirect("inspection_wizard", inspection_id=started[0].id)
+    if started:
+        messages.success(request, f"Started {len(started)} inspection(s).")
+    return redirect("frames_list")
+
+
+# wizard action -> the stage it saves
+WIZARD_STAGE_ACTIONS = {"save_intake": "INTAKE", "save_cosmetic": "COSMETIC", "save_fit": "FIT"}
+
+
+def _stage_values(action: str, post) -> dict:
+    """Field values a stage form posts (shared by the page POST and the JSON API)."""
+    if action == "save_intake":
+        return {
+            "notes": post.get("intake_notes", ""),
+            "status": post.get("intake_status", "PASS"),
+            "data": {
+                "verified_unit_id": post.get("verified_unit_id", ""),
+                "verified_order_id": post.get("verified_order_id", ""),
+            },
         }
+    if action == "save_cosmetic":
+        steps = {s["key"]: post.get(f"step_{s['key']}", "PASS") for s in DEEP_COSMETIC_STEPS}
+        return {
+            "notes": post.get("cosmetic_notes", ""),
+            "data": {"deep_steps": steps},
+            "status": "FAIL" if any(v == "FAIL" for v in steps.values()) else "PASS",
+        }
+    return {
+        "notes": post.get("fit_notes", ""),
+        "data": {
+            "temple_alignment": post.get("temple_alignment", ""),
+            "nosepads": post.get("nosepads", ""),
+        },
+        "status": post.get("fit_status", "PASS"),
+    }
 
-        _, was_created = Unit.objects.update_or_create(unit_id=unit_id, defaults=defaults)
-        if was_created:
-            created += 1
-        else:
-            updated += 1
 
-    messages.success(request, f"Import complete. Created: {created}, Updated: {updated}.")
-    return redirect("frames_list")
+def _defect_fields(post) -> dict:
+    return {
+        "category": post.get("category", "UNKNOWN"),
+        "reason_code": post.get("reason_code", "UNKNOWN"),
+        "severity": post.get("severity", "LOW"),
+        "notes": post.get("defect_notes", ""),
+    }
 
 
-# =============================================================================
-# Inspection wizard (4-step deep cosmetic)
-# =============================================================================
-@login_required
-def start_inspection(request: HttpRequest, unit_id: str):
-    unit = get_object_or_404(Unit, unit_id=unit_id)
+def _annotation(post):
+    annotation_json = post.get("annotation_json", "")
+    try:
+        return json.loads(annotation_json) if annotation_json else None
+    except Exception:
+        return None
 
-    last_attempt = Inspection.objects.filter(unit=unit).order_by("-attempt_number").first()
-    attempt_number = (last_attempt.attempt_number + 1) if last_attempt else 1
 
-    training_mode = request.GET.get("training", "0") == "1"
+def _unit_version(post) -> int | None:
+    """Unit.version the finalize form was rendered with, if it sent one."""
+    try:
+        return int(post["unit_version"])
+    except (KeyError, TypeError, ValueError):
+        return None
 
-    inspection = Inspection.objects.create(
-        unit=unit,
-        attempt_number=attempt_number,
-        tech_user=request.user,
-        training_mode_used=training_mode,
-    )
 
-    unit.status = "QC_IN_PROGRESS"
-    unit.save(update_fields=["status"])
-
-    # 4 stage placeholders
-    for stage in ["INTAKE", "COSMETIC", "FIT", "DECISION"]:
-        InspectionStageResult.objects.create(
-            inspection=inspection,
-            stage=stage,
-            status="PASS",
-            notes="",
-            data={},
-        )
+def _add_defect_from_post(request: HttpRequest, sr: InspectionStageResult) -> tuple[Defect, list[DefectPhoto]]:
+    d = inspections.add_defect(sr, **_defect_fields(request.POST))
 
-    return redirect("inspection_wizard", inspection_id=inspection.id)
+    photos = []
+    photo = request.FILES.get("defect_photo")
+    if photo:
+        photos.append(DefectPhoto.objects.create(defect=d, image=photo, annotation_json=_annotation(request.POST)))
+        images.enqueue_photo(photos[0])
+    return d, photos
 
 
 @login_required
@@ -401,92 +365,37 @@ def inspection_wizard(request: HttpRequest, inspection_id: int):
     unit = inspection.unit
 
     stage_results = {sr.stage: sr for sr in InspectionStageResult.objects.filter(inspection=inspection)}
-    intake = stage_results.get("INTAKE")
-    cosmetic = stage_results.get("COSMETIC")
-    fit = stage_results.get("FIT")
-    decision = stage_results.get("DECISION")  # kept for template symmetry
-
     training_mode = inspection.training_mode_used
 
     if request.method == "POST":
         action = request.POST.get("action", "")
 
-        if action == "save_intake" and intake:
-            intake.notes = request.POST.get("intake_notes", "")
-            intake.status = request.POST.get("intake_status", "PASS")
-            intake.data = {
-                "verified_unit_id": request.POST.get("verified_unit_id", ""),
-                "verified_order_id": request.POST.get("verified_order_id", ""),
-            }
-            intake.save()
-
-        elif action == "save_cosmetic" and cosmetic:
-            cosmetic.notes = request.POST.get("cosmetic_notes", "")
-            steps = {}
-            for s in DEEP_COSMETIC_STEPS:
-                key = s["key"]
-                steps[key] = request.POST.get(f"step_{key}", "PASS")
-            cosmetic.data = {"deep_steps": steps}
-            cosmetic.status = "FAIL" if any(v == "FAIL" for v in steps.values()) else "PASS"
-            cosmetic.save()
-
-        elif action == "save_fit" and fit:
-            fit.notes = request.POST.get("fit_notes", "")
-            fit.data = {
-                "temple_alignment": request.POST.get("temple_alignment", ""),
-                "nosepads": request.POST.get("nosepads", ""),
-            }
-            fit.status = request.POST.get("fit_status", "PASS")
-            fit.save()
+        if action in WIZARD_STAGE_ACTIONS:
+            sr = stage_results.get(WIZARD_STAGE_ACTIONS[action])
+            if sr:
+                inspections.save_stage(sr, **_stage_values(action, request.POST))
 
         elif action == "add_defect":
-            stage = request.POST.get("defect_stage", "COSMETIC")
-            sr = stage_results.get(stage)
+            sr = stage_results.get(request.POST.get("defect_stage", "COSMETIC"))
             if sr:
-                d = Defect.objects.create(
-                    stage_result=sr,
-                    category=request.POST.get("category", "UNKNOWN"),
-                    reason_code=request.POST.get("reason_code", "UNKNOWN"),
-                    severity=request.POST.get("severity", "LOW"),
-                    notes=request.POST.get("defect_notes", ""),
-                )
-
-                photo = request.FILES.get("defect_photo")
-                if photo:
-                    annotation_json = request.POST.get("annotation_json", "")
-                    try:
-                        ann = json.loads(annotation_json) if annotation_json else None
-                    except Exception:
-                        ann = None
-                    DefectPhoto.objects.create(defect=d, image=photo, annotation_json=ann)
-
-                sr.status = "FAIL"
-                sr.save()
+                _add_defect_from_post(request, sr)
 
         elif action == "finalize":
             final = (request.POST.get("final_result", "PASS") or "PASS").upper()
-            inspection.final_result = final
-            inspection.completed_at = timezone.now()
-            inspection.save(update_fields=["final_result", "completed_at"])
-
-            if final == "PASS":
-                unit.status = "STORE_READY"
-                unit.save(update_fields=["status"])
+            try:
+                ticket = inspections.finalize_inspection(
+                    inspection,
+                    final,
+                    failed_stage=request.POST.get("failed_stage", "COSMETIC"),
+                    reason_summary=request.POST.get("reason_summary", "Failed QC"),
+                    unit_version=_unit_version(request.POST),
+                )
+            except ValueError as e:
+                messages.error(request, f"Unit {unit.unit_id} not finalized: {e}")
+                return redirect("inspection_wizard", inspection_id=inspection.id)
+            if ticket is None:
                 messages.success(request, f"Unit {unit.unit_id} marked STORE_READY ✅")
             else:
-                unit.status = "REWORK"
-                unit.save(update_fields=["status"])
-
-                failed_stage = request.POST.get("failed_stage", "COSMETIC")
-                summary = request.POST.get("reason_summary", "Failed QC")
-                ReworkTicket.objects.create(
-                    unit=unit,
-                    inspection=inspection,
-                    failed_stage=failed_stage,
-                    reason_summary=summary,
-                    assigned_to=None,
-                    status="OPEN",
-                )
                 messages.error(request, f"Unit {unit.unit_id} FAILED → Rework ticket created.")
 
             return redirect("frames_list")
@@ -496,6 +405,7 @@ def inspection_wizard(request: HttpRequest, inspection_id: int):
     defects = (
         Defect.objects.filter(stage_result__inspection=inspection)
         .select_related("stage_result")
+        .prefetch_related("photos")
         .order_by("-id")
     )
 
@@ -510,28 +420,173 @@ def inspection_wizard(request: HttpRequest, inspection_id: int):
     return render(request, "qc/inspection_wizard.html", context)
 
 
+@login_required
+@require_http_methods(["POST"])
+def inspection_wizard_action(request: HttpRequest, inspection_id: int, action: str):
+    """
+    In-place wizard saves: one POST per step, answered with just the HTML
+    fragments that changed (stage badge, new defect row) for the page to
+    patch in. Same form fields as the full-page POST.
+    """
+    if action in WIZARD_STAGE_ACTIONS:
+        stage = WIZARD_STAGE_ACTIONS[action]
+    elif action == "add_defect":
+        stage = request.POST.get("defect_stage", "COSMETIC")
+    else:
+        return JsonResponse({"error": f"Unknown action '{action}'"}, status=400)
+
+    sr = InspectionStageResult.objects.filter(inspection_id=inspection_id, stage=stage).first()
+    if sr is None:
+        return JsonResponse({"error": "No such inspection stage"}, status=404)
+
+    payload = {"stage": sr.stage}
+    if action == "add_defect":
+        d, photos = _add_defect_from_post(request, sr)
+        payload["defect_id"] = d.id
+        payload["defect_html"] = render_to_string("qc/_wizard_defect_row.html", {"d": d, "photos": photos})
+    else:
+        payload["changed"] = inspections.save_stage(sr, **_stage_values(action, request.POST))
+
+    payload["status"] = sr.status
+    payload["stage_html"] = render_to_string("qc/_wizard_stage_badge.html", {"sr": sr})
+    return JsonResponse(payload)
+
+
+# most inspections one batch request may carry
+BATCH_MAX_INSPECTIONS = 50
+
+
+def _batch_ops(batch: dict, files) -> list[dict]:
+    """
+    Parse one queued inspection ({"actions": [{"action", "fields", "photo"}]})
+    into submissions ops, using the same field names as the wizard forms.
+    Raises ValueError before anything is written.
+    """
+    actions = batch.get("actions")
+    if not isinstance(actions, list) or not actions:
+        raise ValueError("Batch has no actions")
+
+    ops = []
+    for item in actions:
+        if not isinstance(item, dict):
+            raise ValueError("Each action must be an object")
+        action = item.get("action", "")
+        fields = item.get("fields") or {}
+        if not isinstance(fields, dict):
+            raise ValueError(f"{action}: fields must be an object")
+
+        if action in WIZARD_STAGE_ACTIONS:
+            ops.append({"op": "stage", "stage": WIZARD_STAGE_ACTIONS[action], "values": _stage_values(action, fields)})
+        elif action == "add_defect":
+            photo = None
+            if item.get("photo"):
+                photo = files.get(item["photo"])
+                if photo is None:
+                    raise ValueError(f"Photo '{item['photo']}' is missing from the upload")
+            ops.append(
+                {
+                    "op": "defect",
+                    "stage": fields.get("defect_stage", "COSMETIC"),
+                    "fields": _defect_fields(fields),
+                    "photo": photo,
+                    "annotation": _annotation(fields),
+                }
+            )
+        elif action == "finalize":
+            final = (fields.get("final_result", "PASS") or "PASS").upper()
+            if final not in ("PASS", "FAIL"):
+                raise ValueError(f"Bad final_result {final}")
+            ops.append(
+                {
+                    "op": "finalize",
+                    "final_result": final,
+                    "failed_stage": fields.get("failed_stage", "COSMETIC"),
+                    "reason_summary": fields.get("reason_summary", "Failed QC"),
+                    "unit_version": _unit_version(fields),
+                }
+            )
+        else:
+            raise ValueError(f"Unknown action '{action}'")
+    return ops
+
+
+@login_required
+@require_http_methods(["POST"])
+def submit_inspection_batches(request: HttpRequest):
+    """
+    Offline queue flush from bench tablets. Body: JSON (or a multipart
+    "batches" field plus the photo files) holding one or a list of
+    {"client_key", "inspection_id", "actions": [...]}. Each batch is
+    applied in its own transaction, once per client_key; the response
+    has one result per batch, in order.
+    """
+    try:
+        raw = request.POST["batches"] if request.content_type == "multipart/form-data" else request.body
+        batches = json.loads(raw or b"[]")
+    except (KeyError, ValueError):
+        return JsonResponse({"error": "Body must be JSON batches"}, status=400)
+    if isinstance(batches, dict):
+        batches = [batches]
+    if not isinstance(batches, list) or not all(isinstance(b, dict) for b in batches):
+        return JsonResponse({"error": "Body must be JSON batches"}, status=400)
+    if len(batches) > BATCH_MAX_INSPECTIONS:
+        return JsonResponse({"error": f"At most {BATCH_MAX_INSPECTIONS} inspections per request"}, status=400)
+
+    results = []
+    for batch in batches:
+        key = str(batch.get("client_key") or "")
+        try:
+            inspection_id = int(batch.get("inspection_id"))
+            result = submissions.submit(key, inspection_id, _batch_ops(batch, request.FILES), request.user)
+        except (TypeError, ValueError) as e:
+            status = 409 if isinstance(e, (submissions.KeyConflict, unit_status.StatusConflict)) else 400
+            results.append({"client_key": key, "ok": False, "status": status, "error": str(e)})
+            continue
+        results.append({"ok": True, **result, **_batch_fragments(result)})
+    return JsonResponse({"results": results})
+
+
+def _batch_fragments(result: dict) -> dict:
+    """Stage badges and defect rows of an applied batch, for the wizard page to patch in."""
+    stage_results = InspectionStageResult.objects.filter(inspection_id=result["inspection_id"])
+    defects = (
+        Defect.objects.filter(id__in=result["defects"])
+        .select_related("stage_result")
+        .prefetch_related("photos")
+        .order_by("id")
+    )
+    return {
+        "stage_html": {sr.stage: render_to_string("qc/_wizard_stage_badge.html", {"sr": sr}) for sr in stage_results},
+        "defect_html": [render_to_string("qc/_wizard_defect_row.html", {"d": d, "photos": d.photos.all()}) for d in defects],
+    }
+
+
 # =============================================================================
 # Complaints module (restored)
 # =============================================================================
+COMPLAINTS_PAGE_SIZE = 100
+
+
 @login_required
 def complaints_list(request: HttpRequest):
     status = request.GET.get("status", "").strip()
     store_code = request.GET.get("store", "").strip()
     q = request.GET.get("q", "").strip()
+    after = request.GET.get("after", "").strip()
 
-    qs = Complaint.objects.select_related("store", "unit", "created_by").order_by("-created_at")
-
-    if status:
-        qs = qs.filter(status=status)
-    if store_code:
-        qs = qs.filter(store__code=store_code)
-    if q:
-        qs = qs.filter(title__icontains=q) | qs.filter(description__icontains=q) | qs.filter(unit_id_text__icontains=q)
+    # ranked full-text search + facets + keyset paging (qc.services.complaint_search)
+    result = complaint_search.search_complaints(
+        q=q, status=status, store_code=store_code, cursor=after, page_size=COMPLAINTS_PAGE_SIZE
+    )
 
     stores = Store.objects.filter(is_active=True).order_by("name")
 
     context = {
-        "complaints": qs[:500],
+        "complaints": result["complaints"],
+        "facets": result["facets"],
+        "total": result["total"],
+        "after": after,
+        "next_cursor": result["next_cursor"],
         "status": status,
         "store_code": store_code,
         "q": q,
@@ -643,3 +698,83 @@ def complaints_detail(request: HttpRequest, complaint_id: int):
         "status_choices": [c[0] for c in Complaint.STATUS_CHOICES],
     }
     return render(request, "qc/complaints_detail.html", context)
+
+
+# =============================================================================
+# Chunked attachment uploads (JSON, driven by the uploader on the complaint page)
+# =============================================================================
+def _upload_session(request: HttpRequest, key: str) -> UploadSession:
+    return get_object_or_404(UploadSession, key=key, created_by=request.user)
+
+
+@login_required
+@require_http_methods(["POST"])
+def upload_session_create(request: HttpRequest, complaint_id: int):
+    complaint = get_object_or_404(Complaint, id=complaint_id)
+    try:
+        payload = json.loads(request.body or b"{}")
+        session = uploads.create_session(
+            complaint, request.user, payload.get("files"), note=str(payload.get("note") or "").strip()
+        )
+    except (ValueError, AttributeError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return JsonResponse(uploads.progress(session), status=201)
+
+
+@login_required
+@require_http_methods(["GET"])
+def upload_session_status(request: HttpRequest, key: str):
+    return JsonResponse(uploads.progress(_upload_session(request, key)))
+
+
+@login_required
+@require_http_methods(["PUT", "POST"])
+def upload_session_chunk(request: HttpRequest, key: str, file_index: int, chunk_index: int):
+    session = _upload_session(request, key)
+    try:
+        # the request itself is the stream: the chunk is never held in memory whole
+        uploads.write_chunk(session, file_index, chunk_index, request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return JsonResponse({"file": file_index, "chunk": chunk_index, "ok": True})
+
+
+@login_required
+@require_http_methods(["POST"])
+def upload_session_complete(request: HttpRequest, key: str):
+    session = _upload_session(request, key)
+    try:
+        attachments = uploads.complete_session(session.id)
+    except ValueError as e:
+        return JsonResponse({"error": str(e), **uploads.progress(session)}, status=400)
+    session.refresh_from_db()
+    return JsonResponse({**uploads.progress(session), "attachments": [a.id for a in attachments]})
+
+
+# =============================================================================
+# Bulk export (streamed; see qc.services.exports)
+# =============================================================================
+@login_required
+@require_http_methods(["GET"])
+def export_data(request: HttpRequest, kind: str):
+    """
+    ?format=csv|jsonl&since=YYYY-MM-DD&until=YYYY-MM-DD&lab=...&gzip=1
+    """
+    fmt = request.GET.get("format", "csv")
+    gzip = request.GET.get("gzip") == "1"
+    try:
+        since = date.fromisoformat(request.GET["since"]) if request.GET.get("since") else None
+        until = date.fromisoformat(request.GET["until"]) if request.GET.get("until") else None
+        stream = exports.export_stream(
+            kind, fmt, since=since, until=until, lab=request.GET.get("lab", "").strip(), gzip=gzip
+        )
+    except ValueError as e:
+        return HttpResponse(str(e), status=400, content_type="text/plain")
+
+    if gzip:
+        content_type = "application/gzip"
+    else:
+        content_type = "text/csv; charset=utf-8" if fmt == "csv" else "application/x-ndjson; charset=utf-8"
+    resp = StreamingHttpResponse(stream, content_type=content_type)
+    resp["Content-Disposition"] = f'attachment; filename="{exports.export_filename(kind, fmt, gzip)}"'
+    return resp
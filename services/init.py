@@ -1,2 +0,0 @@
-# qc/services/__init__.py
-# (empty file is fine — it just marks this as a Python package)
@@ -1,8 +0,0 @@
-# qc/Services/process.py
-
-DEEP_COSMETIC_STEPS = [
-    {"key": "bend_check", "label": "Bend check (temples/frame symmetry)"},
-    {"key": "throw_test", "label": "Throw / drop simulation (light stress test)"},
-    {"key": "hinge_stress", "label": "Hinge stress test (open/close resistance & play)"},
-    {"key": "final_visual", "label": "Final visual scan under light"},
-]